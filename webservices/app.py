@@ -1,8 +1,10 @@
 import requests
 import json
+from client import LibraryClient, ApiError
 
-# URL base del servicio Flask
-BASE_URL = "http://localhost:8000/author"
+# URL base del servicio Flask (una sesion keep-alive con timeouts y reintentos, ver client.py)
+BASE_URL = "http://localhost:8000"
+api = LibraryClient(BASE_URL)
 
 # ----------------------------------------------------
 # A. GET: Obtener todos los autores
@@ -10,14 +12,13 @@ BASE_URL = "http://localhost:8000/author"
 def get_all_authors():
     print("Fetching all authors...")
     try:
-        response = requests.get(BASE_URL)
-        if response.status_code == 200:
-            data = response.json()
-            print("\nList of authors:")
-            print(json.dumps(data, indent=4))
-        else:
-            print(f"\nFailed to fetch authors. Status code: {response.status_code}")
-            print(f"Server response: {response.text}")
+        # All pages, following the cursor
+        data = list(api.author.iter())
+        print("\nList of authors:")
+        print(json.dumps(data, indent=4))
+    except ApiError as e:
+        print(f"\nFailed to fetch authors. Status code: {e.status}")
+        print(f"Server response: {e.response.text}")
     except requests.exceptions.ConnectionError:
         print("\nConnection error. Ensure the Flask service is running at http://localhost:8000")
     except Exception as e:
@@ -32,13 +33,12 @@ def create_author(full_name):
         payload = {
             "full_name": full_name
         }
-        response = requests.post(BASE_URL, json=payload)
-        if response.status_code == 201:
-            print("\nAuthor created successfully:")
-            print(response.json())
-        else:
-            print(f"\nFailed to create author. Status code: {response.status_code}")
-            print(f"Server response: {response.text}")
+        author = api.author.create(payload)
+        print("\nAuthor created successfully:")
+        print(author)
+    except ApiError as e:
+        print(f"\nFailed to create author. Status code: {e.status}")
+        print(f"Server response: {e.response.text}")
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}")
 
@@ -51,14 +51,12 @@ def update_author(author_id, full_name):
         payload = {
             "full_name": full_name
         }
-        url = f"{BASE_URL}/{author_id}"
-        response = requests.put(url, json=payload)
-        if response.status_code == 200:
-            print("\nAuthor updated successfully:")
-            print(response.json())
-        else:
-            print(f"\nFailed to update author. Status code: {response.status_code}")
-            print(f"Server response: {response.text}")
+        author = api.author.update(author_id, payload)
+        print("\nAuthor updated successfully:")
+        print(author)
+    except ApiError as e:
+        print(f"\nFailed to update author. Status code: {e.status}")
+        print(f"Server response: {e.response.text}")
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}")
 
@@ -68,14 +66,13 @@ def update_author(author_id, full_name):
 def delete_author(author_id):
     print(f"\nDeleting author with ID {author_id}...")
     try:
-        url = f"{BASE_URL}/{author_id}"
-        response = requests.delete(url)
-        if response.status_code == 200:
-            print("\nAuthor deleted successfully:")
-            print(response.json())
+        if api.author.delete(author_id):
+            print("\nAuthor deleted successfully")
         else:
-            print(f"\nFailed to delete author. Status code: {response.status_code}")
-            print(f"Server response: {response.text}")
+            print(f"\nAuthor with ID {author_id} not found")
+    except ApiError as e:
+        print(f"\nFailed to delete author. Status code: {e.status}")
+        print(f"Server response: {e.response.text}")
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}")
 
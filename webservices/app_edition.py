@@ -1,48 +1,53 @@
+import os
 import sqlite3
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, request, jsonify
+from db_pool import get_db, init_app
+from migrations import ensure_schema
+from changes import init_app as changes_init_app
+from metrics import init_app as metrics_init_app
+from filters import FilterError, parse_query
+from pagination import SortKey, PaginationError, fetch_page, count_rows, parse_page_args, page_response
+from conditional import (PreconditionFailed, record_validators, collection_validators, is_fresh,
+                         not_modified, with_validators, check_if_match, precondition_failed)
+
+# Rutas /editions en un Blueprint para poder montarlas tambien en gateway.py
+bp = Blueprint('edition_service', __name__)
 
 app = Flask(__name__)
-DATABASE = 'crud_dr.db'
+init_app(app)
+app.register_error_handler(PreconditionFailed, precondition_failed)
+# Una sola base para todos los servicios con LIBRARY_DB (ver gateway.py)
+DATABASE = os.environ.get('LIBRARY_DB', 'crud_dr.db')
+# Registro de cambios para sincronizacion incremental (GET /changes?since=)
+changes_init_app(app, DATABASE)
+# Latencias por ruta y por sentencia SQL en GET /metrics (ver metrics.py)
+metrics_init_app(app)
+# Milisegundos en updated_at para que cada escritura cambie el ETag
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
 
 # --- Funciones de Utilidad de Base de Datos ---
 
 def get_db_connection():
-    """Establece y devuelve una conexión a la base de datos."""
-    conn = sqlite3.connect(DATABASE)
-    # Habilita el acceso por nombre de columna
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Devuelve la conexión del pool asociada a la petición actual."""
+    # El pool la devuelve automáticamente al terminar la petición (teardown)
+    return get_db(DATABASE)
+
+def begin_write(conn, edition_id):
+    """Abre la transacción de escritura y valida If-Match (412); devuelve la fila actual o None."""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    row = conn.execute("SELECT id, updated_at FROM edition WHERE id = ?", (edition_id,)).fetchone()
+    try:
+        check_if_match("edition", dict(row) if row else None)
+    except PreconditionFailed:
+        conn.rollback()
+        raise
+    return row
 
 def init_db():
-    """Crea la tabla 'edition' si no existe."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Nota: También deberías crear la tabla 'work' para que la FOREIGN KEY funcione
-    # Creamos 'work' solo como placeholder para la relación
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS work (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL
-        );
-    """)
-    
-    # Creación de la tabla 'edition'
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS edition (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            work_id INTEGER NOT NULL,
-            year INTEGER,
-            publisher TEXT,
-            isbn TEXT UNIQUE,
-            cover_url TEXT,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL,
-            FOREIGN KEY (work_id) REFERENCES work(id) ON DELETE CASCADE
-        );
-    """)
-    conn.commit()
-    conn.close()
+    """Aplica (una vez por proceso) el esquema compartido: work, edition, índices..."""
+    ensure_schema(DATABASE)
 
 # Inicializa la base de datos al inicio
 init_db()
@@ -51,7 +56,7 @@ init_db()
 
 ## 1. CREATE: Crear una nueva edición (POST /editions)
 
-@app.route('/editions', methods=['POST'])
+@bp.route('/editions', methods=['POST'])
 def create_edition():
     """Inserta un nuevo registro de edición."""
     data = request.get_json()
@@ -63,9 +68,9 @@ def create_edition():
 
     conn = get_db_connection()
     try:
-        conn.execute("""
+        conn.execute(f"""
             INSERT INTO edition (work_id, year, publisher, isbn, cover_url, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, datetime('now'), datetime('now'))
+            VALUES (?, ?, ?, ?, ?, {NOW}, {NOW})
         """, (
             data['work_id'],
             data['year'],
@@ -84,50 +89,62 @@ def create_edition():
     
     except Exception as e:
         return jsonify({"error": f"Error interno: {e}"}), 500
-    
-    finally:
-        conn.close()
 
 ## 2. READ: Obtener todas las ediciones (GET /editions)
 
-@app.route('/editions', methods=['GET'])
+# Orden de la colección: year DESC (puede ser NULL) con id como desempate
+EDITION_KEYS = [SortKey("year", True, True), SortKey("id", True)]
+
+@bp.route('/editions', methods=['GET'])
 def get_all_editions():
-    """Obtiene una lista de todas las ediciones."""
-    conn = get_db_connection()
-    editions = conn.execute("SELECT * FROM edition ORDER BY year DESC").fetchall()
-    conn.close()
-    
-    # Convierte las filas de sqlite3.Row a diccionarios
-    editions_list = [dict(row) for row in editions]
-    return jsonify(editions_list), 200
+    """Obtiene una página de ediciones (más recientes primero) paginada por cursor.
+
+    Admite los filtros y el orden de filters.py, p. ej. ?work_id=3&year__gte=1990&sort=publisher.
+    """
+    try:
+        limit, cursor, count = parse_page_args()
+        where, params, keys = parse_query("edition", EDITION_KEYS)
+        conn = get_db_connection()
+        # Validadores de la colección: un 304 no ejecuta la consulta de la página
+        etag, last_modified = collection_validators(conn, ["edition"])
+        if is_fresh(etag, last_modified):
+            return not_modified(etag, last_modified)
+        editions_list, next_cursor = fetch_page(conn, "edition", keys, limit, cursor, where, params)
+    except (PaginationError, FilterError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = page_response(editions_list, next_cursor, count_rows(conn, "edition", count, where, params))
+    return with_validators(response, etag, last_modified), 200
 
 ## 3. READ: Obtener una edición por ID (GET /editions/<id>)
 
-@app.route('/editions/<int:edition_id>', methods=['GET'])
+@bp.route('/editions/<int:edition_id>', methods=['GET'])
 def get_edition(edition_id):
     """Obtiene una edición específica por su ID."""
     conn = get_db_connection()
     edition = conn.execute("SELECT * FROM edition WHERE id = ?", (edition_id,)).fetchone()
-    conn.close()
 
     if edition is None:
         return jsonify({"message": f"Edición con ID {edition_id} no encontrada"}), 404
     
-    # Convierte a diccionario y devuelve
-    return jsonify(dict(edition)), 200
+    # ETag/Last-Modified desde updated_at; 304 si el cliente ya tiene esta versión
+    edition = dict(edition)
+    etag, last_modified = record_validators("edition", edition)
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+    return with_validators(jsonify(edition), etag, last_modified), 200
 
 ## 4. UPDATE: Actualizar una edición (PUT /editions/<id>)
 
-@app.route('/editions/<int:edition_id>', methods=['PUT'])
+@bp.route('/editions/<int:edition_id>', methods=['PUT'])
 def update_edition(edition_id):
     """Actualiza los campos de una edición existente."""
     data = request.get_json()
     conn = get_db_connection()
 
-    # Primero, comprueba si la edición existe
-    existing_edition = conn.execute("SELECT id FROM edition WHERE id = ?", (edition_id,)).fetchone()
+    # Primero, comprueba si la edición existe (y su versión si viene If-Match)
+    existing_edition = begin_write(conn, edition_id)
     if existing_edition is None:
-        conn.close()
         return jsonify({"message": f"Edición con ID {edition_id} no encontrada"}), 404
 
     # Prepara la consulta de actualización dinámicamente
@@ -143,11 +160,10 @@ def update_edition(edition_id):
             values.append(data[field])
 
     if not fields_to_update:
-        conn.close()
         return jsonify({"error": "No se proporcionaron campos para actualizar"}), 400
 
     # Agrega la actualización de 'updated_at'
-    fields_to_update.append("updated_at = datetime('now')")
+    fields_to_update.append(f"updated_at = {NOW}")
     
     # Construye y ejecuta la sentencia SQL
     sql_query = "UPDATE edition SET " + ", ".join(fields_to_update) + " WHERE id = ?"
@@ -155,8 +171,11 @@ def update_edition(edition_id):
 
     try:
         conn.execute(sql_query, tuple(values))
+        row = conn.execute("SELECT id, updated_at FROM edition WHERE id = ?", (edition_id,)).fetchone()
         conn.commit()
-        return jsonify({"message": f"Edición con ID {edition_id} actualizada con éxito"}), 200
+        # La nueva versión viaja en ETag para el siguiente If-Match
+        response = jsonify({"message": f"Edición con ID {edition_id} actualizada con éxito"})
+        return with_validators(response, *record_validators("edition", dict(row))), 200
 
     except sqlite3.IntegrityError as e:
         return jsonify({"error": f"Error de integridad: {e}"}), 409
@@ -164,31 +183,29 @@ def update_edition(edition_id):
     except Exception as e:
         return jsonify({"error": f"Error interno: {e}"}), 500
 
-    finally:
-        conn.close()
-
 
 ## 5. DELETE: Eliminar una edición (DELETE /editions/<id>)
 
-@app.route('/editions/<int:edition_id>', methods=['DELETE'])
+@bp.route('/editions/<int:edition_id>', methods=['DELETE'])
 def delete_edition(edition_id):
     """Elimina una edición específica por su ID."""
     conn = get_db_connection()
     
-    # Ejecuta el borrado
+    # Ejecuta el borrado (con If-Match, solo si la versión coincide)
+    begin_write(conn, edition_id)
     cursor = conn.execute("DELETE FROM edition WHERE id = ?", (edition_id,))
     conn.commit()
     
     if cursor.rowcount == 0:
-        conn.close()
         return jsonify({"message": f"Edición con ID {edition_id} no encontrada para eliminar"}), 404
     
-    conn.close()
     return jsonify({"message": f"Edición con ID {edition_id} eliminada con éxito"}), 200
 
+app.register_blueprint(bp)
+
 # --- Ejecución de la Aplicación ---
 
 if __name__ == '__main__':
-    # Esto ejecuta el servidor de desarrollo de Flask
+    # Esto ejecuta el servidor de desarrollo de Flask (en produccion: python serve.py app_edition)
     # Accede a http://127.0.0.1:5000/
     app.run(host='0.0.0.0',port= 8000,debug=True)
\ No newline at end of file
@@ -1,17 +1,43 @@
 # app_work.py
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, request, jsonify
+from db_pool import init_app
+from cache import init_app as cache_init_app
+from changes import init_app as changes_init_app
+from metrics import init_app as metrics_init_app
+from pagination import COUNT_MODES, PaginationError
+from conditional import (PreconditionFailed, record_validators, collection_validators, is_fresh,
+                         not_modified, with_validators, check_if_match, precondition_failed)
 from ws_crud_work import (
-    create_work, get_work, list_works, update_work, patch_work, delete_work
+    DB_FILE, get_conn, create_work, get_work, list_works, update_work, patch_work, delete_work
 )
 
+# Rutas /works en un Blueprint para poder montarlas tambien en gateway.py
+bp = Blueprint("work_service", __name__)
+
 app = Flask(__name__)
+init_app(app)
+cache_init_app(app)
+changes_init_app(app, DB_FILE)
+app.register_error_handler(PreconditionFailed, precondition_failed)
+metrics_init_app(app)
+
+def if_match(row):
+    # Verificacion para ws_crud_work: If-Match de la peticion contra la fila actual
+    check_if_match("work", row)
 
-@app.get("/")
+def work_response(row, status=200):
+    # JSON del work con ETag/Last-Modified; 304 sin serializar si el cliente ya lo tiene
+    etag, last_modified = record_validators("work", row)
+    if request.method == "GET" and is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+    return with_validators(jsonify(row), etag, last_modified), status
+
+@bp.get("/")
 def health():
     return {"service": "works", "status": "ok"}
 
 # --------- CREATE ---------
-@app.post("/works")
+@bp.post("/works")
 def api_create_work():
     data = request.get_json(silent=True) or {}
     title = data.get("title")
@@ -20,40 +46,52 @@ def api_create_work():
         return jsonify({"error": "El campo 'title' es obligatorio"}), 400
     try:
         row = create_work(title, theme)
-        return jsonify(row), 201
+        return work_response(row, 201)
     except Exception as e:
         return jsonify({"error": f"Error interno: {e}"}), 500
 
 # --------- READ ALL ---------
-@app.get("/works")
+@bp.get("/works")
 def api_list_works():
+    # ?q= busca por prefijo en título/tema (FTS5); order=asc|desc|relevance
     q = request.args.get("q")
     theme = request.args.get("theme")
     order = request.args.get("order", "desc")
+    cursor = request.args.get("cursor") or None
+    count = request.args.get("count")  # por defecto: exacto por offset, estimado con cursor
     try:
         limit = int(request.args.get("limit", 20))
         offset = int(request.args.get("offset", 0))
     except ValueError:
         return jsonify({"error": "limit/offset deben ser enteros"}), 400
+    if count is not None and count not in COUNT_MODES:
+        return jsonify({"error": f"count debe ser uno de: {', '.join(COUNT_MODES)}"}), 400
 
     limit = max(1, min(100, limit))
     offset = max(0, offset)
+    with get_conn() as c:
+        etag, last_modified = collection_validators(c, ["work"])
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
     try:
-        payload = list_works(q=q, theme=theme, limit=limit, offset=offset, order=order)
-        return jsonify(payload), 200
+        payload = list_works(q=q, theme=theme, limit=limit, offset=offset, order=order,
+                             cursor=cursor, count=count)
+        return with_validators(jsonify(payload), etag, last_modified), 200
+    except PaginationError as pe:
+        return jsonify({"error": str(pe)}), 400
     except Exception as e:
         return jsonify({"error": f"Error interno: {e}"}), 500
 
 # --------- READ ONE ---------
-@app.get("/works/<int:work_id>")
+@bp.get("/works/<int:work_id>")
 def api_get_work(work_id: int):
     row = get_work(work_id)
     if not row:
         return jsonify({"message": f"Work con ID {work_id} no encontrado"}), 404
-    return jsonify(row), 200
+    return work_response(row)
 
 # --------- UPDATE (PUT) ---------
-@app.put("/works/<int:work_id>")
+@bp.put("/works/<int:work_id>")
 def api_update_work(work_id: int):
     data = request.get_json(silent=True) or {}
     title = data.get("title")
@@ -61,31 +99,34 @@ def api_update_work(work_id: int):
     if not title:
         return jsonify({"error": "El campo 'title' es obligatorio"}), 400
 
-    row = update_work(work_id, title, theme)
+    row = update_work(work_id, title, theme, check=if_match)
     if not row:
         return jsonify({"message": f"Work con ID {work_id} no encontrado"}), 404
-    return jsonify(row), 200
+    return work_response(row)
 
 # --------- PATCH (partial) ---------
-@app.patch("/works/<int:work_id>")
+@bp.patch("/works/<int:work_id>")
 def api_patch_work(work_id: int):
     data = request.get_json(silent=True) or {}
     try:
-        row = patch_work(work_id, data)
+        row = patch_work(work_id, data, check=if_match)
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 400
     if not row:
         return jsonify({"message": f"Work con ID {work_id} no encontrado"}), 404
-    return jsonify(row), 200
+    return work_response(row)
 
 # --------- DELETE ---------
-@app.delete("/works/<int:work_id>")
+@bp.delete("/works/<int:work_id>")
 def api_delete_work(work_id: int):
-    ok = delete_work(work_id)
+    ok = delete_work(work_id, check=if_match)
     if not ok:
         return jsonify({"message": f"Work con ID {work_id} no encontrado para eliminar"}), 404
     return jsonify({"message": f"Work con ID {work_id} eliminado con éxito"}), 200
 
+app.register_blueprint(bp)
+
 if __name__ == "__main__":
     # corre en 8001, para no chocar con app_edition.py (8000)
+    # Servidor de desarrollo; en produccion: python serve.py app_work
     app.run(host="0.0.0.0", port=8001, debug=True)
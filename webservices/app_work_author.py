@@ -1,22 +1,35 @@
+import os
 import sqlite3
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request
+from db_pool import get_db, init_app
+from metrics import init_app as metrics_init_app
+from migrations import ensure_schema
+from filters import FilterError, parse_query
+from pagination import SortKey, PaginationError, fetch_page, count_rows, parse_page_args, page_response
 
 # --- CONFIGURACIÓN DE LA BASE DE DATOS ---
-DATABASE_NAME = 'crud_peme.db'
+# Una sola base para todos los servicios con LIBRARY_DB (ver gateway.py)
+DATABASE_NAME = os.environ.get('LIBRARY_DB', 'crud_peme.db')
 
 def get_db_connection():
-    """Establece la conexión a la base de datos SQLite."""
-    # La conexión NO requiere host, puerto, usuario o contraseña
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row  # Esto permite acceder a las columnas por nombre
-    return conn
+    """Devuelve la conexión del pool asociada a la petición actual."""
+    # La conexión se reutiliza entre peticiones y se devuelve al pool en el teardown
+    return get_db(DATABASE_NAME)
+
+# Rutas en un Blueprint para poder montarlas tambien en gateway.py
+bp = Blueprint('work_author_service', __name__)
 
 app = Flask(__name__)
+init_app(app)
+metrics_init_app(app)
+
+# Crea/actualiza el esquema compartido (work, author, work_author...) al arrancar
+ensure_schema(DATABASE_NAME)
 
 # --- SERVICIOS CRUD PARA work_author ---
 
 # 1. CREATE (Crear una nueva relación)
-@app.route('/work_author', methods=['POST'])
+@bp.route('/work_author', methods=['POST'])
 def create_work_author():
     data = request.get_json()
     work_id = data.get('work_id')
@@ -33,7 +46,6 @@ def create_work_author():
             (work_id, author_id)
         )
         conn.commit()
-        conn.close()
         return jsonify({'message': 'Relación work_author creada con éxito', 'work_id': work_id, 'author_id': author_id}), 201
     except sqlite3.IntegrityError:
         # Se activa si la PK ya existe o si las FK son inválidas
@@ -41,23 +53,30 @@ def create_work_author():
     except Exception as e:
         return jsonify({'error': f'Error al crear la relación: {e}'}), 500
 
-# 2. READ All (Listar todas las relaciones)
-@app.route('/work_author', methods=['GET'])
+# 2. READ All (Listar todas las relaciones, paginado por cursor)
+WORK_AUTHOR_KEYS = [SortKey('work_id'), SortKey('author_id')]
+
+@bp.route('/work_author', methods=['GET'])
 def get_all_work_authors():
-    conn = get_db_connection()
-    # Selecciona todos los registros
-    relations = conn.execute("SELECT work_id, author_id FROM work_author").fetchall()
-    conn.close()
-    
-    # Convierte los objetos Row de SQLite a una lista de diccionarios
-    relations_list = [dict(relation) for relation in relations]
-    
-    return jsonify(relations_list), 200
+    try:
+        limit, cursor, count = parse_page_args()
+        # Filtros opcionales ?work_id= / ?author_id= (también __in), ver filters.py
+        where, params, keys = parse_query("work_author", WORK_AUTHOR_KEYS)
+        conn = get_db_connection()
+        # Página de relaciones ordenada por su clave primaria (work_id, author_id)
+        relations_list, next_cursor = fetch_page(
+            conn, "work_author", keys, limit, cursor, where, params, columns="work_id, author_id"
+        )
+    except (PaginationError, FilterError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    total = count_rows(conn, "work_author", count, where, params)
+    return page_response(relations_list, next_cursor, total), 200
 
 # 3. READ One (Buscar una relación específica)
 # Usamos los dos IDs en el cuerpo de la solicitud (Body) para ser más práctico para PK compuestas.
 # Se podría hacer con query parameters, pero esta es una forma robusta.
-@app.route('/work_author/search', methods=['POST'])
+@bp.route('/work_author/search', methods=['POST'])
 def get_single_work_author():
     data = request.get_json()
     work_id = data.get('work_id')
@@ -71,7 +90,6 @@ def get_single_work_author():
         "SELECT work_id, author_id FROM work_author WHERE work_id = ? AND author_id = ?",
         (work_id, author_id)
     ).fetchone()
-    conn.close()
 
     if relation is None:
         return jsonify({'error': 'Relación no encontrada.'}), 404
@@ -79,7 +97,7 @@ def get_single_work_author():
     return jsonify(dict(relation)), 200
 
 # 4. DELETE (Borrar una relación específica)
-@app.route('/work_author', methods=['DELETE'])
+@bp.route('/work_author', methods=['DELETE'])
 def delete_work_author():
     data = request.get_json()
     work_id = data.get('work_id')
@@ -98,12 +116,13 @@ def delete_work_author():
     
     # Verifica si se eliminó alguna fila
     if cursor.rowcount == 0:
-        conn.close()
         return jsonify({'error': 'Relación no encontrada para borrar.'}), 404
     
-    conn.close()
     return jsonify({'message': 'Relación work_author eliminada con éxito.'}), 200
 
+app.register_blueprint(bp)
+
 if __name__ == '__main__':
     # Ejecuta la aplicación. En Codespaces, el host debe ser '0.0.0.0'
+    # Servidor de desarrollo; en produccion: python serve.py app_work_author
     app.run(host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
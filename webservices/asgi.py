@@ -0,0 +1,256 @@
+# asgi.py
+# Modo ASGI para los servicios: un servidor asincrono (uvicorn) sostiene miles de
+# conexiones keep-alive en un solo proceso y cada peticion corre la app Flask en un
+# pool acotado de hilos, del mismo tamano que el pool de SQLite (DB_POOL_SIZE), asi
+# que nunca hay mas peticiones usando la base que conexiones. Las rutas y las
+# respuestas son las mismas que con app.run(); las respuestas en streaming
+# (NDJSON/CSV) se envian por partes con contrapresion, y si el cliente se desconecta
+# a mitad se deja de generar la respuesta (el iterable WSGI se cierra).
+#
+#   uvicorn asgi:gateway --port 8000        (o asgi:ws_crud, asgi:app_work, asgi:app_edition, ...)
+#   python asgi.py ws_crud --port 8000
+#
+# uvicorn es opcional (pip install uvicorn); el adaptador solo usa la biblioteca estandar.
+import argparse
+import asyncio
+import importlib
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from db_pool import POOL_SIZE
+
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", str(POOL_SIZE)))
+ASGI_MAX_BODY = int(os.environ.get("ASGI_MAX_BODY", str(64 * 1024 * 1024)))
+ASGI_KEEPALIVE = int(os.environ.get("ASGI_KEEPALIVE", "75"))
+# Partes de la respuesta que la app puede adelantar antes de esperar al cliente
+STREAM_BUFFER = 8
+
+APPS = ("gateway", "ws_crud", "app_work", "app_edition", "app_work_author")
+
+
+class ClientDisconnected(Exception):
+    """El cliente cerro la conexion antes de terminar de enviar el cuerpo."""
+
+
+def _environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": str(client[0]),
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # El cuerpo ya se leyo completo (tambien si llego con Transfer-Encoding: chunked)
+    environ["CONTENT_LENGTH"] = str(len(body))
+    return environ
+
+
+class WsgiToAsgi:
+    """Adapta una app WSGI a ASGI ejecutando cada peticion en `executor`."""
+
+    def __init__(self, wsgi_app: Callable, threads: int = ASGI_THREADS):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="asgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Tipo de conexion ASGI no soportado: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive) -> Optional[bytes]:
+        """Cuerpo completo de la peticion; None si supera ASGI_MAX_BODY."""
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnected()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > ASGI_MAX_BODY:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        # Con el cuerpo ya leido, receive() solo vuelve cuando el cliente se desconecta
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    @staticmethod
+    async def _drain(messages: asyncio.Queue, worker: asyncio.Future):
+        # Vacia la cola hasta que el hilo termine, por si esta esperando lugar en ella
+        while not worker.done():
+            try:
+                messages.get_nowait()
+            except asyncio.QueueEmpty:
+                await asyncio.sleep(0.01)
+
+    async def _http(self, scope, receive, send):
+        try:
+            body = await self._read_body(receive)
+        except ClientDisconnected:
+            return  # nadie espera la respuesta
+        if body is None:
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b'{"error": "Cuerpo demasiado grande"}'})
+            return
+
+        loop = asyncio.get_running_loop()
+        messages: asyncio.Queue = asyncio.Queue(STREAM_BUFFER)
+        cancelled = threading.Event()
+
+        def put(message: Dict[str, Any]):
+            # Desde el hilo: espera lugar en la cola (contrapresion) salvo que el cliente se haya ido
+            if cancelled.is_set():
+                return
+            future = asyncio.run_coroutine_threadsafe(messages.put(message), loop)
+            future.result()
+
+        def run():
+            response: List[Tuple[str, List[Tuple[str, str]]]] = []
+            headers_sent = False
+
+            def start_response(status, headers, exc_info=None):
+                if exc_info and headers_sent:
+                    raise exc_info[1].with_traceback(exc_info[2])
+                response[:] = [(status, headers)]
+                return write
+
+            def send_start():
+                nonlocal headers_sent
+                status, headers = response[0]
+                put({"type": "http.response.start", "status": int(status.split(" ", 1)[0]),
+                     "headers": [(name.lower().encode("latin1"), value.encode("latin1"))
+                                 for name, value in headers]})
+                headers_sent = True
+
+            def write(data: bytes):
+                # Tambien para las apps que escriben con el write() de start_response (PEP 3333)
+                if not response:
+                    raise RuntimeError("write() antes de start_response()")
+                if not data:
+                    return
+                if not headers_sent:
+                    send_start()
+                put({"type": "http.response.body", "body": data, "more_body": True})
+
+            try:
+                result = self.wsgi_app(_environ(scope, body), start_response)
+                try:
+                    for chunk in result:
+                        if cancelled.is_set():
+                            break
+                        write(chunk)
+                finally:
+                    if hasattr(result, "close"):
+                        result.close()
+                if not headers_sent:
+                    send_start()
+                put({"type": "http.response.body", "body": b"", "more_body": False})
+            except BaseException as error:
+                put({"type": "error", "error": error})
+
+        worker = loop.run_in_executor(self.executor, run)
+        disconnect = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            while True:
+                getter = asyncio.ensure_future(messages.get())
+                await asyncio.wait((getter, disconnect), return_when=asyncio.FIRST_COMPLETED)
+                if disconnect.done():
+                    # El cliente se fue: el hilo deja de iterar y cierra el iterable WSGI
+                    getter.cancel()
+                    cancelled.set()
+                    await self._drain(messages, worker)
+                    return
+                message = getter.result()
+                if message["type"] == "error":
+                    raise message["error"]
+                await send(message)
+                if message["type"] == "http.response.body" and not message.get("more_body"):
+                    break
+        except BaseException:
+            # Cliente desconectado o error: el hilo deja de generar y se libera la cola
+            cancelled.set()
+            await self._drain(messages, worker)
+            raise
+        finally:
+            disconnect.cancel()
+            await worker
+
+
+_adapters: Dict[str, WsgiToAsgi] = {}
+
+
+def asgi_app(name: str) -> WsgiToAsgi:
+    """Adaptador ASGI (uno por proceso) de la app Flask del modulo `name`."""
+    if name not in APPS:
+        raise ValueError(f"App desconocida: {name} (opciones: {', '.join(APPS)})")
+    if name not in _adapters:
+        _adapters[name] = WsgiToAsgi(importlib.import_module(name).app)
+    return _adapters[name]
+
+
+def __getattr__(name: str):
+    # `uvicorn asgi:ws_crud` importa solo la app pedida (cada una abre su base al importarse)
+    if name in APPS:
+        return asgi_app(name)
+    raise AttributeError(name)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sirve una app Flask en modo ASGI con uvicorn")
+    parser.add_argument("app", choices=APPS)
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        print("El modo ASGI necesita uvicorn: pip install uvicorn")
+        return 2
+    uvicorn.run(asgi_app(args.app), host=args.host, port=args.port, lifespan="on",
+                timeout_keep_alive=ASGI_KEEPALIVE)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
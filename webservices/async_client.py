@@ -0,0 +1,572 @@
+# async_client.py
+# Cliente asincrono (asyncio) para recorridos masivos del catalogo: decenas de miles de
+# GET /edition/<id> o /item/<id> en paralelo, exportaciones en streaming y cargas por
+# lotes contra ws_crud.py (o gateway.py).
+#
+#   python async_client.py fetch edition 1-50000 --out ediciones.ndjson   # GET concurrentes por id
+#   python async_client.py export catalogo.ndjson                         # work, author, work_author, edition, item
+#   python async_client.py import catalogo.ndjson --url http://otro:8000
+#
+#   async with AsyncLibraryClient("http://localhost:8000") as api:
+#       editions = await api.edition.get_many(range(1, 50001))
+#       async for item in api.item.export(status="loaned"):     # NDJSON en streaming
+#           ...
+#
+# HTTP/1.1 con keep-alive sobre asyncio.open_connection (biblioteca estandar, no hace
+# falta aiohttp): hasta `limit` conexiones abiertas, que se reutilizan entre
+# peticiones. La concurrencia de los lotes esta acotada por `concurrency`, y los
+# resultados pasan por una cola del mismo tamano: si quien consume es mas lento, las
+# peticiones nuevas esperan (contrapresion). Las exportaciones se leen del socket
+# a medida que se iteran, asi que el servidor tambien espera al consumidor.
+# Timeouts y reintentos siguen la misma politica que client.py (y su configuracion).
+import argparse
+import asyncio
+import json
+import os
+import random
+import ssl
+import sys
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from client import (CLIENT_BACKOFF, CLIENT_CONNECT_TIMEOUT, CLIENT_POOL_SIZE, CLIENT_READ_TIMEOUT,
+                    CLIENT_RETRIES, IDEMPOTENT, LIBRARY_URL, RETRY_STATUS, ApiError)
+
+CLIENT_CONCURRENCY = int(os.environ.get("CLIENT_CONCURRENCY", "32"))
+NDJSON = "application/x-ndjson"
+READ_SIZE = 64 * 1024
+# Filas por POST /<tabla>/_bulk al importar (el servidor acepta hasta MAX_BULK_ROWS)
+IMPORT_BATCH = 5000
+# Orden de exportacion/importacion: primero las tablas a las que apuntan las demas
+CATALOG_TABLES = ("work", "author", "work_author", "edition", "item")
+# Columnas que apuntan a otra tabla: al importar se traducen a los ids nuevos
+FOREIGN_KEYS = {
+    "work_author": {"work_id": "work", "author_id": "author"},
+    "edition": {"work_id": "work"},
+    "item": {"edition_id": "edition"},
+}
+
+
+class AsyncApiError(ApiError):
+    """Respuesta de error del servicio (status >= 400); se captura tambien como client.ApiError."""
+
+    def __init__(self, method: str, url: str, status: int, body: bytes):
+        self.response = None
+        self.status = status
+        try:
+            self.payload = json.loads(body)
+        except ValueError:
+            self.payload = None
+        message = None
+        if isinstance(self.payload, dict):
+            message = self.payload.get("error") or self.payload.get("message")
+        Exception.__init__(self, f"{method} {url} -> {status}: "
+                                 f"{message or body[:200].decode('utf8', 'replace')}")
+
+
+class _NotSent(ConnectionError):
+    """La peticion no llego al servidor: se puede repetir aunque no sea idempotente."""
+
+
+class Response:
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    def close(self):
+        self.writer.close()
+
+
+class _Head:
+    def __init__(self, status: int, headers: Dict[str, str], reusable: bool, body: bool):
+        self.status = status
+        self.headers = headers
+        self.reusable = reusable
+        self.body = body
+
+
+class AsyncLibraryClient:
+    """Pool de conexiones HTTP/1.1 keep-alive con reintentos y fan-out acotado."""
+
+    def __init__(self, base_url: Optional[str] = None, limit: int = CLIENT_POOL_SIZE,
+                 concurrency: int = CLIENT_CONCURRENCY, timeout: Optional[Tuple[float, float]] = None,
+                 retries: int = CLIENT_RETRIES, backoff: float = CLIENT_BACKOFF):
+        parts = urlsplit((base_url or LIBRARY_URL).rstrip("/"))
+        secure = parts.scheme == "https"
+        self.base_url = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if secure else 80)
+        self.netloc = parts.netloc
+        self.prefix = parts.path
+        self.ssl = ssl.create_default_context() if secure else None
+        self.concurrency = concurrency
+        self.timeout = timeout or (CLIENT_CONNECT_TIMEOUT, CLIENT_READ_TIMEOUT)
+        self.retries = retries
+        self.backoff = backoff
+        self._idle: List[_Connection] = []
+        self._slots = asyncio.Semaphore(limit)
+
+        # Mismos recursos y operaciones que ws_crud.py
+        self.work = AsyncResource(self, "work")
+        self.author = AsyncResource(self, "author")
+        self.edition = AsyncResource(self, "edition")
+        self.item = AsyncItemResource(self, "item")
+        self.work_author = AsyncWorkAuthorResource(self, "work_author")
+
+    # ---------- Conexiones ----------
+    async def _acquire(self) -> _Connection:
+        await self._slots.acquire()
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.reader.at_eof():
+                conn.reused = True
+                return conn
+            conn.close()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self.ssl, limit=READ_SIZE), self.timeout[0])
+        except (OSError, asyncio.TimeoutError) as error:
+            self._slots.release()
+            raise _NotSent(f"No se pudo conectar a {self.netloc}: {error}") from error
+        return _Connection(reader, writer)
+
+    def _release(self, conn: _Connection, reusable: bool):
+        if reusable:
+            self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        for conn in idle:
+            try:
+                await conn.writer.wait_closed()
+            except OSError:
+                pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # ---------- HTTP/1.1 ----------
+    def _read(self, awaitable: Awaitable) -> Awaitable:
+        return asyncio.wait_for(awaitable, self.timeout[1])
+
+    async def _send(self, conn: _Connection, method: str, target: str, body: bytes,
+                    content_type: Optional[str]) -> _Head:
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.netloc}", "Connection: keep-alive",
+                 "Accept-Encoding: identity", f"Content-Length: {len(body)}"]
+        if content_type:
+            lines.append(f"Content-Type: {content_type}")
+        conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin1") + body)
+        await conn.writer.drain()
+
+        status_line = await self._read(conn.reader.readline())
+        if not status_line:
+            # Una conexion reutilizada que el servidor ya habia cerrado: no recibio la peticion
+            if conn.reused:
+                raise _NotSent("Conexion keep-alive cerrada por el servidor")
+            raise ConnectionError("El servidor cerro la conexion sin responder")
+        version, status = status_line.decode("latin1").split(" ", 2)[:2]
+        headers: Dict[str, str] = {}
+        while True:
+            line = await self._read(conn.reader.readline())
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        status = int(status)
+        body = method != "HEAD" and status not in (204, 304) and status >= 200
+        framed = not body or "content-length" in headers or headers.get("transfer-encoding", "").lower() == "chunked"
+        reusable = (version == "HTTP/1.1" and framed and headers.get("connection", "").lower() != "close")
+        return _Head(status, headers, reusable, body)
+
+    async def _chunks(self, conn: _Connection, head: _Head) -> AsyncIterator[bytes]:
+        reader = conn.reader
+        if not head.body:
+            return
+        if head.headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await self._read(reader.readline())).split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    while (await self._read(reader.readline())) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                yield (await self._read(reader.readexactly(size + 2)))[:-2]
+        elif "content-length" in head.headers:
+            remaining = int(head.headers["content-length"])
+            while remaining:
+                chunk = await self._read(reader.read(min(remaining, READ_SIZE)))
+                if not chunk:
+                    raise ConnectionError("Respuesta incompleta")
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            while True:
+                chunk = await self._read(reader.read(READ_SIZE))
+                if not chunk:
+                    return
+                yield chunk
+
+    async def _body(self, conn: _Connection, head: _Head) -> AsyncIterator[bytes]:
+        # Devuelve la conexion al pool solo si el cuerpo se leyo completo
+        done = False
+        try:
+            async for chunk in self._chunks(conn, head):
+                yield chunk
+            done = True
+        finally:
+            self._release(conn, done and head.reusable)
+
+    async def _read_all(self, conn: _Connection, head: _Head) -> bytes:
+        return b"".join([chunk async for chunk in self._body(conn, head)])
+
+    def _target(self, path: str, params: Optional[Dict[str, Any]]) -> str:
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        return f"{self.prefix}{path}" + (f"?{urlencode(params)}" if params else "")
+
+    async def _open(self, method: str, path: str, params: Optional[Dict[str, Any]], body: bytes,
+                    content_type: Optional[str], ok: Iterable[int]) -> Tuple[_Connection, _Head]:
+        """Envia la peticion con reintentos y devuelve la conexion con el cuerpo por leer."""
+        method = method.upper()
+        target = self._target(path, params)
+        attempt = 0
+        while True:
+            conn = None
+            retry_after = None
+            try:
+                conn = await self._acquire()
+                head = await self._send(conn, method, target, body, content_type)
+            except _NotSent:
+                if conn is not None:
+                    self._release(conn, False)
+                if attempt >= self.retries:
+                    raise
+            except (OSError, EOFError, ValueError, asyncio.TimeoutError):
+                if conn is not None:
+                    self._release(conn, False)
+                if attempt >= self.retries or method not in IDEMPOTENT:
+                    raise
+            else:
+                if head.status < 400 or head.status in ok:
+                    return conn, head
+                data = await self._read_all(conn, head)
+                locked = b"locked" in data or "agotado".encode() in data
+                retry = (head.status in RETRY_STATUS
+                         or (head.status == 500 and (method in IDEMPOTENT or locked)))
+                if not retry or attempt >= self.retries:
+                    raise AsyncApiError(method, f"{self.base_url}{target}", head.status, data)
+                retry_after = head.headers.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                await asyncio.sleep(int(retry_after))
+            else:
+                await asyncio.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+            attempt += 1
+
+    async def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                      json_body: Any = None, ok: Iterable[int] = (), body: Optional[bytes] = None,
+                      content_type: Optional[str] = None) -> Response:
+        """Peticion completa; AsyncApiError si el status es >= 400 y no esta en `ok`."""
+        if json_body is not None:
+            body, content_type = json.dumps(json_body).encode(), "application/json"
+        conn, head = await self._open(method, path, params, body or b"", content_type, ok)
+        return Response(head.status, head.headers, await self._read_all(conn, head))
+
+    async def get_json(self, path: str, **params) -> Any:
+        return (await self.request("GET", path, params)).json()
+
+    async def stream(self, path: str, params: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Filas de una respuesta NDJSON a medida que llegan (GET ...?stream=ndjson)."""
+        conn, head = await self._open("GET", path, dict(params or {}, stream="ndjson"), b"", None, ())
+        buffer = b""
+        async for chunk in self._body(conn, head):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if buffer.strip():
+            yield json.loads(buffer)
+
+    async def pages(self, path: str, params: Optional[Dict[str, Any]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Paginas de una coleccion siguiendo X-Next-Cursor."""
+        params = dict(params or {})
+        while True:
+            response = await self.request("GET", path, params)
+            items = response.json()
+            yield items
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor or not items:
+                return
+            params["cursor"] = cursor
+
+    # ---------- Fan-out acotado ----------
+    async def map_unordered(self, fn: Callable[[Any], Awaitable[Any]], values: Iterable[Any],
+                            concurrency: Optional[int] = None) -> AsyncIterator[Tuple[Any, Any]]:
+        """(valor, resultado) a medida que terminan, con a lo sumo `concurrency` en vuelo.
+
+        Los resultados pasan por una cola acotada: si no se consumen, no se lanzan mas
+        peticiones. Un error de `fn` cancela el resto y se propaga.
+        """
+        concurrency = concurrency or self.concurrency
+        results: asyncio.Queue = asyncio.Queue(concurrency)
+        values = iter(values)
+        finished = object()
+
+        async def worker():
+            try:
+                for value in values:
+                    await results.put((value, await fn(value)))
+            except BaseException as error:
+                await results.put((finished, error))
+                raise
+            await results.put((finished, None))
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            running = len(workers)
+            while running:
+                value, result = await results.get()
+                if value is finished:
+                    running -= 1
+                    if result is not None:
+                        raise result
+                    continue
+                yield value, result
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+class AsyncResource:
+    """CRUD de /<name> como en ws_crud.py."""
+
+    def __init__(self, client: AsyncLibraryClient, name: str):
+        self.client = client
+        self.name = name
+        self.path = f"/{name}"
+
+    async def list(self, **params) -> List[Dict[str, Any]]:
+        """Una pagina (filtros, limit, cursor... como query string)."""
+        return await self.client.get_json(self.path, **params)
+
+    async def iter(self, **params) -> AsyncIterator[Dict[str, Any]]:
+        """Todos los registros, pagina a pagina por cursor."""
+        async for page in self.client.pages(self.path, params):
+            for record in page:
+                yield record
+
+    def export(self, **params) -> AsyncIterator[Dict[str, Any]]:
+        """Todos los registros (con filtros) en una sola respuesta NDJSON en streaming."""
+        return self.client.stream(self.path, params)
+
+    async def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        response = await self.client.request("GET", f"{self.path}/{record_id}", ok=(404,))
+        return None if response.status == 404 else response.json()
+
+    async def get_many(self, ids: Iterable[int], concurrency: Optional[int] = None
+                       ) -> Dict[int, Optional[Dict[str, Any]]]:
+        """{id: registro o None} con GET concurrentes (a lo sumo `concurrency` a la vez)."""
+        return {record_id: record async for record_id, record
+                in self.client.map_unordered(self.get, dict.fromkeys(ids), concurrency)}
+
+    async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return (await self.client.request("POST", self.path, json_body=data)).json()
+
+    async def update(self, record_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        return (await self.client.request("PUT", f"{self.path}/{record_id}", json_body=data)).json()
+
+    async def delete(self, record_id: int) -> Dict[str, Any]:
+        return (await self.client.request("DELETE", f"{self.path}/{record_id}")).json()
+
+    async def bulk(self, method: str, rows: List[Any], atomic: bool = False) -> Dict[str, Any]:
+        """POST/PUT/DELETE /<name>/_bulk con cuerpo NDJSON; 207 y 409 devuelven el detalle."""
+        body = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode()
+        response = await self.client.request(method, f"{self.path}/_bulk", {"atomic": 1} if atomic else None,
+                                             ok=(207, 409), body=body, content_type=NDJSON)
+        return response.json()
+
+
+class AsyncItemResource(AsyncResource):
+    async def checkout(self, item_id: int) -> Dict[str, Any]:
+        return (await self.client.request("POST", f"{self.path}/{item_id}/checkout")).json()
+
+    async def return_(self, item_id: int) -> Dict[str, Any]:
+        return (await self.client.request("POST", f"{self.path}/{item_id}/return")).json()
+
+
+class AsyncWorkAuthorResource(AsyncResource):
+    """/work_author: clave compuesta, sin GET/PUT por id."""
+
+    async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await super().create({"work_id": data["work_id"], "author_id": data["author_id"]})
+
+    async def delete(self, work_id: int, author_id: int) -> Dict[str, Any]:
+        return (await self.client.request("DELETE", f"{self.path}/{work_id}/{author_id}")).json()
+
+
+# ---------- CLI ----------
+def parse_ids(spec: str) -> List[int]:
+    """'1-100,250,300-310' (o '-' para leerlos de stdin, uno por linea)."""
+    if spec == "-":
+        return [int(line) for line in sys.stdin if line.strip()]
+    ids: List[int] = []
+    for part in spec.split(","):
+        first, _, last = part.partition("-")
+        ids.extend(range(int(first), int(last or first) + 1))
+    return ids
+
+
+async def fetch(api: AsyncLibraryClient, table: str, ids: List[int], out) -> Dict[str, int]:
+    resource = getattr(api, table)
+    counts = {"found": 0, "missing": 0, "errors": 0}
+
+    async def get(record_id):
+        try:
+            return await resource.get(record_id)
+        except (ApiError, OSError, EOFError, asyncio.TimeoutError) as error:
+            return error
+
+    async for record_id, result in api.map_unordered(get, ids):
+        if isinstance(result, Exception):
+            counts["errors"] += 1
+            print(f"{table} {record_id}: {result}", file=sys.stderr)
+        elif result is None:
+            counts["missing"] += 1
+        else:
+            counts["found"] += 1
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return counts
+
+
+async def export(api: AsyncLibraryClient, tables: List[str], out) -> Dict[str, int]:
+    counts = {}
+    for table in tables:
+        counts[table] = 0
+        async for row in getattr(api, table).export():
+            out.write(json.dumps({"table": table, "row": row}, ensure_ascii=False) + "\n")
+            counts[table] += 1
+    return counts
+
+
+async def import_catalog(api: AsyncLibraryClient, lines: Iterable[str], concurrency: int) -> Dict[str, Dict[str, int]]:
+    """Carga un archivo de `export` en lotes; los ids cambian y las referencias se traducen."""
+    id_maps: Dict[str, Dict[int, int]] = {table: {} for table in CATALOG_TABLES}
+    counts: Dict[str, Dict[str, int]] = {}
+    slots = asyncio.Semaphore(concurrency)
+
+    async def load(table: str, rows: List[Dict[str, Any]]):
+        async with slots:
+            result = await getattr(api, table).bulk("POST", rows)
+        stats = counts.setdefault(table, {"created": 0, "errors": 0})
+        stats["errors"] += len(result.get("errors", []))
+        for error in result.get("errors", [])[:5]:
+            print(f"{table}: {rows[error['index']]} -> {error['error']}", file=sys.stderr)
+        if "ids" in result:
+            for row, new_id in zip(rows, result["ids"]):
+                if new_id is not None:
+                    id_maps[table][row["id"]] = new_id
+                    stats["created"] += 1
+        else:
+            stats["created"] += result.get("created", 0)
+
+    pending: List[asyncio.Task] = []
+    batch: List[Dict[str, Any]] = []
+    current = None
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        table, row = entry["table"], entry["row"]
+        if table not in CATALOG_TABLES:
+            raise ValueError(f"Tabla desconocida en la exportacion: {table}")
+        if table != current or len(batch) >= IMPORT_BATCH:
+            if batch:
+                pending.append(asyncio.create_task(load(current, batch)))
+            if table != current:
+                # Las referencias de la tabla siguiente necesitan los ids nuevos de esta
+                await asyncio.gather(*pending)
+                pending = []
+            batch, current = [], table
+        # Referencias a los ids nuevos; null queda igual. Si el padre no se importo (fallo o no
+        # estaba en el archivo) la fila se omite: con el id viejo apuntaria a otro registro
+        missing = [column for column, target in FOREIGN_KEYS.get(table, {}).items()
+                   if row.get(column) is not None and row[column] not in id_maps[target]]
+        if missing:
+            stats = counts.setdefault(table, {"created": 0, "errors": 0})
+            stats["errors"] += 1
+            if stats["errors"] <= 5:
+                print(f"{table}: {row} -> sin importar {', '.join(missing)}", file=sys.stderr)
+            continue
+        for column, target in FOREIGN_KEYS.get(table, {}).items():
+            if row.get(column) is not None:
+                row[column] = id_maps[target][row[column]]
+        batch.append(row)
+    if batch:
+        pending.append(asyncio.create_task(load(current, batch)))
+    await asyncio.gather(*pending)
+    return counts
+
+
+async def run(args) -> int:
+    started = time.perf_counter()
+    async with AsyncLibraryClient(args.url, limit=args.connections, concurrency=args.concurrency) as api:
+        if args.command == "fetch":
+            out = open(args.out, "w", encoding="utf8") if args.out else sys.stdout
+            try:
+                counts = await fetch(api, args.table, parse_ids(args.ids), out)
+            finally:
+                if args.out:
+                    out.close()
+        elif args.command == "export":
+            with open(args.file, "w", encoding="utf8") as out:
+                counts = await export(api, args.tables.split(","), out)
+        else:
+            with open(args.file, encoding="utf8") as lines:
+                counts = await import_catalog(api, lines, min(args.concurrency, 4))
+    print(f"{args.command}: {json.dumps(counts, ensure_ascii=False)} en {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--url", default=LIBRARY_URL, help="URL de ws_crud.py o gateway.py")
+    common.add_argument("--concurrency", type=int, default=CLIENT_CONCURRENCY, help="peticiones en vuelo")
+    common.add_argument("--connections", type=int, default=CLIENT_POOL_SIZE, help="conexiones keep-alive")
+    parser = argparse.ArgumentParser(description="Cliente asincrono para recorridos masivos del catalogo")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fetch_cmd = commands.add_parser("fetch", parents=[common],
+                                    help="GET concurrentes por id (NDJSON a stdout o --out)")
+    fetch_cmd.add_argument("table", choices=("work", "author", "edition", "item"))
+    fetch_cmd.add_argument("ids", help="'1-50000', '1,5,9-12' o '-' (stdin)")
+    fetch_cmd.add_argument("--out")
+    export_cmd = commands.add_parser("export", parents=[common], help="exporta el catalogo completo (NDJSON en streaming)")
+    export_cmd.add_argument("file")
+    export_cmd.add_argument("--tables", default=",".join(CATALOG_TABLES))
+    import_cmd = commands.add_parser("import", parents=[common], help="carga un archivo de export con POST /<tabla>/_bulk")
+    import_cmd.add_argument("file")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
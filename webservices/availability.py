@@ -0,0 +1,137 @@
+# availability.py
+# Disponibilidad de ejemplares: contadores por (edicion, status) y (work, status)
+# mantenidos por los triggers de la migracion 7, asi que una consulta es una
+# busqueda por clave primaria y no un GROUP BY sobre item.
+#
+#   python availability.py [library.db] check | rebuild
+import sqlite3
+import sys
+from typing import Any, Dict, Iterable, List, Tuple
+
+STATUSES = ("available", "loaned", "repair", "lost")
+
+# Recalculo completo desde item (tambien lo usa la carga masiva, ver populate_tables.py)
+REBUILD_STATEMENTS = (
+    "DELETE FROM edition_availability",
+    "INSERT INTO edition_availability (edition_id, status, n) "
+    "SELECT edition_id, COALESCE(status, 'unknown'), COUNT(*) FROM item GROUP BY 1, 2",
+    "DELETE FROM work_availability",
+    "INSERT INTO work_availability (work_id, status, n) "
+    "SELECT e.work_id, COALESCE(i.status, 'unknown'), COUNT(*) FROM item i "
+    "JOIN edition e ON e.id = i.edition_id GROUP BY 1, 2",
+)
+
+# (nivel, id, status, esperado, guardado) para cada contador que no coincide con item
+CHECK_SQL = """
+    WITH expected_edition AS (
+        SELECT edition_id AS id, COALESCE(status, 'unknown') AS status, COUNT(*) AS n FROM item GROUP BY 1, 2
+    ), stored_edition AS (
+        SELECT edition_id AS id, status, n FROM edition_availability WHERE n != 0
+    ), expected_work AS (
+        SELECT e.work_id AS id, COALESCE(i.status, 'unknown') AS status, COUNT(*) AS n
+          FROM item i JOIN edition e ON e.id = i.edition_id GROUP BY 1, 2
+    ), stored_work AS (
+        SELECT work_id AS id, status, n FROM work_availability WHERE n != 0
+    ), diff AS (
+        SELECT 'edition' AS level, id, status FROM (SELECT * FROM expected_edition EXCEPT SELECT * FROM stored_edition)
+        UNION SELECT 'edition', id, status FROM (SELECT * FROM stored_edition EXCEPT SELECT * FROM expected_edition)
+        UNION SELECT 'work', id, status FROM (SELECT * FROM expected_work EXCEPT SELECT * FROM stored_work)
+        UNION SELECT 'work', id, status FROM (SELECT * FROM stored_work EXCEPT SELECT * FROM expected_work)
+    )
+    SELECT d.level, d.id, d.status,
+           COALESCE(CASE d.level WHEN 'edition' THEN xe.n ELSE xw.n END, 0) AS expected,
+           COALESCE(CASE d.level WHEN 'edition' THEN se.n ELSE sw.n END, 0) AS stored
+      FROM diff d
+      LEFT JOIN expected_edition xe ON d.level = 'edition' AND xe.id = d.id AND xe.status = d.status
+      LEFT JOIN stored_edition se ON d.level = 'edition' AND se.id = d.id AND se.status = d.status
+      LEFT JOIN expected_work xw ON d.level = 'work' AND xw.id = d.id AND xw.status = d.status
+      LEFT JOIN stored_work sw ON d.level = 'work' AND sw.id = d.id AND sw.status = d.status
+     ORDER BY 1, 2, 3
+"""
+
+
+def _empty() -> Dict[str, int]:
+    return dict.fromkeys(STATUSES + ("total",), 0)
+
+
+def _counts(rows: Iterable[Tuple[Any, str, int]]) -> Dict[Any, Dict[str, int]]:
+    result: Dict[Any, Dict[str, int]] = {}
+    for key, status, n in rows:
+        entry = result.setdefault(key, _empty())
+        if status is not None:
+            entry[status] = entry.get(status, 0) + n
+            entry["total"] += n
+    return result
+
+
+def _lookup(conn: sqlite3.Connection, table: str, column: str, ids: List[int]) -> Dict[int, Dict[str, int]]:
+    marks = ", ".join("?" for _ in ids)
+    rows = conn.execute(f"SELECT {column}, status, n FROM {table} WHERE {column} IN ({marks})", ids).fetchall()
+    counts = _counts(rows)
+    return {i: counts.get(i) or _empty() for i in ids}
+
+
+def edition_counts(conn: sqlite3.Connection, edition_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """{edition_id: {status: n, ..., 'total': n}} leyendo solo los contadores."""
+    return _lookup(conn, "edition_availability", "edition_id", edition_ids)
+
+
+def work_counts(conn: sqlite3.Connection, work_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """{work_id: {status: n, ..., 'total': n}} leyendo solo los contadores."""
+    return _lookup(conn, "work_availability", "work_id", work_ids)
+
+
+def editions_of_work(conn: sqlite3.Connection, work_id: int) -> Dict[int, Dict[str, int]]:
+    """Contadores de cada edicion del work (incluidas las que no tienen items)."""
+    rows = conn.execute(
+        "SELECT e.id, ea.status, ea.n FROM edition e "
+        "LEFT JOIN edition_availability ea ON ea.edition_id = e.id WHERE e.work_id = ?",
+        (work_id,),
+    ).fetchall()
+    return _counts(rows)
+
+
+def check(conn: sqlite3.Connection) -> List[sqlite3.Row]:
+    """Contadores que no coinciden con un recuento desde item (vacio = consistente)."""
+    return conn.execute(CHECK_SQL).fetchall()
+
+
+def rebuild(conn: sqlite3.Connection):
+    """Recalcula todos los contadores desde item en una transaccion BEGIN IMMEDIATE."""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for statement in REBUILD_STATEMENTS:
+            conn.execute(statement)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def main(argv: List[str]) -> int:
+    args = argv[1:]
+    database = args.pop(0) if args and args[0].endswith(".db") else "library.db"
+    command = args.pop(0) if args else "check"
+    conn = sqlite3.connect(database)
+    try:
+        if command == "rebuild":
+            rebuild(conn)
+            print("Contadores recalculados")
+        elif command == "check":
+            problems = check(conn)
+            for level, key, status, expected, stored in problems:
+                print(f"{level} {key} {status}: esperado {expected}, guardado {stored}")
+            print(f"{len(problems)} contadores inconsistentes")
+            return 1 if problems else 0
+        else:
+            print("Uso: python availability.py [library.db] check | rebuild")
+            return 2
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
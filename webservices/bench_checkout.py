@@ -0,0 +1,186 @@
+# bench_checkout.py
+# Benchmark de prestamos con muchos mostradores concurrentes contra ws_crud.py.
+#
+#   python bench_checkout.py --workers 16 --items 50 --seconds 5
+#
+# Fase 1 (carrera): todos los hilos intentan prestar los mismos `--items` ejemplares.
+#   - lectura+PUT: GET /item/<id> y PUT con status='loaned' si estaba disponible
+#   - atomico:     POST /item/<id>/checkout (UPDATE ... WHERE status = 'available')
+#   Cada ejemplar deberia prestarse una sola vez; lo que exceda son prestamos dobles.
+# Fase 2 (rendimiento): cada hilo presta y devuelve sus propios ejemplares durante
+# `--seconds` con POST /checkout y /return, y se reportan ops/s y latencias.
+#
+# Usa una base generada en un directorio temporal; no toca library.db.
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+
+
+def prepare(database: str, works: int, seed: int) -> List[int]:
+    """Genera la base y deja todos los ejemplares disponibles; devuelve sus ids."""
+    from populate_tables import bulk_load, generate
+
+    bulk_load(database, lambda conn: generate(conn, works=works, authors=max(works // 5, 1), seed=seed),
+              foreign_keys=False)
+    conn = sqlite3.connect(database)
+    try:
+        conn.execute("UPDATE item SET status = 'available'")
+        conn.commit()
+        return [row[0] for row in conn.execute("SELECT id FROM item ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def reset(database: str, ids: List[int]):
+    conn = sqlite3.connect(database)
+    try:
+        conn.executemany("UPDATE item SET status = 'available' WHERE id = ?", [(i,) for i in ids])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run_threads(workers: int, target: Callable[[int, Callable], None]) -> float:
+    """Corre `target(n, client)` en `workers` hilos (un test client por hilo); devuelve segundos."""
+    from ws_crud import app
+
+    start = threading.Barrier(workers + 1)
+    errors: List[BaseException] = []
+
+    def body(n):
+        client = app.test_client()
+        start.wait()
+        try:
+            target(n, client)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=body, args=(n,)) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return time.perf_counter() - started
+
+
+# ---------- Fase 1: carrera por los mismos ejemplares ----------
+def loan_naive(client, item_id: int) -> int:
+    item = client.get(f"/item/{item_id}").get_json()
+    if item["status"] != "available":
+        return 409
+    item["status"] = "loaned"
+    return client.put(f"/item/{item_id}", json=item).status_code
+
+
+def loan_atomic(client, item_id: int) -> int:
+    return client.post(f"/item/{item_id}/checkout").status_code
+
+
+def race(workers: int, ids: List[int], loan: Callable) -> Dict[str, float]:
+    results: Counter = Counter()
+    lock = threading.Lock()
+
+    def target(n, client):
+        local = Counter()
+        # Cada hilo recorre los ejemplares desde un desplazamiento distinto
+        for k in range(len(ids)):
+            local[loan(client, ids[(k + n) % len(ids)])] += 1
+        with lock:
+            results.update(local)
+
+    elapsed = run_threads(workers, target)
+    attempts = sum(results.values())
+    return {
+        "prestados": results[200],
+        "conflictos": results[409],
+        "errores": attempts - results[200] - results[409],
+        "dobles": max(results[200] - len(ids), 0),
+        "ops/s": attempts / elapsed if elapsed else 0,
+    }
+
+
+# ---------- Fase 2: rendimiento con escritores concurrentes ----------
+def throughput(workers: int, ids: List[int], seconds: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def target(n, client):
+        own = ids[n::workers]
+        local_latencies, local_statuses = [], Counter()
+        k = 0
+        while own and time.perf_counter() < deadline:
+            item_id = own[k % len(own)]
+            action = "checkout" if (k // len(own)) % 2 == 0 else "return"
+            started = time.perf_counter()
+            local_statuses[client.post(f"/item/{item_id}/{action}").status_code] += 1
+            local_latencies.append(time.perf_counter() - started)
+            k += 1
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    elapsed = run_threads(workers, target)
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "ops": len(latencies),
+        "ops/s": len(latencies) / elapsed if elapsed else 0,
+        "p50 ms": quantiles[49] * 1000,
+        "p99 ms": quantiles[98] * 1000,
+        "errores": len(latencies) - statuses[200],
+    }
+
+
+def report(title: str, result: Dict[str, float]):
+    print(f"{title:<16} " + "  ".join(f"{name}: {value:,.1f}" if isinstance(value, float) else f"{name}: {value}"
+                                      for name, value in result.items()))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de prestamo/devolucion concurrente")
+    parser.add_argument("--workers", type=int, default=16, help="hilos (mostradores) concurrentes")
+    parser.add_argument("--items", type=int, default=50, help="ejemplares en disputa en la fase 1")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duracion de la fase 2")
+    parser.add_argument("--works", type=int, default=2000, help="tamano de la base generada")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    # ws_crud abre 'library.db' relativo al directorio actual: se importa desde el temporal
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ.setdefault("DB_POOL_SIZE", str(args.workers))
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        ids = prepare("library.db", args.works, args.seed)
+        if len(ids) < args.items:
+            parser.error(f"La base generada solo tiene {len(ids)} ejemplares")
+        contested = ids[:args.items]
+        print(f"{len(ids)} ejemplares, {args.workers} hilos, {len(contested)} en disputa")
+
+        reset("library.db", contested)
+        naive = race(args.workers, contested, loan_naive)
+        report("lectura+PUT", naive)
+        reset("library.db", contested)
+        atomic = race(args.workers, contested, loan_atomic)
+        report("atomico", atomic)
+
+        reset("library.db", ids)
+        report("checkout/return", throughput(args.workers, ids, args.seconds))
+        os.chdir(os.path.dirname(tmp))
+    return 1 if atomic["dobles"] or atomic["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+# bench_load.py
+# Pruebas de carga HTTP de los servicios contra una base generada.
+#
+#   python bench_load.py --works 20000 --workers 32 --seconds 20
+#   python bench_load.py --apps ws_crud,gateway --write-ratio 0.3 --launcher serve
+#   python bench_load.py --compare                 # ultima corrida de cada app contra la anterior
+#
+# Cada app se levanta en un subproceso (servidor de desarrollo con hilos, o serve.py
+# con --launcher serve) sobre su propia copia de la base generada (LIBRARY_DB), y
+# --workers hilos con su propia requests.Session ejecutan durante --seconds una mezcla
+# de lecturas y escrituras (--write-ratio). Se reportan ops/s, errores (5xx o fallos
+# de conexion), respuestas 4xx y latencias p50/p95/p99 por operacion, y cada corrida
+# se agrega a --out (JSON por linea) con el commit actual para comparar versiones.
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APPS = ("ws_crud", "app_work", "app_edition", "app_work_author", "gateway")
+# Ruta que responde 200 cuando la app termino de arrancar
+READY = {"ws_crud": "/", "app_work": "/", "app_edition": "/editions?limit=1",
+         "app_work_author": "/work_author?limit=1", "gateway": "/"}
+SEARCH_TERMS = ("work", "title", "novela", "historia", "1", "12")
+STARTUP_TIMEOUT = 60
+
+# write: la operacion modifica la base; call(session, base_url, rng, sizes) -> Response
+Op = namedtuple("Op", "name write call")
+
+
+def _id(rng: random.Random, sizes: Dict[str, int], table: str) -> int:
+    return rng.randint(1, max(sizes[table], 1))
+
+
+CRUD_OPS = [
+    Op("GET /work/<id>", False, lambda s, b, r, n: s.get(f"{b}/work/{_id(r, n, 'work')}")),
+    Op("GET /item?status=", False, lambda s, b, r, n: s.get(f"{b}/item", params={"status": "available", "limit": 50})),
+    Op("GET /edition?work_id=&include=items", False,
+       lambda s, b, r, n: s.get(f"{b}/edition", params={"work_id": _id(r, n, "work"), "include": "items"})),
+    Op("GET /search?q=", False, lambda s, b, r, n: s.get(f"{b}/search", params={"q": r.choice(SEARCH_TERMS)})),
+    Op("GET /item/by-barcode/<code>", False,
+       lambda s, b, r, n: s.get(f"{b}/item/by-barcode/BC{_id(r, n, 'item'):010d}")),
+    Op("GET /work/<id>/availability", False, lambda s, b, r, n: s.get(f"{b}/work/{_id(r, n, 'work')}/availability")),
+    Op("PUT /work/<id>", True, lambda s, b, r, n: s.put(f"{b}/work/{_id(r, n, 'work')}",
+                                                        json={"title": f"Titulo {r.random():.6f}", "theme": "Historia"})),
+    Op("POST /item/<id>/checkout|return", True,
+       lambda s, b, r, n: s.post(f"{b}/item/{_id(r, n, 'item')}/{r.choice(('checkout', 'return'))}")),
+]
+WORK_OPS = [
+    Op("GET /works/<id>", False, lambda s, b, r, n: s.get(f"{b}/works/{_id(r, n, 'work')}")),
+    Op("GET /works?limit=", False, lambda s, b, r, n: s.get(f"{b}/works", params={"limit": 20})),
+    Op("GET /works?q=", False, lambda s, b, r, n: s.get(f"{b}/works", params={"q": r.choice(SEARCH_TERMS)})),
+    Op("PATCH /works/<id>", True, lambda s, b, r, n: s.patch(f"{b}/works/{_id(r, n, 'work')}",
+                                                             json={"theme": r.choice(("Novela", "Ensayo"))})),
+]
+EDITION_OPS = [
+    Op("GET /editions/<id>", False, lambda s, b, r, n: s.get(f"{b}/editions/{_id(r, n, 'edition')}")),
+    Op("GET /editions?work_id=", False,
+       lambda s, b, r, n: s.get(f"{b}/editions", params={"work_id": _id(r, n, "work")})),
+    Op("GET /editions?sort=-year", False, lambda s, b, r, n: s.get(f"{b}/editions", params={"sort": "-year"})),
+    Op("PUT /editions/<id>", True, lambda s, b, r, n: s.put(f"{b}/editions/{_id(r, n, 'edition')}",
+                                                            json={"publisher": f"Publisher {r.randint(1, 200)}"})),
+]
+WORK_AUTHOR_OPS = [
+    Op("GET /work_author?work_id=", False,
+       lambda s, b, r, n: s.get(f"{b}/work_author", params={"work_id": _id(r, n, "work")})),
+    Op("POST /work_author/search", False, lambda s, b, r, n: s.post(
+        f"{b}/work_author/search", json={"work_id": _id(r, n, "work"), "author_id": _id(r, n, "author")})),
+    Op("POST /work_author", True, lambda s, b, r, n: s.post(
+        f"{b}/work_author", json={"work_id": _id(r, n, "work"), "author_id": _id(r, n, "author")})),
+    Op("DELETE /work_author", True, lambda s, b, r, n: s.delete(
+        f"{b}/work_author", json={"work_id": _id(r, n, "work"), "author_id": _id(r, n, "author")})),
+]
+WORKLOADS = {
+    "ws_crud": CRUD_OPS,
+    "app_work": WORK_OPS,
+    "app_edition": EDITION_OPS,
+    "app_work_author": WORK_AUTHOR_OPS,
+    "gateway": CRUD_OPS + WORK_OPS + EDITION_OPS + WORK_AUTHOR_OPS,
+}
+
+
+# ---------- Base y servidores ----------
+def generate_database(path: str, works: int, seed: int) -> Dict[str, int]:
+    """Genera la base de prueba; devuelve el tamano de cada tabla."""
+    sys.path.insert(0, HERE)
+    from populate_tables import bulk_load, generate
+
+    bulk_load(path, lambda conn: generate(conn, works=works, authors=max(works // 5, 1),
+                                          authors_per_work="uniform:1-2", editions_per_work="poisson:1.5",
+                                          items_per_edition="poisson:3", seed=seed), foreign_keys=False)
+    conn = sqlite3.connect(path)
+    try:
+        # Todo en el archivo principal para poder copiarlo
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {table: conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+                for table in ("work", "author", "edition", "item")}
+    finally:
+        conn.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app: str, database: str, port: int, launcher: str) -> subprocess.Popen:
+    env = dict(os.environ, LIBRARY_DB=database, PORT=str(port), HOST="127.0.0.1",
+               PYTHONPATH=os.pathsep.join(filter(None, [HERE, os.environ.get("PYTHONPATH")])))
+    if launcher == "serve":
+        command = [sys.executable, os.path.join(HERE, "serve.py"), app]
+    else:
+        command = [sys.executable, "-c",
+                   "import logging; logging.getLogger('werkzeug').setLevel(logging.ERROR)\n"
+                   f"from {app} import app\n"
+                   f"app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    process = subprocess.Popen(command, cwd=os.path.dirname(database), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{app} termino al arrancar (codigo {process.returncode})")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}{READY[app]}", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{app} no respondio en {STARTUP_TIMEOUT}s")
+
+
+# ---------- Carga ----------
+def run_load(app: str, base_url: str, sizes: Dict[str, int], workers: int, seconds: float,
+             write_ratio: float, seed: int) -> Dict[str, Any]:
+    ops = WORKLOADS[app]
+    reads = [op for op in ops if not op.write] or ops
+    writes = [op for op in ops if op.write] or ops
+    samples: Dict[str, List[float]] = {op.name: [] for op in ops}
+    counts = {op.name: {"errors": 0, "4xx": 0} for op in ops}
+    lock = threading.Lock()
+    start = threading.Barrier(workers + 1)
+
+    def worker(n: int):
+        rng = random.Random(seed * 1000 + n)
+        session = requests.Session()
+        local = {op.name: [] for op in ops}
+        local_counts = {op.name: {"errors": 0, "4xx": 0} for op in ops}
+        start.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            op = rng.choice(writes if rng.random() < write_ratio else reads)
+            started = time.perf_counter()
+            try:
+                status = op.call(session, base_url, rng, sizes).status_code
+            except requests.RequestException:
+                status = 599
+            local[op.name].append(time.perf_counter() - started)
+            if status >= 500:
+                local_counts[op.name]["errors"] += 1
+            elif status >= 400:
+                local_counts[op.name]["4xx"] += 1
+        session.close()
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+                counts[name]["errors"] += local_counts[name]["errors"]
+                counts[name]["4xx"] += local_counts[name]["4xx"]
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {"ops": {}, "total": summarize([v for values in samples.values() for v in values], elapsed,
+                                            sum(c["errors"] for c in counts.values()),
+                                            sum(c["4xx"] for c in counts.values()))}
+    for name, values in samples.items():
+        if values:
+            result["ops"][name] = summarize(values, elapsed, counts[name]["errors"], counts[name]["4xx"])
+    return result
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int, client_errors: int) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99 or [0.0] * 99
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "4xx": client_errors,
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+    }
+
+
+# ---------- Resultados ----------
+def git_commit() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=HERE,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def print_result(record: Dict[str, Any]):
+    print(f"\n{record['app']} @ {record['commit']}{' (con cambios)' if record['dirty'] else ''}")
+    print(f"  {'operacion':<40} {'req':>7} {'req/s':>8} {'err':>5} {'4xx':>5} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, row in list(record["ops"].items()) + [("TOTAL", record["total"])]:
+        print(f"  {name:<40} {row['requests']:>7} {row['rps']:>8.1f} {row['errors']:>5} {row['4xx']:>5} "
+              f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]):
+    """Diferencias de req/s y p95 por operacion entre dos corridas de la misma app."""
+    print(f"\n{current['app']}: {previous['commit']} -> {current['commit']}")
+    for name, row in list(current["ops"].items()) + [("TOTAL", current["total"])]:
+        before = previous["total"] if name == "TOTAL" else previous["ops"].get(name)
+        if not before:
+            continue
+        rps = (row["rps"] / before["rps"] - 1) * 100 if before["rps"] else 0.0
+        p95 = (row["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        print(f"  {name:<40} req/s {rps:+7.1f}%   p95 {p95:+7.1f}%")
+
+
+def previous_run(results: List[Dict[str, Any]], record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # Ultima corrida anterior de la misma app con los mismos parametros
+    for old in reversed(results):
+        if old is not record and old["app"] == record["app"] and old["params"] == record["params"]:
+            return old
+    return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pruebas de carga HTTP de los servicios")
+    parser.add_argument("--apps", default=",".join(APPS), help="apps separadas por coma")
+    parser.add_argument("--works", type=int, default=5000, help="tamano de la base generada")
+    parser.add_argument("--workers", type=int, default=16, help="clientes concurrentes")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duracion por app")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="fraccion de escrituras (0-1)")
+    parser.add_argument("--launcher", choices=("dev", "serve"), default="dev",
+                        help="dev: servidor de Flask con hilos; serve: serve.py (gunicorn)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="bench_results.jsonl", help="archivo donde se agregan los resultados")
+    parser.add_argument("--compare", action="store_true", help="solo compara las dos ultimas corridas de cada app")
+    args = parser.parse_args(argv)
+
+    apps = [app.strip() for app in args.apps.split(",") if app.strip()]
+    unknown = [app for app in apps if app not in APPS]
+    if unknown:
+        parser.error(f"Apps desconocidas: {', '.join(unknown)} (opciones: {', '.join(APPS)})")
+
+    results = load_results(args.out)
+    if args.compare:
+        for app in apps:
+            runs = [r for r in results if r["app"] == app]
+            if len(runs) >= 2:
+                compare(runs[-2], runs[-1])
+        return 0
+
+    params = {key: getattr(args, key) for key in ("works", "workers", "seconds", "write_ratio", "launcher", "seed")}
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.db")
+        sizes = generate_database(template, args.works, args.seed)
+        print(f"Base generada: {', '.join(f'{t}: {n}' for t, n in sizes.items())}")
+        for app in apps:
+            workdir = os.path.join(tmp, app)
+            os.makedirs(workdir)
+            database = os.path.join(workdir, "library.db")
+            shutil.copy(template, database)
+            port = free_port()
+            process = start_server(app, database, port, args.launcher)
+            try:
+                result = run_load(app, f"http://127.0.0.1:{port}", sizes, args.workers, args.seconds,
+                                  args.write_ratio, args.seed)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+            record = dict(app=app, at=datetime.now().isoformat(timespec="seconds"), params=params,
+                          **git_commit(), **result)
+            print_result(record)
+            results.append(record)
+            with open(args.out, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            previous = previous_run(results, record)
+            if previous:
+                compare(previous, record)
+    errors = sum(r["total"]["errors"] for r in results[-len(apps):])
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
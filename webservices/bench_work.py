@@ -0,0 +1,192 @@
+# bench_work.py
+# Micro-benchmarks de la capa de datos de ws_crud_work.py (sin HTTP).
+#
+#   python bench_work.py --sizes 1000,100000,1000000
+#   python bench_work.py --sizes 1000,100000 --save-baseline        # guarda la referencia
+#   python bench_work.py --sizes 1000,100000 --threshold 0.25       # falla si algo empeora >25%
+#
+# Por cada tamano de base (solo works; se genera una vez en --data-dir y se reutiliza)
+# mide cada funcion publica: lecturas con cache frio y caliente, listados por
+# selectividad de la busqueda FTS, profundidad de pagina por offset y por cursor, los
+# modos de conteo, las escrituras, y el costo de init_db() frente a volver a ejecutar
+# las migraciones en cada llamada (lo que hacia antes cada funcion CRUD).
+#
+# Cada caso reporta la mediana y el p95 en microsegundos. Con --baseline existente se
+# compara la mediana de cada caso contra la guardada y se sale con codigo 1 si alguna
+# supera la referencia por mas de --threshold (y por mas de --min-delta microsegundos).
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAGE = 20
+DEPTHS = (1, 10, 100, 1000, 10000)  # en paginas
+
+
+def measure(fn: Callable[[], Any], repeat: int, budget: float) -> Dict[str, float]:
+    """Ejecuta `fn` hasta `repeat` veces (o `budget` segundos); tiempos en microsegundos."""
+    fn()  # calentamiento: planes de consulta y paginas en cache de SQLite
+    times: List[float] = []
+    deadline = time.perf_counter() + budget
+    while len(times) < repeat and (len(times) < 3 or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1e6)
+    times.sort()
+    return {"n": len(times), "median_us": round(statistics.median(times), 1),
+            "p95_us": round(times[min(len(times) - 1, int(len(times) * 0.95))], 1)}
+
+
+def prepare(data_dir: str, size: int, seed: int) -> str:
+    """Base con `size` works (sin ediciones ni autores); se reutiliza si ya existe."""
+    from populate_tables import bulk_load, generate
+
+    path = os.path.join(data_dir, f"works_{size}.db")
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        bulk_load(path, lambda conn: generate(conn, works=size, authors=1, authors_per_work="const:0",
+                                              editions_per_work="const:0", seed=seed), foreign_keys=False)
+        print(f"  base de {size:,} works generada en {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def cases(size: int, database: str) -> Dict[str, Callable[[], Any]]:
+    """Casos a medir sobre `database` (ya activa en ws_crud_work)."""
+    import ws_crud_work as w
+    from migrations import migrate
+    from pagination import SortKey, encode_cursor
+    from populate_tables import THEMES
+
+    conn = sqlite3.connect(database)
+    themes = dict(conn.execute("SELECT theme, COUNT(*) FROM work GROUP BY theme").fetchall())
+    common = max(themes, key=themes.get) if themes else THEMES[0]
+    rare = min(themes, key=themes.get) if themes else THEMES[-1]
+    middle = size // 2 or 1
+    suite: Dict[str, Callable[[], Any]] = {
+        "init_db() (una vez por proceso)": w.init_db,
+        "migrate() ya aplicada (init por llamada)": lambda: _migrate_again(database, migrate),
+        "get_work cache caliente": lambda: w.get_work(middle),
+        "get_work cache frio": lambda: (w.work_cache.clear(), w.get_work(middle)),
+        "list_works pagina 1": lambda: w.list_works(limit=PAGE),
+        f"list_works theme={common} ({themes.get(common, 0) / size:.0%})": lambda: w.list_works(theme=common, limit=PAGE),
+        f"list_works theme={rare} ({themes.get(rare, 0) / size:.0%})": lambda: w.list_works(theme=rare, limit=PAGE),
+        # Selectividad de la busqueda: todos los titulos, un tema, un numero (pocos por prefijo)
+        "list_works q=work (todas)": lambda: w.list_works(q="work", limit=PAGE),
+        f"list_works q={common.lower()} (tema)": lambda: w.list_works(q=common.lower(), limit=PAGE),
+        f"list_works q={middle} (prefijo numerico)": lambda: w.list_works(q=str(middle), limit=PAGE),
+        "list_works q=work order=relevance": lambda: w.list_works(q="work", order="relevance", limit=PAGE),
+        "list_works count=none": lambda: w.list_works(limit=PAGE, count="none"),
+        "list_works count=estimate": lambda: w.list_works(limit=PAGE, count="estimate"),
+        "list_works count=exact": lambda: w.list_works(limit=PAGE, count="exact"),
+        f"list_works count=exact theme={common}": lambda: w.list_works(theme=common, limit=PAGE, count="exact"),
+    }
+    for depth in DEPTHS:
+        offset = depth * PAGE
+        if offset >= size:
+            break
+        # El cursor de la pagina `depth` es la clave de la ultima fila de la anterior (orden desc)
+        row = conn.execute("SELECT created_at, id FROM work ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?",
+                           (offset - 1,)).fetchone()
+        cursor = encode_cursor(list(row), [SortKey("created_at", True), SortKey("id", True)])
+        suite[f"list_works pagina {depth + 1} por offset"] = (
+            lambda offset=offset: w.list_works(limit=PAGE, offset=offset, count="none"))
+        suite[f"list_works pagina {depth + 1} por cursor"] = (
+            lambda cursor=cursor: w.list_works(limit=PAGE, cursor=cursor, count="none"))
+    conn.close()
+
+    created: List[int] = []
+    suite.update({
+        "create_work": lambda: created.append(w.create_work("Bench", "Ensayo")["id"]),
+        "update_work": lambda: w.update_work(middle, f"Work Title {middle}", common),
+        "patch_work": lambda: w.patch_work(middle, {"theme": common}),
+        "delete_work": lambda: w.delete_work(created.pop() if created else w.create_work("Bench", None)["id"]),
+    })
+    return suite
+
+
+def _migrate_again(database: str, migrate):
+    conn = sqlite3.connect(database)
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
+
+
+def run(sizes: List[int], data_dir: str, repeat: int, budget: float, seed: int) -> Dict[str, Dict[str, float]]:
+    sys.path.insert(0, HERE)
+    results: Dict[str, Dict[str, float]] = {}
+    for size in sizes:
+        print(f"\n{size:,} works")
+        database = prepare(data_dir, size, seed)
+        # ws_crud_work lee DB_FILE en cada llamada: se apunta a la base de este tamano
+        os.environ["LIBRARY_DB"] = database
+        import ws_crud_work
+        ws_crud_work.DB_FILE = database
+        ws_crud_work.init_db()
+        ws_crud_work.work_cache.clear()
+        for name, fn in cases(size, database).items():
+            result = measure(fn, repeat, budget)
+            results[f"{size}:{name}"] = result
+            print(f"  {name:<48} {result['median_us']:>12,.1f} us  p95 {result['p95_us']:>12,.1f} us")
+    return results
+
+
+def regressions(results: Dict[str, Dict[str, float]], baseline: Dict[str, float], threshold: float,
+                min_delta: float) -> List[str]:
+    found = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        # Diferencias de pocos microsegundos son ruido del sistema, no regresiones
+        if (reference and result["median_us"] > reference * (1 + threshold)
+                and result["median_us"] - reference > min_delta):
+            found.append(f"{key}: {result['median_us']:,.1f} us (referencia {reference:,.1f} us, "
+                         f"{result['median_us'] / reference - 1:+.0%})")
+    return found
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de ws_crud_work.py")
+    parser.add_argument("--sizes", default="1000,100000", help="tamanos de la base (works), p. ej. 1000,10000000")
+    parser.add_argument("--data-dir", help="donde generar/reutilizar las bases (por defecto, temporal)")
+    parser.add_argument("--repeat", type=int, default=200, help="repeticiones maximas por caso")
+    parser.add_argument("--budget", type=float, default=1.0, help="segundos maximos por caso")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", default="bench_work_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="guarda las medianas como referencia")
+    parser.add_argument("--threshold", type=float, default=0.25, help="empeoramiento tolerado (0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=50.0, help="diferencia minima (us) para contar")
+    parser.add_argument("--out", help="guarda los resultados completos en este JSON")
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        results = run(sizes, data_dir, args.repeat, args.budget, args.seed)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({key: result["median_us"] for key, result in results.items()}, f, indent=2)
+        print(f"\nReferencia guardada en {args.baseline}")
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.threshold, args.min_delta)
+        print(f"\n{len(found)} casos empeoraron mas de {args.threshold:.0%} frente a {args.baseline}")
+        for line in found:
+            print(f"  {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# bulk.py
+# Operaciones masivas: lectura de cuerpos JSON/NDJSON, validacion por fila y
+# ejecucion con executemany en una sola transaccion.
+import json
+import sqlite3
+from typing import Any, Dict, List, Sequence, Tuple
+
+from flask import request
+
+MAX_BULK_ROWS = 50000
+
+# (indice de la fila en el cuerpo, parametros SQL)
+Entry = Tuple[int, Sequence[Any]]
+
+
+class BulkError(ValueError):
+    """El cuerpo de una peticion masiva no se pudo leer."""
+
+
+def parse_bulk_body(max_rows: int = MAX_BULK_ROWS) -> List[Any]:
+    """Filas del cuerpo: un arreglo JSON, {"items": [...]} o NDJSON (una fila por linea)."""
+    if request.mimetype == "application/x-ndjson":
+        rows = []
+        for number, line in enumerate(request.get_data(as_text=True).splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                raise BulkError(f"Linea {number}: JSON invalido")
+    else:
+        data = request.get_json(silent=True)
+        rows = data.get("items") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise BulkError("El cuerpo debe ser un arreglo JSON, {\"items\": [...]} o NDJSON")
+    if len(rows) > max_rows:
+        raise BulkError(f"Maximo {max_rows} filas por peticion")
+    return rows
+
+
+def check_rows(rows: List[Any], required: Sequence[str], choices: Dict[str, Sequence[Any]] = None
+               ) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+    """Separa las filas validas (indice, fila) de los errores por fila."""
+    choices = choices or {}
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"index": index, "error": "La fila debe ser un objeto JSON"})
+            continue
+        missing = [field for field in required if row.get(field) is None]
+        if missing:
+            errors.append({"index": index, "error": f"Faltan campos requeridos: {', '.join(missing)}"})
+            continue
+        nested = [field for field, value in row.items() if isinstance(value, (list, dict))]
+        if nested:
+            errors.append({"index": index, "error": f"Los valores deben ser escalares: {', '.join(nested)}"})
+            continue
+        bad = [field for field, allowed in choices.items() if field in row and row[field] not in allowed]
+        if bad:
+            errors.append({"index": index, "error": f"Valor no permitido en: {', '.join(bad)}"})
+            continue
+        valid.append((index, row))
+    return valid, errors
+
+
+def execute_bulk(conn: sqlite3.Connection, sql: str, entries: List[Entry],
+                 atomic: bool = False, inserts: bool = False
+                 ) -> Tuple[Dict[int, Any], List[Dict[str, Any]]]:
+    """Ejecuta `sql` para cada entrada en una sola transaccion BEGIN IMMEDIATE.
+
+    Camino rapido: un executemany. Si falla alguna fila (o un UPDATE/DELETE no
+    encuentra su registro) se deshace el lote y se repite fila por fila para
+    reportar el error de cada una; las filas validas se confirman salvo con
+    `atomic`, que revierte todo si hubo errores.
+
+    Devuelve ({indice: id insertado o filas afectadas}, [errores]).
+    """
+    results: Dict[int, Any] = {}
+    errors: List[Dict[str, Any]] = []
+    if not entries:
+        return results, errors
+    if conn.in_transaction:
+        conn.commit()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("SAVEPOINT bulk")
+        try:
+            cursor = conn.executemany(sql, [params for _, params in entries])
+            fast = inserts or cursor.rowcount == len(entries)
+        except (sqlite3.IntegrityError, sqlite3.ProgrammingError, sqlite3.InterfaceError):
+            fast = False
+
+        if fast:
+            conn.execute("RELEASE bulk")
+            if inserts:
+                # AUTOINCREMENT dentro de una transaccion exclusiva: los ids son consecutivos
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                first_id = last_id - len(entries) + 1
+                results = {index: first_id + n for n, (index, _) in enumerate(entries)}
+            else:
+                results = {index: 1 for index, _ in entries}
+        else:
+            conn.execute("ROLLBACK TO bulk")
+            conn.execute("RELEASE bulk")
+            for index, params in entries:
+                try:
+                    cursor = conn.execute(sql, params)
+                except sqlite3.IntegrityError as e:
+                    errors.append({"index": index, "error": f"Error de integridad: {e}"})
+                    continue
+                except (sqlite3.ProgrammingError, sqlite3.InterfaceError) as e:
+                    # Un valor que SQLite no puede guardar (p. ej. un objeto en una fila NDJSON)
+                    errors.append({"index": index, "error": f"Valor invalido: {e}"})
+                    continue
+                if inserts:
+                    results[index] = cursor.lastrowid
+                elif cursor.rowcount == 0:
+                    errors.append({"index": index, "error": "Registro no encontrado"})
+                else:
+                    results[index] = cursor.rowcount
+
+        if atomic and errors:
+            conn.rollback()
+            results = {}
+        else:
+            conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return results, errors
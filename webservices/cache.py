@@ -0,0 +1,187 @@
+# cache.py
+# Cache en proceso para lecturas de un solo registro (LRU acotado por entradas y bytes, con TTL).
+#
+# Backend por despliegue con CACHE_BACKEND=lru|none; limites con CACHE_MAX_ENTRIES,
+# CACHE_MAX_BYTES y CACHE_TTL (segundos).
+#
+# Ademas de las invalidaciones explicitas de quien escribe, sync() aplica lo que haya
+# en la tabla `changes` (migracion 5): asi el cache ve las escrituras de otros modulos
+# del mismo proceso (gateway.py) y de otros procesos (workers de serve.py).
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from flask import jsonify
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "lru")
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "50000"))
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", "300"))
+
+
+def approx_size(value: Any) -> int:
+    """Tamano aproximado en bytes de un registro (dict de valores simples)."""
+    if isinstance(value, dict):
+        return 64 + sum(len(str(k)) + len(str(v)) + 16 for k, v in value.items())
+    return 64 + len(str(value))
+
+
+class NullCache:
+    """Backend que no guarda nada (CACHE_BACKEND=none)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.misses = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        self.misses += 1
+        return loader()
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        pass
+
+    def sync(self, conn):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "none", "misses": self.misses}
+
+
+class LRUCache:
+    """LRU con TTL, limitado por numero de entradas y por bytes aproximados."""
+
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (valor, expira, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Se incrementa en cada invalidacion: una carga que se cruza con una escritura no se guarda
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+        self._seq: Optional[int] = None  # ultimo seq de `changes` aplicado
+        self._sync_lock = threading.Lock()
+
+    def _pop(self, key: Hashable):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Devuelve el valor en cache o lo carga con `loader` (None no se guarda)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._data.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[0]
+                self._pop(key)
+                self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            generation = self._generation
+
+        value = loader()
+        if value is None:
+            return None
+
+        size = approx_size(value)
+        with self._lock:
+            if generation != self._generation or size > self.max_bytes:
+                return value
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, now + self.ttl, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._data)))
+                self._stats["evictions"] += 1
+        return value
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if key in self._data:
+                    self._pop(key)
+                    self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+            self._bytes = 0
+
+    def sync(self, conn):
+        """Invalida las claves (tabla, id) que cambiaron en la base desde la ultima llamada.
+
+        Sin cambios nuevos cuesta una lectura de MAX(seq); si el historial ya no alcanza
+        (prune) o hubo un 'reset' de la carga masiva, vacia el cache.
+        """
+        first, last = conn.execute("SELECT MIN(seq), MAX(seq) FROM changes").fetchone()
+        last = last or 0
+        if self._seq == last:
+            return
+        with self._sync_lock:
+            if self._seq is None or self._seq >= last:
+                # Primera llamada, o la base se reemplazo (seq hacia atras)
+                if self._seq is not None:
+                    self.clear()
+            elif first is not None and first > self._seq + 1:
+                self.clear()
+            else:
+                keys, reset = set(), False
+                for table, op, record_key in conn.execute(
+                        "SELECT table_name, op, record_key FROM changes WHERE seq > ? AND seq <= ?",
+                        (self._seq, last)):
+                    if op == "reset":
+                        reset = True
+                        break
+                    key = json.loads(record_key)
+                    if "id" in key:
+                        keys.add((table, key["id"]))
+                if reset:
+                    self.clear()
+                else:
+                    self.invalidate(keys)
+            self._seq = last
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+            data.update(backend="lru", entries=len(self._data), bytes=self._bytes,
+                        max_entries=self.max_entries, max_bytes=self.max_bytes, ttl=self.ttl)
+        lookups = data["hits"] + data["misses"]
+        data["hit_rate"] = round(data["hits"] / lookups, 4) if lookups else None
+        return data
+
+
+BACKENDS = {"lru": LRUCache, "none": NullCache}
+_caches: Dict[str, Any] = {}
+
+
+def make_cache(name: str, backend: Optional[str] = None):
+    """Crea (y registra para las metricas) un cache con el backend configurado."""
+    backend = backend or CACHE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de cache desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+    cache = _caches[name] = BACKENDS[backend](name)
+    return cache
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def init_app(app):
+    """Expone las metricas de los caches en GET /_cache."""
+    app.add_url_rule("/_cache", "cache_stats", lambda: jsonify(cache_stats()))
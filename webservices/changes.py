@@ -0,0 +1,174 @@
+# changes.py
+# Registro de cambios para sincronizacion incremental: GET /changes?since=<seq>.
+#
+# Los triggers de la migracion 5 anotan en `changes` cada insert/update/delete de
+# las cinco tablas (incluidos los borrados en cascada). Un consumidor guarda el
+# ultimo seq que proceso y solo pide lo posterior, asi el costo depende de lo que
+# cambio y no del tamano del catalogo.
+#
+#   python changes.py [library.db] status | prune <dias>
+import json
+import sqlite3
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from flask import jsonify, request
+
+from db_pool import get_db, get_pool
+from migrations import CHANGE_KEYS
+from streaming import BATCH_SIZE, stream_batches, stream_format
+
+
+def _entry(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "seq": row["seq"],
+        "table": row["table_name"],
+        "op": row["op"],
+        "key": json.loads(row["record_key"]) if row["record_key"] else None,
+        "changed_at": row["changed_at"],
+    }
+
+
+def attach_data(conn: sqlite3.Connection, entries: List[Dict[str, Any]]):
+    """Agrega `data` (estado actual de la fila, None si ya no existe) a inserts/updates.
+
+    Una consulta por tabla y lote, no una por cambio.
+    """
+    by_table: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in entries:
+        if entry["op"] in ("insert", "update"):
+            by_table.setdefault(entry["table"], []).append(entry)
+    for table, pending in by_table.items():
+        columns = CHANGE_KEYS[table]
+        keys = {tuple(entry["key"][column] for column in columns) for entry in pending}
+        row_value = ", ".join("?" for _ in columns)
+        if len(columns) == 1:
+            where = f"{columns[0]} IN ({', '.join('?' for _ in keys)})"
+        else:
+            where = f"({', '.join(columns)}) IN (VALUES {', '.join(f'({row_value})' for _ in keys)})"
+        rows = conn.execute(f"SELECT * FROM {table} WHERE {where}",
+                            [value for key in keys for value in key]).fetchall()
+        current = {tuple(row[column] for column in columns): dict(row) for row in rows}
+        for entry in pending:
+            entry["data"] = current.get(tuple(entry["key"][column] for column in columns))
+
+
+def iter_changes(database: str, since: int, until: int, tables: Sequence[str] = (),
+                 limit: Optional[int] = None, with_data: bool = False,
+                 batch_size: int = BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Lotes de cambios con since < seq <= until, en orden de seq.
+
+    Igual que streaming.iter_rows usa su propia conexion del pool porque el
+    generador se consume despues del teardown de la peticion.
+    """
+    sql = "SELECT seq, table_name, op, record_key, changed_at FROM changes WHERE seq > ? AND seq <= ?"
+    params: List[Any] = [since, until]
+    if tables:
+        sql += f" AND table_name IN ({', '.join('?' for _ in tables)})"
+        params += tables
+    sql += " ORDER BY seq"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    pool = get_pool(database)
+    conn = pool.acquire()
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            entries = [_entry(row) for row in rows]
+            if with_data:
+                attach_data(conn, entries)
+            yield entries
+        cursor.close()
+    finally:
+        pool.release(conn)
+
+
+def prune(conn: sqlite3.Connection, days: float) -> int:
+    """Borra los cambios de mas de `days` dias; siempre conserva el ultimo seq."""
+    cursor = conn.execute(
+        "DELETE FROM changes WHERE changed_at < strftime('%Y-%m-%d %H:%M:%f', 'now', ?) "
+        "AND seq < (SELECT MAX(seq) FROM changes)",
+        (f"-{days} days",),
+    )
+    conn.commit()
+    return cursor.rowcount
+
+
+# ---------- Integracion con Flask ----------
+def init_app(app, database: str):
+    """Registra GET /changes sobre `database` en una app Flask.
+
+    ?since=<seq> (0 = desde el principio), ?table=work,item, ?limit=N y ?data=1
+    para incluir el estado actual de cada fila. NDJSON por defecto (?stream=json
+    para un arreglo). X-Last-Seq es el seq hasta el que llega la respuesta y el
+    `since` de la siguiente peticion (con limit, el seq del ultimo cambio enviado).
+    Si `since` es anterior a lo que se conserva responde 410 (hay que resincronizar).
+    """
+    def changes_feed():
+        try:
+            since = int(request.args.get("since", 0))
+            limit = int(request.args["limit"]) if request.args.get("limit") else None
+        except ValueError:
+            return jsonify({"error": "since/limit deben ser enteros"}), 400
+        if limit is not None and limit < 1:
+            return jsonify({"error": "limit debe ser mayor que 0"}), 400
+        tables = [table for table in request.args.get("table", "").split(",") if table]
+        unknown = [table for table in tables if table not in CHANGE_KEYS]
+        if unknown:
+            return jsonify({"error": f"Tablas desconocidas: {', '.join(unknown)}"}), 400
+
+        first, last = get_db(database).execute("SELECT MIN(seq), MAX(seq) FROM changes").fetchone()
+        if first is not None and since < first - 1:
+            response = jsonify({"error": "El historial de cambios ya no llega a ese seq; resincronice completo",
+                                "first_seq": first})
+            return response, 410
+
+        until = max(last or 0, since)
+        if limit:
+            # Con limit la respuesta termina en el limit-esimo cambio (con el mismo filtro de tablas):
+            # ese seq es el `since` de la pagina siguiente
+            sql = "SELECT seq FROM changes WHERE seq > ? AND seq <= ?"
+            params = [since, until]
+            if tables:
+                sql += f" AND table_name IN ({', '.join('?' for _ in tables)})"
+                params += tables
+            cut = get_db(database).execute(sql + " ORDER BY seq LIMIT 1 OFFSET ?", params + [limit - 1]).fetchone()
+            if cut is not None:
+                until = cut[0]
+        with_data = request.args.get("data") in ("1", "true")
+        response = stream_batches(iter_changes(database, since, until, tables, limit, with_data),
+                                  stream_format() or "ndjson")
+        response.headers["X-Last-Seq"] = str(until)
+        return response
+
+    app.add_url_rule("/changes", "changes_feed", changes_feed)
+
+
+def main(argv: List[str]) -> int:
+    args = argv[1:]
+    database = args.pop(0) if args and args[0].endswith(".db") else "library.db"
+    command = args.pop(0) if args else "status"
+    conn = sqlite3.connect(database)
+    try:
+        if command == "prune" and args:
+            print("Borrados:", prune(conn, float(args[0])))
+        elif command == "status":
+            first, last, total = conn.execute("SELECT MIN(seq), MAX(seq), COUNT(*) FROM changes").fetchone()
+            print(f"seq {first}..{last}, {total} cambios")
+            for table, count in conn.execute("SELECT table_name, COUNT(*) FROM changes GROUP BY table_name"):
+                print(f"  {table}: {count}")
+        else:
+            print("Uso: python changes.py [library.db] status | prune <dias>")
+            return 2
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
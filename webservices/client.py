@@ -0,0 +1,318 @@
+# client.py
+# Cliente Python para los servicios (ws_crud.py, app_work.py, app_edition.py,
+# app_work_author.py o todos juntos en gateway.py).
+#
+#   from client import LibraryClient
+#   with LibraryClient("http://localhost:8000") as api:
+#       work = api.work.create({"title": "Rayuela", "theme": "Novela"})
+#       for edition in api.edition.iter(work_id=work["id"]):   # recorre todas las paginas
+#           ...
+#       found = api.lookup_barcodes(barcodes)                  # lotes en paralelo
+#       works = api.work.get_many(ids)                         # GET concurrentes
+#
+# Una sola requests.Session con keep-alive: las peticiones reutilizan conexiones
+# (hasta CLIENT_POOL_SIZE por host) en lugar de abrir TCP+TLS cada vez. Cada
+# peticion tiene timeout (conexion, lectura) y se reintenta con backoff
+# exponencial ante errores de conexion, 429/502/503/504 y, si el metodo es
+# idempotente (o la base estaba bloqueada), 500.
+#
+# Configuracion por entorno (o por argumento): LIBRARY_URL, CLIENT_CONNECT_TIMEOUT,
+# CLIENT_READ_TIMEOUT, CLIENT_RETRIES, CLIENT_BACKOFF, CLIENT_POOL_SIZE, CLIENT_WORKERS.
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+LIBRARY_URL = os.environ.get("LIBRARY_URL", "http://localhost:8000")
+CLIENT_CONNECT_TIMEOUT = float(os.environ.get("CLIENT_CONNECT_TIMEOUT", "3.05"))
+CLIENT_READ_TIMEOUT = float(os.environ.get("CLIENT_READ_TIMEOUT", "30"))
+CLIENT_RETRIES = int(os.environ.get("CLIENT_RETRIES", "3"))
+CLIENT_BACKOFF = float(os.environ.get("CLIENT_BACKOFF", "0.2"))
+CLIENT_POOL_SIZE = int(os.environ.get("CLIENT_POOL_SIZE", "16"))
+CLIENT_WORKERS = int(os.environ.get("CLIENT_WORKERS", "8"))
+
+IDEMPOTENT = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+RETRY_STATUS = (429, 502, 503, 504)
+# Limite de valores por peticion de POST /item/by-barcode y /edition/by-isbn (MAX_LOOKUP_VALUES)
+LOOKUP_BATCH = 1000
+
+
+class ApiError(Exception):
+    """Respuesta de error del servicio (status >= 400)."""
+
+    def __init__(self, response: requests.Response):
+        self.response = response
+        self.status = response.status_code
+        try:
+            self.payload = response.json()
+        except ValueError:
+            self.payload = None
+        message = self.payload.get("error") or self.payload.get("message") if isinstance(self.payload, dict) else None
+        super().__init__(f"{response.request.method} {response.url} -> {self.status}: "
+                         f"{message or response.text[:200]}")
+
+
+def _not_sent(error: requests.RequestException) -> bool:
+    # Fallo al conectar (rechazada, DNS, timeout de conexion): la peticion no llego al servidor
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _locked(response: requests.Response) -> bool:
+    # La escritura no llego a aplicarse: se puede repetir aunque el metodo no sea idempotente
+    return "locked" in response.text or "agotado" in response.text
+
+
+class LibraryClient:
+    """Sesion HTTP reutilizable con timeouts, reintentos y paginacion."""
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[Tuple[float, float]] = None,
+                 retries: int = CLIENT_RETRIES, backoff: float = CLIENT_BACKOFF,
+                 pool_size: int = CLIENT_POOL_SIZE, workers: int = CLIENT_WORKERS,
+                 session: Optional[requests.Session] = None):
+        self.base_url = (base_url or LIBRARY_URL).rstrip("/")
+        self.timeout = timeout or (CLIENT_CONNECT_TIMEOUT, CLIENT_READ_TIMEOUT)
+        self.retries = retries
+        self.backoff = backoff
+        self.workers = workers
+        self.session = session or requests.Session()
+        # Los reintentos los hace request() (con la politica de arriba), no urllib3
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+        # Recursos de ws_crud.py (y gateway.py)
+        self.work = Resource(self, "work")
+        self.author = Resource(self, "author")
+        self.edition = Resource(self, "edition")
+        self.item = ItemResource(self, "item")
+        self.work_author = WorkAuthorResource(self)
+        # Recursos de app_work.py y app_edition.py (y gateway.py)
+        self.works = Resource(self, "works")
+        self.editions = Resource(self, "editions")
+
+    # ---------- Peticiones ----------
+    def request(self, method: str, path: str, ok: Iterable[int] = (), **kwargs) -> requests.Response:
+        """Peticion con reintentos; ApiError si el status es >= 400 y no esta en `ok`."""
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                # Si la peticion pudo llegar al servidor solo se repite cuando es idempotente
+                if attempt >= self.retries or (method not in IDEMPOTENT and not _not_sent(error)):
+                    raise
+                self._sleep(attempt)
+            else:
+                if response.status_code < 400 or response.status_code in ok:
+                    return response
+                retry = (response.status_code in RETRY_STATUS
+                         or (response.status_code == 500 and (method in IDEMPOTENT or _locked(response))))
+                if not retry or attempt >= self.retries:
+                    raise ApiError(response)
+                self._sleep(attempt, response.headers.get("Retry-After"))
+            attempt += 1
+
+    def _sleep(self, attempt: int, retry_after: Optional[str] = None):
+        if retry_after and retry_after.isdigit():
+            time.sleep(int(retry_after))
+        else:
+            # Backoff exponencial con jitter para no sincronizar los reintentos de varios clientes
+            time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def get_json(self, path: str, **kwargs) -> Any:
+        return self.request("GET", path, **kwargs).json()
+
+    def pages(self, path: str, params: Optional[Dict[str, Any]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Recorre una coleccion paginada por cursor, pagina por pagina.
+
+        Entiende las dos formas de los servicios: arreglo con la cabecera X-Next-Cursor
+        (pagination.page_response) y {"items": [...], "next_cursor": ...} (GET /works).
+        """
+        params = dict(params or {})
+        while True:
+            response = self.request("GET", path, params=params)
+            payload = response.json()
+            if isinstance(payload, dict):
+                items, cursor = payload.get("items", []), payload.get("next_cursor")
+            else:
+                items, cursor = payload, response.headers.get("X-Next-Cursor")
+            yield items
+            if not cursor or not items:
+                return
+            params["cursor"] = cursor
+            params.pop("offset", None)
+
+    def iter(self, path: str, params: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        for page in self.pages(path, params):
+            yield from page
+
+    # ---------- Lotes concurrentes ----------
+    def map(self, fn: Callable[[Any], Any], values: Iterable[Any]) -> List[Any]:
+        """Aplica `fn` a cada valor en el pool de hilos del cliente (resultados en orden).
+
+        Los hilos comparten la sesion y su pool de conexiones keep-alive.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="client")
+        return list(self._executor.map(fn, values))
+
+    def _lookup(self, path: str, values: Iterable[str]) -> Dict[str, Any]:
+        values = list(dict.fromkeys(values))
+        chunks = [values[start:start + LOOKUP_BATCH] for start in range(0, len(values), LOOKUP_BATCH)]
+        result: Dict[str, Any] = {"found": {}, "missing": []}
+        for part in self.map(lambda chunk: self.request("POST", path, json=chunk).json(), chunks):
+            result["found"].update(part["found"])
+            result["missing"].extend(part["missing"])
+        return result
+
+    def lookup_barcodes(self, barcodes: Iterable[str]) -> Dict[str, Any]:
+        """{'found': {barcode: item}, 'missing': [...]} (POST /item/by-barcode en lotes)."""
+        return self._lookup("/item/by-barcode", barcodes)
+
+    def lookup_isbns(self, isbns: Iterable[str]) -> Dict[str, Any]:
+        """{'found': {isbn: edition}, 'missing': [...]} (POST /edition/by-isbn en lotes)."""
+        return self._lookup("/edition/by-isbn", isbns)
+
+    # ---------- Otros servicios ----------
+    def search(self, q: str, **params) -> Dict[str, Any]:
+        return self.get_json("/search", params=dict(params, q=q))
+
+    def availability(self, **params) -> Any:
+        return self.get_json("/availability", params=params)
+
+    def changes(self, since: int = 0, **params) -> Iterator[Dict[str, Any]]:
+        """Cambios desde `since` (GET /changes en NDJSON)."""
+        response = self.request("GET", "/changes", params=dict(params, since=since), stream=True)
+        with response:
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Resource:
+    """CRUD de una coleccion /<name> y /<name>/<id>."""
+
+    def __init__(self, client: LibraryClient, name: str):
+        self.client = client
+        self.path = f"/{name}"
+
+    def list(self, **params) -> Any:
+        """Una pagina (con filtros, limit, cursor... como query string)."""
+        return self.client.get_json(self.path, params=params)
+
+    def iter(self, **params) -> Iterator[Dict[str, Any]]:
+        """Todos los registros, siguiendo el cursor pagina a pagina."""
+        return self.client.iter(self.path, params)
+
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """El registro o None si no existe."""
+        response = self.client.request("GET", f"{self.path}/{record_id}", ok=(404,))
+        return None if response.status_code == 404 else response.json()
+
+    def get_many(self, ids: Iterable[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """{id: registro o None}, con GET concurrentes."""
+        ids = list(dict.fromkeys(ids))
+        return dict(zip(ids, self.client.map(self.get, ids)))
+
+    def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return self.client.request("POST", self.path, json=data).json()
+
+    def update(self, record_id: int, data: Dict[str, Any], etag: Optional[str] = None) -> Dict[str, Any]:
+        """PUT; con `etag` solo se aplica si el registro no cambio (If-Match, si no 412)."""
+        headers = {"If-Match": etag} if etag else {}
+        return self.client.request("PUT", f"{self.path}/{record_id}", json=data, headers=headers).json()
+
+    def patch(self, record_id: int, data: Dict[str, Any], etag: Optional[str] = None) -> Dict[str, Any]:
+        headers = {"If-Match": etag} if etag else {}
+        return self.client.request("PATCH", f"{self.path}/{record_id}", json=data, headers=headers).json()
+
+    def delete(self, record_id: int, etag: Optional[str] = None) -> bool:
+        """True si se elimino, False si no existia."""
+        headers = {"If-Match": etag} if etag else {}
+        response = self.client.request("DELETE", f"{self.path}/{record_id}", ok=(404,), headers=headers)
+        return response.status_code != 404
+
+    def bulk(self, method: str, rows: List[Dict[str, Any]], atomic: bool = False) -> Dict[str, Any]:
+        """POST/PUT/DELETE /<name>/_bulk (solo ws_crud.py); 207 y 409 devuelven el detalle."""
+        params = {"atomic": 1} if atomic else {}
+        return self.client.request(method, f"{self.path}/_bulk", json=rows, params=params, ok=(207, 409)).json()
+
+
+class ItemResource(Resource):
+    """/item con prestamo y devolucion."""
+
+    def checkout(self, item_id: int) -> Dict[str, Any]:
+        return self.client.request("POST", f"{self.path}/{item_id}/checkout").json()
+
+    def return_(self, item_id: int) -> Dict[str, Any]:
+        return self.client.request("POST", f"{self.path}/{item_id}/return").json()
+
+    def checkout_many(self, barcodes: List[str], atomic: bool = False) -> Dict[str, Any]:
+        params = {"atomic": 1} if atomic else {}
+        return self.client.request("POST", f"{self.path}/_checkout", json=barcodes, params=params,
+                                   ok=(207, 409)).json()
+
+    def return_many(self, barcodes: List[str], atomic: bool = False) -> Dict[str, Any]:
+        params = {"atomic": 1} if atomic else {}
+        return self.client.request("POST", f"{self.path}/_return", json=barcodes, params=params,
+                                   ok=(207, 409)).json()
+
+
+class WorkAuthorResource:
+    """/work_author: relaciones con clave compuesta (work_id, author_id)."""
+
+    def __init__(self, client: LibraryClient):
+        self.client = client
+        self.path = "/work_author"
+
+    def list(self, **params) -> List[Dict[str, Any]]:
+        return self.client.get_json(self.path, params=params)
+
+    def iter(self, **params) -> Iterator[Dict[str, Any]]:
+        return self.client.iter(self.path, params)
+
+    def create(self, work_id: int, author_id: int) -> Dict[str, Any]:
+        return self.client.request("POST", self.path, json={"work_id": work_id, "author_id": author_id}).json()
+
+    def search(self, work_id: int, author_id: int) -> Optional[Dict[str, Any]]:
+        """La relacion o None (POST /work_author/search, app_work_author.py)."""
+        response = self.client.request("POST", f"{self.path}/search", ok=(404,),
+                                       json={"work_id": work_id, "author_id": author_id})
+        return None if response.status_code == 404 else response.json()
+
+    def delete(self, work_id: int, author_id: int) -> bool:
+        """True si se elimino, False si no existia."""
+        # ws_crud.py: DELETE /work_author/<w>/<a>; app_work_author.py: DELETE /work_author con cuerpo
+        response = self.client.request("DELETE", f"{self.path}/{work_id}/{author_id}", ok=(404, 405))
+        if response.status_code == 405 or (response.status_code == 404 and "json" not in
+                                           response.headers.get("Content-Type", "")):
+            response = self.client.request("DELETE", self.path, ok=(404,),
+                                           json={"work_id": work_id, "author_id": author_id})
+        return response.status_code != 404
@@ -0,0 +1,111 @@
+# conditional.py
+# Peticiones condicionales HTTP: ETag/Last-Modified a partir de `updated_at`,
+# 304 para If-None-Match/If-Modified-Since y 412 para If-Match.
+#
+# Registros: ETag fuerte de (tabla, id, updated_at).
+# Listados: ETag de la version de las tablas (table_version, mantenida por triggers)
+# y de la URL pedida, asi que un 304 no ejecuta la consulta ni serializa nada.
+import hashlib
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence
+
+from flask import Response, jsonify, request
+
+
+class PreconditionFailed(Exception):
+    """El If-Match de la peticion no coincide con la version actual del registro."""
+
+    def __init__(self, etag: Optional[str] = None):
+        super().__init__("La version del registro cambio (If-Match no coincide)")
+        self.etag = etag
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+
+
+def record_etag(table: str, record_id: Any, updated_at: Any) -> str:
+    return _digest(table, record_id, updated_at)
+
+
+def format_timestamp(value: datetime) -> str:
+    """`value` (UTC) con el formato de strftime('%Y-%m-%d %H:%M:%f', 'now') de SQLite,
+    p. ej. '2024-01-02 03:04:05.678': asi el orden de las cadenas sigue al del tiempo."""
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def utc_now() -> str:
+    """Hora actual para created_at/updated_at (ver format_timestamp)."""
+    return format_timestamp(datetime.now(timezone.utc))
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """updated_at ('2024-01-02 03:04:05[.fff]' o ISO 8601) como datetime UTC."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    # Los timestamps sin zona son UTC: los escriben strftime('now') de SQLite y utc_now()
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def record_validators(table: str, record: Dict[str, Any]):
+    """(etag, last_modified) de un registro con columnas id/updated_at."""
+    return (record_etag(table, record["id"], record.get("updated_at")),
+            parse_timestamp(record.get("updated_at")))
+
+
+def collection_validators(conn: sqlite3.Connection, tables: Sequence[str]):
+    """(etag, last_modified) de un listado sobre `tables` para la URL actual."""
+    placeholders = ", ".join("?" for _ in tables)
+    rows = conn.execute(
+        f"SELECT name, version, updated_at FROM table_version WHERE name IN ({placeholders}) ORDER BY name",
+        tuple(tables),
+    ).fetchall()
+    etag = _digest(request.full_path, *(f"{name}:{version}" for name, version, _ in rows))
+    stamps = [parse_timestamp(updated_at) for _, _, updated_at in rows]
+    return etag, max(filter(None, stamps), default=None)
+
+
+def is_fresh(etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """True si el cliente ya tiene esta version (RFC 9110: If-None-Match manda)."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    if since and last_modified:
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    return with_validators(Response(status=304), etag, last_modified)
+
+
+def with_validators(response: Response, etag: Optional[str],
+                    last_modified: Optional[datetime] = None) -> Response:
+    if etag:
+        response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+def check_if_match(table: str, record: Optional[Dict[str, Any]]):
+    """Valida If-Match contra la version actual; lanza PreconditionFailed si no coincide.
+
+    Llamar dentro de la transaccion (BEGIN IMMEDIATE) que hace la escritura.
+    """
+    if not request.if_match:
+        return
+    if record is None:
+        raise PreconditionFailed()
+    etag = record_etag(table, record["id"], record.get("updated_at"))
+    if not (request.if_match.star_tag or request.if_match.contains(etag)):
+        raise PreconditionFailed(etag)
+
+
+def precondition_failed(error: PreconditionFailed) -> Response:
+    return with_validators(jsonify({"error": str(error)}), error.etag), 412
@@ -1,28 +1,30 @@
-import requests, json
-BASE = "http://localhost:8001/works"
+import json
+from client import LibraryClient
 
-def pp(r): 
-    try: print(json.dumps(r.json(), indent=2, ensure_ascii=False))
-    except: print(r.text)
+# app_work.py corre en el puerto 8001 (una sesion keep-alive para todas las llamadas, ver client.py)
+api = LibraryClient("http://localhost:8001")
+
+def pp(data):
+    print(json.dumps(data, indent=2, ensure_ascii=False))
 
 # CREATE
-r = requests.post(BASE, json={"title":"El Principito","theme":"Filosofía infantil"}); print("POST", r.status_code); pp(r)
-wid = r.json().get("id")
+work = api.works.create({"title":"El Principito","theme":"Filosofía infantil"}); print("POST"); pp(work)
+wid = work.get("id")
 
-# LIST
-r = requests.get(BASE); print("\nGET ALL", r.status_code); pp(r)
+# LIST (todas las paginas)
+print("\nGET ALL"); pp(list(api.works.iter()))
 
 # GET ONE
-r = requests.get(f"{BASE}/{wid}"); print("\nGET ONE", r.status_code); pp(r)
+print("\nGET ONE"); pp(api.works.get(wid))
 
 # PUT
-r = requests.put(f"{BASE}/{wid}", json={"title":"El Principito (ed. revisada)","theme":"Cuento filosófico"}); print("\nPUT", r.status_code); pp(r)
+print("\nPUT"); pp(api.works.update(wid, {"title":"El Principito (ed. revisada)","theme":"Cuento filosófico"}))
 
 # PATCH
-r = requests.patch(f"{BASE}/{wid}", json={"theme":"Clásico universal"}); print("\nPATCH", r.status_code); pp(r)
+print("\nPATCH"); pp(api.works.patch(wid, {"theme":"Clásico universal"}))
 
 # DELETE
-r = requests.delete(f"{BASE}/{wid}"); print("\nDELETE", r.status_code); pp(r)
+print("\nDELETE", api.works.delete(wid))
 
 # FINAL LIST
-r = requests.get(BASE); print("\nGET ALL (final)", r.status_code); pp(r)
+print("\nGET ALL (final)"); pp(list(api.works.iter()))
@@ -5,12 +5,14 @@
 #*************************************************************************
 
 # Librerias
-import requests
-import json
+from client import LibraryClient, ApiError
 
 # URL DE CODESPACE EN PUERTO 8000
 BASE_URL = "https://neglected-spooky-specter-7vv65xg7w7xv2pvqv-8000.app.github.dev"
 
+# Una sola sesion (keep-alive, timeouts y reintentos) para todas las llamadas, ver client.py
+api = LibraryClient(BASE_URL)
+
 
 #*************************************************************************
 #
@@ -24,16 +26,13 @@ BASE_URL = "https://neglected-spooky-specter-7vv65xg7w7xv2pvqv-8000.app.github.d
 
 def get_all_relations():
     """Consume el servicio READ ALL (GET /work_author)"""
-    url = f"{BASE_URL}/work_author"
     print(f"\n******************************************")
     print(f"\n*     Probando GET (Listar Todo)         *")
     print(f"\n******************************************")
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Lanza excepción para códigos 4xx/5xx
-        print(f"Estatus del servicio: {response.status_code}")
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        # Recorre todas las paginas (cursor)
+        return list(api.work_author.iter())
+    except (ApiError, OSError) as e:
         print(f"Error al listar relaciones: {e}")
         return None
 
@@ -43,20 +42,16 @@ def get_all_relations():
 
 def create_relation(work_id, author_id):
     """Consume el servicio CREATE (POST /work_author)"""
-    url = f"{BASE_URL}/work_author"
-    data = {"work_id": work_id, "author_id": author_id}
     print(f"\n**********************************************************")
     print(f"\n* Probando POST (Crear Relación: {work_id}, {author_id}) *")
     print(f"\n**********************************************************")
     try:
-        response = requests.post(url, json=data)
-        print(f"Estatus del servicio: {response.status_code}")
-        # Intenta imprimir el mensaje JSON
-        try:
-            return response.json()
-        except json.JSONDecodeError:
-            return response.text
-    except requests.exceptions.RequestException as e:
+        return api.work_author.create(work_id, author_id)
+    except ApiError as e:
+        # 409 si la relacion ya existe o los IDs no son validos
+        print(f"Estatus del servicio: {e.status}")
+        return e.payload
+    except OSError as e:
         print(f"Error al crear relación: {e}")
         return None
 
@@ -66,16 +61,13 @@ def create_relation(work_id, author_id):
 
 def search_relation(work_id, author_id):
     """Consume el servicio READ ONE (POST /work_author/search)"""
-    url = f"{BASE_URL}/work_author/search"
-    data = {"work_id": work_id, "author_id": author_id}
     print(f"\n******************************************************************")
     print(f"\n*   Probando SEARCH (Buscar Relación: {work_id}, {author_id})    *")
     print(f"\n******************************************************************")
     try:
-        response = requests.post(url, json=data)
-        print(f"Estatus del servicio: {response.status_code}")
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        # None si la relacion no existe
+        return api.work_author.search(work_id, author_id)
+    except (ApiError, OSError) as e:
         print(f"Error al buscar relación: {e}")
         return None
 
@@ -84,16 +76,13 @@ def search_relation(work_id, author_id):
 #*************************************************************************
 def delete_relation(work_id, author_id):
     """Consume el servicio DELETE (DELETE /work_author)"""
-    url = f"{BASE_URL}/work_author"
-    data = {"work_id": work_id, "author_id": author_id}
     print(f"\n*******************************************************************")
     print(f"\n*   Probando DELETE (Eliminar Relación: {work_id}, {author_id})   *")
     print(f"\n*******************************************************************")
     try:
-        response = requests.delete(url, json=data)
-        print(f"Estatus del servicio: {response.status_code}")
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        # True si se elimino, False si no existia
+        return api.work_author.delete(work_id, author_id)
+    except (ApiError, OSError) as e:
         print(f"Error al eliminar relación: {e}")
         return None
 
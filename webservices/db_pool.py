@@ -0,0 +1,205 @@
+# db_pool.py
+# Pool de conexiones SQLite compartido por todos los servicios.
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any
+
+from flask import g, jsonify
+
+from db_tuning import apply_profile, start_checkpointer, checkpoint_stats
+from metrics import connection_class
+
+# ---------- Configuracion ----------
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+# Segundos de inactividad tras los cuales se verifica una conexion antes de reutilizarla
+HEALTH_CHECK_AFTER = float(os.environ.get("DB_POOL_HEALTH_CHECK", "30"))
+
+
+class PoolTimeout(Exception):
+    """No se pudo obtener una conexion del pool dentro del tiempo de espera."""
+
+
+class ConnectionPool:
+    """Pool acotado de conexiones a una base de datos SQLite (uno por proceso)."""
+
+    def __init__(self, database: str, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        # LIFO: se reutiliza primero la conexion mas reciente (cache de paginas caliente)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._stats = {
+            "checkouts": 0,
+            "hits": 0,
+            "misses": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "discarded": 0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        # Con METRICS activo cada sentencia se mide (ver metrics.py)
+        conn = sqlite3.connect(self.database, check_same_thread=False, factory=connection_class())
+        conn.row_factory = sqlite3.Row
+        # Perfil de PRAGMA del despliegue (WAL, busy_timeout, cache...), ver db_tuning.py
+        apply_profile(conn)
+        return conn
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+            self._stats["discarded"] += 1
+
+    def _new_connection(self) -> sqlite3.Connection:
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def acquire(self) -> sqlite3.Connection:
+        """Obtiene una conexion: reutiliza una inactiva, crea una nueva o espera."""
+        try:
+            conn, last_used = self._idle.get_nowait()
+            self._count("hits")
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                conn, last_used = self._new_connection(), time.monotonic()
+                self._count("misses")
+            else:
+                self._count("waits")
+                try:
+                    conn, last_used = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    self._count("timeouts")
+                    raise PoolTimeout(f"Pool de '{self.database}' agotado ({self.size} conexiones)")
+                self._count("hits")
+
+        if time.monotonic() - last_used > HEALTH_CHECK_AFTER and not self._healthy(conn):
+            self._discard(conn)
+            with self._lock:
+                self._created += 1
+            conn = self._new_connection()
+
+        self._count("checkouts")
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Devuelve una conexion al pool, descartando transacciones abiertas."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """Igual que `with sqlite3.connect(...)`: commit al salir, rollback si hay error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+            data["size"] = self.size
+            data["open"] = self._created
+        data["idle"] = self._idle.qsize()
+        data["in_use"] = data["open"] - data["idle"]
+        data["hit_rate"] = round(data["hits"] / data["checkouts"], 4) if data["checkouts"] else None
+        return data
+
+
+# ---------- Registro de pools (uno por archivo de base de datos) ----------
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database: str) -> ConnectionPool:
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = _pools[database] = ConnectionPool(database)
+            start_checkpointer(database)
+        return pool
+
+
+# Tras un fork (workers pre-fork, ver serve.py) las conexiones heredadas no se usan ni se
+# cierran en el hijo: cerrarlas liberaria los locks POSIX del proceso padre. Se guardan
+# aparte y el hijo abre las suyas.
+_inherited = []
+
+
+def _after_fork_in_child():
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    _inherited.extend(_pools.values())
+    _pools.clear()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def pool_stats() -> Dict[str, Any]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.database: dict(pool.stats(), checkpoint=checkpoint_stats(pool.database)) for pool in pools}
+
+
+# ---------- Integracion con Flask ----------
+def get_db(database: str) -> sqlite3.Connection:
+    """Conexion del pool ligada al contexto de aplicacion actual.
+
+    Se reutiliza durante toda la peticion y se devuelve al pool en el teardown.
+    """
+    conns = g.setdefault("_db_conns", {})
+    if database not in conns:
+        conns[database] = get_pool(database).acquire()
+    return conns[database]
+
+
+def release_db(exc=None):
+    conns = g.pop("_db_conns", {})
+    for database, conn in conns.items():
+        get_pool(database).release(conn)
+
+
+def init_app(app):
+    """Registra el teardown del pool y el endpoint de metricas en una app Flask."""
+    app.teardown_appcontext(release_db)
+    app.add_url_rule("/_pool", "pool_stats", lambda: jsonify(pool_stats()))
@@ -0,0 +1,151 @@
+# db_tuning.py
+# Perfiles de PRAGMA para SQLite y programador de checkpoints del WAL.
+#
+# El perfil se elige por despliegue con DB_PROFILE (por defecto "wal") y cada PRAGMA
+# se puede sobrescribir con DB_PRAGMA_<NOMBRE>, p. ej. DB_PRAGMA_CACHE_SIZE=-131072.
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # Diario de rollback clasico: un escritor bloquea a todos los lectores
+    "legacy": {
+        "foreign_keys": "ON",
+        "busy_timeout": 5000,
+    },
+    # Lectores concurrentes con un escritor; fsync solo en los checkpoints
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -65536,         # 64 MiB por conexion
+        "mmap_size": 268435456,       # 256 MiB
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,   # paginas
+        "foreign_keys": "ON",
+    },
+    # Igual que "wal" pero sin perder transacciones confirmadas ante un corte de energia
+    "wal-durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 10000,
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+        "foreign_keys": "ON",
+    },
+}
+
+DB_PROFILE = os.environ.get("DB_PROFILE", "wal")
+CHECKPOINT_INTERVAL = float(os.environ.get("DB_CHECKPOINT_INTERVAL", "30"))
+# Si el WAL supera este tamano se hace un checkpoint TRUNCATE en lugar de PASSIVE
+CHECKPOINT_TRUNCATE_BYTES = int(os.environ.get("DB_CHECKPOINT_TRUNCATE_BYTES", str(64 * 1024 * 1024)))
+
+
+def profile_pragmas(name: Optional[str] = None) -> Dict[str, Any]:
+    """PRAGMA del perfil `name` (o DB_PROFILE) con las sobrescrituras DB_PRAGMA_*."""
+    name = name or DB_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Perfil SQLite desconocido: {name} (opciones: {', '.join(PROFILES)})")
+    pragmas = dict(PROFILES[name])
+    for key, value in os.environ.items():
+        if key.startswith("DB_PRAGMA_"):
+            pragmas[key[len("DB_PRAGMA_"):].lower()] = value
+    return pragmas
+
+
+def apply_profile(conn: sqlite3.Connection, name: Optional[str] = None) -> Dict[str, Any]:
+    pragmas = profile_pragmas(name)
+    for pragma, value in pragmas.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return pragmas
+
+
+def uses_wal(name: Optional[str] = None) -> bool:
+    return str(profile_pragmas(name).get("journal_mode", "")).upper() == "WAL"
+
+
+# ---------- Checkpoints ----------
+class CheckpointScheduler(threading.Thread):
+    """Hilo que hace checkpoints periodicos para que el WAL no crezca sin limite.
+
+    PASSIVE no bloquea a nadie; si el archivo -wal pasa de `truncate_bytes`
+    se usa TRUNCATE, que espera a los lectores y deja el WAL en cero bytes.
+    """
+
+    def __init__(self, database: str, interval: float = CHECKPOINT_INTERVAL,
+                 truncate_bytes: int = CHECKPOINT_TRUNCATE_BYTES):
+        super().__init__(name=f"wal-checkpoint:{database}", daemon=True)
+        self.database = database
+        self.interval = interval
+        self.truncate_bytes = truncate_bytes
+        self._stop_event = threading.Event()
+        self._stats = {"runs": 0, "truncates": 0, "errors": 0, "last": None}
+
+    def wal_size(self) -> int:
+        try:
+            return os.path.getsize(self.database + "-wal")
+        except OSError:
+            return 0
+
+    def checkpoint(self, conn: sqlite3.Connection):
+        mode = "TRUNCATE" if self.wal_size() > self.truncate_bytes else "PASSIVE"
+        busy, log_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        self._stats["runs"] += 1
+        self._stats["truncates"] += mode == "TRUNCATE"
+        self._stats["last"] = {"mode": mode, "busy": busy, "log_frames": log_frames,
+                               "checkpointed": checkpointed, "at": time.time()}
+
+    def run(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {profile_pragmas().get('busy_timeout', 5000)}")
+        try:
+            while not self._stop_event.wait(self.interval):
+                try:
+                    self.checkpoint(conn)
+                except sqlite3.Error:
+                    self._stats["errors"] += 1
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        data = dict(self._stats)
+        data["wal_bytes"] = self.wal_size()
+        return data
+
+
+_schedulers: Dict[str, CheckpointScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def start_checkpointer(database: str) -> Optional[CheckpointScheduler]:
+    """Arranca (una vez por proceso) el checkpointer de `database` si el perfil usa WAL."""
+    if not uses_wal() or CHECKPOINT_INTERVAL <= 0:
+        return None
+    with _schedulers_lock:
+        scheduler = _schedulers.get(database)
+        if scheduler is None:
+            scheduler = _schedulers[database] = CheckpointScheduler(database)
+            scheduler.start()
+        return scheduler
+
+
+def _after_fork_in_child():
+    # Los hilos no sobreviven al fork: cada worker arranca su propio checkpointer
+    global _schedulers_lock
+    _schedulers_lock = threading.Lock()
+    _schedulers.clear()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def checkpoint_stats(database: str) -> Optional[Dict[str, Any]]:
+    scheduler = _schedulers.get(database)
+    return scheduler.stats() if scheduler else None
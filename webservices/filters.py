@@ -0,0 +1,133 @@
+# filters.py
+# Filtros y ordenamiento por query string para los endpoints de coleccion.
+#
+#   /item?status__in=available,loaned&location=Sala%20A&sort=-updated_at
+#   /edition?work_id=7&year__gte=1990&year__lt=2000&sort=-year
+#
+# Solo se aceptan las columnas y operadores de FILTERS (todas con indice, ver la
+# migracion 6); todo se compila a SQL parametrizado y alimenta la paginacion por cursor.
+from collections import namedtuple
+from typing import Any, Dict, List, Sequence, Tuple
+
+from flask import request
+
+from pagination import SortKey
+
+EQUALITY = ("eq", "ne", "in")
+RANGE = EQUALITY + ("gt", "gte", "lt", "lte")
+MAX_IN_VALUES = 500
+
+# type: conversion del valor; ops: operadores permitidos; sortable: admite ?sort=;
+# nullable: la columna puede ser NULL (agrega ?col__isnull= y afecta el cursor)
+Field = namedtuple("Field", "type ops sortable nullable", defaults=(EQUALITY, False, False))
+
+FILTERS: Dict[str, Dict[str, Field]] = {
+    "work": {
+        "id": Field(int, RANGE, sortable=True),
+        "theme": Field(str, EQUALITY, nullable=True),
+        "created_at": Field(str, RANGE, sortable=True),
+    },
+    "author": {
+        "id": Field(int, RANGE, sortable=True),
+        "full_name": Field(str, EQUALITY, sortable=True),
+    },
+    "work_author": {
+        "work_id": Field(int),
+        "author_id": Field(int),
+    },
+    "edition": {
+        "id": Field(int, RANGE, sortable=True),
+        "work_id": Field(int),
+        "year": Field(int, RANGE, sortable=True, nullable=True),
+        "publisher": Field(str, EQUALITY, sortable=True, nullable=True),
+        "isbn": Field(str),
+    },
+    "item": {
+        "id": Field(int, RANGE, sortable=True),
+        "edition_id": Field(int),
+        "barcode": Field(str),
+        "status": Field(str, EQUALITY),
+        "location": Field(str, EQUALITY, sortable=True, nullable=True),
+    },
+}
+# Columnas unicas que desempatan cualquier orden (la ultima clave del cursor debe ser unica)
+TIEBREAK = {"work_author": ("work_id", "author_id")}
+
+# Parametros de otros modulos (paginacion, proyeccion, streaming...)
+RESERVED = {"limit", "cursor", "count", "fields", "include", "stream", "sort"}
+OPERATORS = {"eq": "=", "ne": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+class FilterError(ValueError):
+    """Filtro u orden no permitido o con un valor invalido."""
+
+
+def _convert(field: Field, column: str, value: str) -> Any:
+    try:
+        return field.type(value)
+    except ValueError:
+        raise FilterError(f"Valor invalido para {column}: {value}")
+
+
+def parse_filters(table: str, args=None) -> Tuple[List[str], List[Any]]:
+    """(condiciones WHERE, parametros) de `columna[__operador]=valor` en la query string."""
+    args = request.args if args is None else args
+    spec = FILTERS.get(table, {})
+    where, params = [], []
+    for name, value in args.items(multi=True):
+        if name in RESERVED or name.startswith("fields["):
+            continue
+        column, _, op = name.partition("__")
+        op = op or "eq"
+        field = spec.get(column)
+        if field is None:
+            raise FilterError(f"No se puede filtrar {table} por {column}")
+        if op == "isnull" and field.nullable:
+            if value not in ("true", "false", "1", "0"):
+                raise FilterError(f"{name} debe ser true o false")
+            where.append(f"{column} IS {'' if value in ('true', '1') else 'NOT '}NULL")
+        elif op not in field.ops:
+            raise FilterError(f"Operador no permitido para {column}: {op}")
+        elif op == "in":
+            values = [_convert(field, column, v) for v in value.split(",") if v != ""]
+            if not values or len(values) > MAX_IN_VALUES:
+                raise FilterError(f"{name} admite entre 1 y {MAX_IN_VALUES} valores")
+            where.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        else:
+            where.append(f"{column} {OPERATORS[op]} ?")
+            params.append(_convert(field, column, value))
+    return where, params
+
+
+def parse_sort(table: str, default_keys: Sequence[SortKey], args=None) -> List[SortKey]:
+    """Claves de ?sort=-year,publisher (prefijo '-' = descendente) con desempate unico."""
+    args = request.args if args is None else args
+    value = args.get("sort")
+    if not value:
+        return list(default_keys)
+    spec = FILTERS.get(table, {})
+    keys = []
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        column = part.lstrip("-")
+        field = spec.get(column)
+        if field is None or not field.sortable:
+            raise FilterError(f"No se puede ordenar {table} por {column}")
+        if any(key.column == column for key in keys):
+            raise FilterError(f"Columna repetida en sort: {column}")
+        keys.append(SortKey(column, part.startswith("-"), field.nullable))
+    if not keys:
+        return list(default_keys)
+    # Desempate en la misma direccion que la primera clave: el seek puede usar row-values
+    descending = keys[0].descending
+    for column in TIEBREAK.get(table, ("id",)):
+        if all(key.column != column for key in keys):
+            keys.append(SortKey(column, descending))
+    return keys
+
+
+def parse_query(table: str, default_keys: Sequence[SortKey], args=None
+                ) -> Tuple[List[str], List[Any], List[SortKey]]:
+    """Filtros y orden de la peticion: (where, params, keys) para fetch_page/build_select."""
+    where, params = parse_filters(table, args)
+    return where, params, parse_sort(table, default_keys, args)
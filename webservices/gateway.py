@@ -0,0 +1,64 @@
+# gateway.py
+# Un solo proceso para todos los servicios sobre UNA base (LIBRARY_DB).
+#
+# create_app() monta los Blueprints de ws_crud.py (/work, /author, /work_author,
+# /edition, /item, /search, /availability...) y, como alias de compatibilidad, los
+# de app_work.py (/works), app_edition.py (/editions) y app_work_author.py
+# (/work_author/search, DELETE /work_author). Como todos los modulos usan la misma
+# base en el mismo proceso, comparten el pool de conexiones, el indice de
+# barcode/ISBN y el registro de cambios; los caches se mantienen coherentes entre
+# si leyendo la tabla `changes` (ver cache.py).
+#
+#   LIBRARY_DB=library.db python gateway.py      (desarrollo, puerto 8000)
+#   python serve.py gateway                      (produccion, ver serve.py)
+#
+# Si dos servicios definen la misma ruta y metodo (GET/POST /work_author, GET /)
+# responde la de ws_crud.py, que se registra primero.
+import os
+import sys
+
+from flask import Flask
+
+from db_pool import init_app
+from cache import init_app as cache_init_app
+from changes import init_app as changes_init_app
+from metrics import init_app as metrics_init_app
+from conditional import PreconditionFailed, precondition_failed
+
+DEFAULT_DATABASE = "library.db"
+
+
+def create_app(database: str = None) -> Flask:
+    """App con los Blueprints de los cuatro servicios sobre `database` (o LIBRARY_DB)."""
+    database = database or os.environ.get("LIBRARY_DB", DEFAULT_DATABASE)
+    # Los modulos de servicio leen LIBRARY_DB al importarse (y aplican las migraciones)
+    os.environ["LIBRARY_DB"] = database
+    import ws_crud
+    import ws_crud_work
+    import app_edition
+    import app_work
+    import app_work_author
+
+    loaded = {ws_crud.DATABASE, ws_crud_work.DB_FILE, app_edition.DATABASE, app_work_author.DATABASE_NAME}
+    if loaded != {database}:
+        raise RuntimeError(f"Los servicios ya se importaron con otras bases ({', '.join(sorted(loaded))}); "
+                           f"defina LIBRARY_DB antes de importarlos")
+
+    app = Flask(__name__)
+    init_app(app)
+    cache_init_app(app)
+    changes_init_app(app, database)
+    metrics_init_app(app)
+    app.register_error_handler(PreconditionFailed, precondition_failed)
+    for blueprint in ws_crud.BLUEPRINTS:
+        app.register_blueprint(blueprint)
+    for module in (app_work, app_edition, app_work_author):
+        app.register_blueprint(module.bp)
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    # Servidor de desarrollo; en produccion: python serve.py gateway
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", "8000")), debug="--debug" in sys.argv)
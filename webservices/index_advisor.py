@@ -0,0 +1,242 @@
+# index_advisor.py
+# Revisa con EXPLAIN QUERY PLAN el SQL que ejecutan los servicios y reporta las
+# consultas que recorren tablas.
+#
+#   python index_advisor.py [library.db]
+#
+# Sobre una copia temporal de la base, recorre con el cliente de pruebas de gateway.py
+# un conjunto de peticiones representativas: cada filtro y cada orden de filters.py,
+# cada relacion de relations.py, la primera pagina y la siguiente por cursor, busqueda,
+# disponibilidad, codigos de barras/ISBN, registro de cambios y prestamos. Las sentencias
+# se capturan con los oyentes de metrics.py, asi que lo revisado es lo que arman
+# pagination.py, filters.py, relations.py, search.py... y no una copia a mano. Cada
+# sentencia distinta (metrics.normalize) se explica con los parametros de su primera
+# ejecucion.
+#
+# Sale con codigo 1 si alguna consulta hace SCAN completo o usa un B-tree temporal
+# para ordenar, para poder usarlo como chequeo de regresion.
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from typing import Any, Dict, List, Sequence, Tuple
+from urllib.parse import urlencode
+
+# Los oyentes de sentencias solo existen con METRICS activo (ver metrics.py)
+os.environ["METRICS"] = "on"
+
+from filters import FILTERS  # noqa: E402
+from metrics import normalize, statement_listeners  # noqa: E402
+from relations import RELATIONS  # noqa: E402
+
+# (metodo, ruta, cuerpo JSON)
+Request = Tuple[str, str, Any]
+STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+# Colecciones de ws_crud.py y, para edition, tambien GET /editions de app_edition.py
+LISTINGS = {"work": ["/work"], "author": ["/author"], "work_author": ["/work_author"],
+            "edition": ["/edition", "/editions"], "item": ["/item"]}
+
+
+# ---------- Peticiones ----------
+def samples(conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+    """Una fila existente por tabla, para que los filtros y busquedas encuentren algo."""
+    found = {}
+    for table in FILTERS:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(f"SELECT * FROM {table} ORDER BY rowid LIMIT 1").fetchone()
+        found[table] = dict(row) if row else {}
+    conn.row_factory = None
+    return found
+
+
+def listing_requests(sample: Dict[str, Dict[str, Any]]) -> List[Request]:
+    """Cada filtro de FILTERS, solo y con cada orden admitido, sobre cada coleccion."""
+    requests = []
+    for table, fields in FILTERS.items():
+        row = sample[table]
+        sorts = [None] + [f"-{column}" for column, field in fields.items() if field.sortable]
+        filters: List[Dict[str, Any]] = [{}]
+        for column, field in fields.items():
+            value = row.get(column, 1)
+            if value is None:
+                value = 1
+            filters.append({column: value})
+            if "in" in field.ops:
+                filters.append({f"{column}__in": f"{value},{value}"})
+            if "gte" in field.ops:
+                filters.append({f"{column}__gte": value})
+            if field.nullable:
+                filters.append({f"{column}__isnull": "true"})
+        for path in LISTINGS[table]:
+            requests.append(("GET", f"{path}?{urlencode({'limit': 2, 'count': 'exact'})}", None))
+            for where in filters:
+                for sort in sorts:
+                    args = dict(where, limit=2, **({"sort": sort} if sort else {}))
+                    requests.append(("GET", f"{path}?{urlencode(args)}", None))
+    return requests
+
+
+def relation_requests(sample: Dict[str, Dict[str, Any]]) -> List[Request]:
+    """Cada relacion de RELATIONS embebida en el listado y en un registro."""
+    requests = []
+    for table, relations in RELATIONS.items():
+        record_id = sample[table].get("id", 1)
+        for name in relations:
+            requests.append(("GET", f"/{table}?limit=2&include={name}", None))
+            requests.append(("GET", f"/{table}/{record_id}?include={name}", None))
+        requests.append(("GET", f"/{table}/{record_id}?fields={table}=id", None))
+    return requests
+
+
+def service_requests(sample: Dict[str, Dict[str, Any]]) -> List[Request]:
+    """Rutas de los servicios que no salen de FILTERS ni de RELATIONS."""
+    work, edition, item, link = sample["work"], sample["edition"], sample["item"], sample["work_author"]
+    word = (re.findall(r"\w+", work.get("title") or "") or ["a"])[0].lower()
+    work_id, edition_id = work.get("id", 1), edition.get("id", 1)
+    barcode, isbn = item.get("barcode") or "BC1", edition.get("isbn") or "9780306406157"
+    requests = [(method, path, None) for method, path in (
+        ("GET", f"/work/{work_id}"), ("GET", f"/author/{sample['author'].get('id', 1)}"),
+        ("GET", f"/edition/{edition_id}"), ("GET", f"/item/{item.get('id', 1)}"),
+        # ws_crud_work.py: recientes, tema, busqueda FTS, relevancia y offset
+        ("GET", "/works?limit=2"), ("GET", "/works?limit=2&order=asc"),
+        ("GET", f"/works?{urlencode({'theme': work.get('theme') or '', 'limit': 2})}"),
+        ("GET", f"/works?q={word}&limit=2"), ("GET", f"/works?q={word}&order=relevance&limit=2"),
+        ("GET", "/works?limit=2&offset=2"), ("GET", "/works?limit=2&count=exact"),
+        ("GET", f"/works/{work_id}"), ("GET", f"/editions/{edition_id}"),
+        ("GET", f"/search?q={word}"), ("GET", f"/search?q={word}&type=author"),
+        ("GET", f"/availability?work_id={work_id}&edition_id={edition_id}"),
+        ("GET", f"/work/{work_id}/availability"), ("GET", f"/edition/{edition_id}/availability"),
+        ("GET", f"/item/by-barcode/{barcode}"), ("GET", f"/edition/by-isbn/{isbn}"),
+        ("GET", "/changes?since=0&limit=10"), ("GET", "/changes?since=0&table=item&limit=10"),
+    )]
+    requests += [
+        ("POST", "/item/by-barcode", [barcode, "BC-inexistente"]),
+        ("POST", "/edition/by-isbn", [isbn, "0306406152"]),
+        ("POST", "/work_author/search", {"work_id": link.get("work_id", 1), "author_id": link.get("author_id", 1)}),
+        # Escrituras: solo tocan la copia
+        ("POST", "/item/_checkout", [barcode]),
+        ("POST", "/item/_return", [barcode]),
+    ]
+    return requests
+
+
+# ---------- Captura ----------
+def capture(database: str) -> Dict[str, Dict[str, Any]]:
+    """Ejecuta las peticiones sobre `database` y devuelve {sentencia normalizada: primera ejecucion}."""
+    os.environ["LIBRARY_DB"] = database
+    import gateway
+
+    conn = sqlite3.connect(database)
+    try:
+        sample = samples(conn)
+    finally:
+        conn.close()
+    requests = listing_requests(sample) + relation_requests(sample) + service_requests(sample)
+
+    statements: Dict[str, Dict[str, Any]] = {}
+    current = [""]
+
+    def listener(sql: str, params: Any):
+        if sql.lstrip().split(None, 1)[0].upper() not in STATEMENTS:
+            return
+        statement = normalize(sql)
+        if statement not in statements:
+            statements[statement] = {"sql": sql, "params": params, "request": current[0]}
+
+    client = gateway.app.test_client()
+    statement_listeners.append(listener)
+    try:
+        for method, path, body in requests:
+            current[0] = f"{method} {path}"
+            response = client.open(path, method=method, json=body)
+            # La pagina siguiente ejecuta el seek del cursor
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None and response.is_json and isinstance(response.get_json(), dict):
+                cursor = response.get_json().get("next_cursor")
+            if method == "GET" and cursor:
+                path = f"{path}{'&' if '?' in path else '?'}{urlencode({'cursor': cursor})}"
+                current[0] = f"{method} {path}"
+                client.open(path, method=method)
+    finally:
+        statement_listeners.remove(listener)
+    return statements
+
+
+# ---------- Planes ----------
+def explain(conn: sqlite3.Connection, sql: str, params: Sequence[Any] = ()) -> List[str]:
+    try:
+        return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(params)).fetchall()]
+    except sqlite3.ProgrammingError as e:
+        # executemany: los parametros no se conocen; el plan no depende de sus valores
+        count = re.search(r"uses (\d+)", str(e))
+        if not count:
+            raise
+        return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", (None,) * int(count.group(1)))]
+
+
+# Busqueda por una clave unica (rowid o indice UNIQUE): a lo sumo una fila por valor
+UNIQUE_SEARCH = re.compile(r"^SEARCH \w+ USING (INTEGER PRIMARY KEY \(rowid=\?\)|"
+                           r"(COVERING )?INDEX sqlite_autoindex_\w+ \(\w+=\?\))$")
+
+
+def problems(plan: List[str], sql: str = "") -> List[str]:
+    """Pasos del plan que crecen con el tamano de la tabla.
+
+    No cuentan: un SCAN en el orden pedido sin filtros y con LIMIT (lee LIMIT filas) ni
+    ordenar lo que devolvio una busqueda por clave unica (una fila por valor de IN).
+    """
+    bounded_sort = bool(plan) and all(UNIQUE_SEARCH.match(step) or step.startswith("USE TEMP B-TREE")
+                                      for step in plan)
+    sorts = any(step.startswith("USE TEMP B-TREE") for step in plan)
+    limited = " LIMIT " in sql.upper() and " WHERE " not in sql.upper()
+    found = []
+    for step in plan:
+        if step.startswith("SCAN ") and " USING " not in step and " VIRTUAL TABLE " not in step:
+            if not (limited and not sorts):
+                found.append(step)
+        elif step.startswith("USE TEMP B-TREE") and not bounded_sort:
+            found.append(step)
+    return found
+
+
+def advise(database: str) -> List[Dict[str, Any]]:
+    """Captura el SQL de los servicios sobre una copia de `database` y explica cada sentencia."""
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, os.path.basename(database))
+        if os.path.exists(database):
+            source = sqlite3.connect(database)
+            target = sqlite3.connect(copy)
+            source.backup(target)
+            source.close()
+            target.close()
+        statements = capture(copy)
+        conn = sqlite3.connect(copy)
+        try:
+            report = []
+            for statement, first in sorted(statements.items(), key=lambda item: item[1]["request"]):
+                plan = explain(conn, first["sql"], first["params"])
+                report.append({"query": statement, "request": first["request"], "plan": plan,
+                               "problems": problems(plan, first["sql"])})
+        finally:
+            conn.close()
+    return report
+
+
+def main(argv: List[str]) -> int:
+    database = argv[1] if len(argv) > 1 else "library.db"
+    report = advise(database)
+    failures = 0
+    for entry in report:
+        status = "SCAN" if entry["problems"] else "ok"
+        print(f"[{status:>4}] {entry['request']}")
+        print(f"         {entry['query']}")
+        for step in entry["plan"]:
+            print(f"           {step}")
+        failures += bool(entry["problems"])
+    print(f"\n{failures} de {len(report)} consultas recorren tablas")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,180 @@
+# lookup.py
+# Busqueda por codigo de barras (item.barcode) e ISBN (edition.isbn) con un indice
+# hash en memoria: clave normalizada -> id.
+#
+# El indice se carga completo la primera vez y antes de cada consulta aplica lo que
+# haya en `changes` (migracion 5) despues del ultimo seq visto, asi que ve las
+# escrituras de cualquier proceso o app sobre la misma base, no solo las propias.
+# Si el historial ya no alcanza (prune) o llega un 'reset' de la carga masiva, se
+# recarga. Con LOOKUP_INDEX=off, o si la tabla supera LOOKUP_MAX_ROWS, se consulta
+# directamente el indice UNIQUE de SQLite.
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LOOKUP_INDEX = os.environ.get("LOOKUP_INDEX", "on") != "off"
+LOOKUP_MAX_ROWS = int(os.environ.get("LOOKUP_MAX_ROWS", "2000000"))
+IN_CHUNK = 500
+
+_SEPARATORS = re.compile(r"[\s-]")
+
+
+# ---------- Normalizacion ----------
+def _isbn13_check(first12: str) -> str:
+    return str((10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12)) % 10) % 10)
+
+
+def normalize_isbn(value: str) -> Optional[str]:
+    """ISBN-10 o ISBN-13, con o sin guiones/espacios, como ISBN-13 de solo digitos.
+
+    None si no es un ISBN valido (largo o digito verificador incorrecto).
+    """
+    code = _SEPARATORS.sub("", str(value)).upper()
+    if len(code) == 10 and code[:9].isdigit() and (code[9].isdigit() or code[9] == "X"):
+        total = sum((10 - i) * (10 if c == "X" else int(c)) for i, c in enumerate(code))
+        if total % 11:
+            return None
+        return "978" + code[:9] + _isbn13_check("978" + code[:9])
+    if len(code) == 13 and code.isdigit() and code[12] == _isbn13_check(code[:12]):
+        return code
+    return None
+
+
+def isbn_key(value: str) -> str:
+    # Los ISBN invalidos (datos viejos) se indexan tal cual, sin separadores
+    return normalize_isbn(value) or _SEPARATORS.sub("", str(value)).upper()
+
+
+def isbn_variants(value: str) -> List[str]:
+    """Formas en que el ISBN pudo guardarse: tal cual, ISBN-13 y, si empieza con 978, ISBN-10."""
+    variants = [value]
+    isbn13 = normalize_isbn(value)
+    if isbn13:
+        variants.append(isbn13)
+        if isbn13.startswith("978"):
+            total = sum((10 - i) * int(d) for i, d in enumerate(isbn13[3:12]))
+            check = (11 - total % 11) % 11
+            variants.append(isbn13[3:12] + ("X" if check == 10 else str(check)))
+    return list(dict.fromkeys(variants))
+
+
+# ---------- Indice ----------
+class HashIndex:
+    """clave normalizada -> id de una columna UNIQUE, al dia con la tabla `changes`."""
+
+    def __init__(self, table: str, column: str, key: Callable[[str], str] = str,
+                 variants: Callable[[str], List[str]] = lambda value: [value]):
+        self.table = table
+        self.column = column
+        self.key = key
+        self.variants = variants
+        self._ids: Dict[str, int] = {}
+        self._keys: Dict[int, str] = {}
+        self._seq: Optional[int] = None  # ultimo seq aplicado; None = sin cargar
+        self._enabled = LOOKUP_INDEX
+        self._lock = threading.Lock()
+
+    def _set(self, record_id: int, value: Optional[str]):
+        old = self._keys.pop(record_id, None)
+        if old is not None and self._ids.get(old) == record_id:
+            del self._ids[old]
+        if value is not None:
+            key = self.key(value)
+            self._ids[key] = record_id
+            self._keys[record_id] = key
+
+    def _load(self, conn: sqlite3.Connection):
+        # El seq se lee antes que las filas: lo que se escriba en medio se vuelve a aplicar
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+        total = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if total > LOOKUP_MAX_ROWS:
+            self._ids, self._keys, self._enabled = {}, {}, False
+            return
+        # Se arma aparte y se reemplaza de una vez: las lecturas concurrentes no ven un indice a medias
+        ids, keys = {}, {}
+        for record_id, value in conn.execute(
+                f"SELECT id, {self.column} FROM {self.table} WHERE {self.column} IS NOT NULL"):
+            key = keys[record_id] = self.key(value)
+            ids[key] = record_id
+        self._ids, self._keys, self._seq = ids, keys, seq
+
+    def _apply(self, conn: sqlite3.Connection, last: int):
+        changed, reset = set(), False
+        for op, record_key in conn.execute(
+                "SELECT op, record_key FROM changes WHERE seq > ? AND seq <= ? AND table_name = ?",
+                (self._seq, last, self.table)):
+            if op == "reset":
+                reset = True
+                break
+            changed.add(json.loads(record_key)["id"])
+        if reset:
+            self._load(conn)
+            return
+        ids = sorted(changed)
+        for start in range(0, len(ids), IN_CHUNK):
+            part = ids[start:start + IN_CHUNK]
+            current = dict(conn.execute(
+                f"SELECT id, {self.column} FROM {self.table} WHERE id IN ({', '.join('?' for _ in part)})",
+                part))
+            for record_id in part:
+                self._set(record_id, current.get(record_id))
+        self._seq = last
+
+    def sync(self, conn: sqlite3.Connection):
+        """Carga el indice o le aplica los cambios pendientes."""
+        if not self._enabled:
+            return
+        first, last = conn.execute("SELECT MIN(seq), MAX(seq) FROM changes").fetchone()
+        if self._seq is not None and self._seq == (last or 0):
+            return
+        with self._lock:
+            if self._seq is None or (first is not None and first > self._seq + 1):
+                self._load(conn)
+            elif self._seq < (last or 0):
+                self._apply(conn, last)
+
+    def resolve(self, conn: sqlite3.Connection, values: Iterable[str]) -> Dict[str, int]:
+        """{valor pedido: id} de los valores que existen (los demas no aparecen)."""
+        values = list(values)
+        self.sync(conn)
+        if self._enabled:
+            found = {value: self._ids.get(self.key(value)) for value in values}
+            return {value: record_id for value, record_id in found.items() if record_id is not None}
+        return self._resolve_sql(conn, values)
+
+    def _resolve_sql(self, conn: sqlite3.Connection, values: List[str]) -> Dict[str, int]:
+        # Sin indice en memoria: cada variante por el indice UNIQUE de la columna
+        wanted: List[Tuple[str, str]] = [(variant, value) for value in values for variant in self.variants(value)]
+        found: Dict[str, int] = {}
+        for start in range(0, len(wanted), IN_CHUNK):
+            part = wanted[start:start + IN_CHUNK]
+            rows = dict(conn.execute(
+                f"SELECT {self.column}, id FROM {self.table} WHERE {self.column} IN ({', '.join('?' for _ in part)})",
+                [variant for variant, _ in part]))
+            for variant, value in part:
+                if variant in rows:
+                    found.setdefault(value, rows[variant])
+        return found
+
+
+_indexes: Dict[Tuple[str, str], HashIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _get(database: str, table: str, factory: Callable[[], HashIndex]) -> HashIndex:
+    with _indexes_lock:
+        index = _indexes.get((database, table))
+        if index is None:
+            index = _indexes[(database, table)] = factory()
+        return index
+
+
+def barcode_index(database: str) -> HashIndex:
+    return _get(database, "item", lambda: HashIndex("item", "barcode"))
+
+
+def isbn_index(database: str) -> HashIndex:
+    return _get(database, "edition", lambda: HashIndex("edition", "isbn", key=isbn_key, variants=isbn_variants))
@@ -0,0 +1,245 @@
+# metrics.py
+# Instrumentacion de los servicios: latencia por ruta, tiempo y numero de ejecuciones
+# por sentencia SQL, registro de consultas lentas con su EXPLAIN QUERY PLAN, y
+# GET /metrics en formato de texto de Prometheus.
+#
+# Configuracion por entorno:
+#   METRICS=on|off       con off no se registra ningun hook ni endpoint y las conexiones
+#                        del pool son sqlite3.Connection normales (costo cero)
+#   SLOW_QUERY_MS        umbral de consulta lenta (por defecto 100 ms; 0 = no registrar)
+#   SLOW_QUERY_KEEP      ultimas consultas lentas que se conservan para GET /_slow_queries
+#   METRICS_MAX_STATEMENTS  sentencias distintas que se siguen; el resto va a "otras"
+#
+# Todas las conexiones de los servicios salen de db_pool.py, que las crea con
+# connection_class(): el tiempo de una sentencia es el de execute(), que en SQLite
+# incluye preparar la sentencia y producir la primera fila (donde ocurren los
+# ordenamientos y agregados); las filas siguientes se leen al iterar y no se cuentan.
+# Las metricas son por proceso: con varios workers (serve.py) cada uno reporta las suyas.
+import bisect
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Tuple
+
+from flask import g, jsonify, request
+
+METRICS = os.environ.get("METRICS", "on") != "off"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_KEEP = int(os.environ.get("SLOW_QUERY_KEEP", "100"))
+METRICS_MAX_STATEMENTS = int(os.environ.get("METRICS_MAX_STATEMENTS", "500"))
+# Limites (segundos) de los buckets de los histogramas
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+log = logging.getLogger("webservices")
+
+
+# ---------- Histogramas ----------
+class Histogram:
+    """Histograma acumulativo por combinacion de etiquetas (como los de Prometheus)."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values: Tuple[str, ...], seconds: float):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                # Un contador por bucket (+Inf al final), luego la suma y el total
+                series = self._series[values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, values):
+        return values in self._series
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {values: list(counts) for values, counts in self._series.items()}
+        for values, counts in sorted(series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {counts[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {counts[-1]}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Valores actuales de pool_stats()/cache_stats(); el resto son contadores (checkouts,
+# hits, misses, evictions...) y se exportan como counter con el sufijo _total
+GAUGES = {"size", "open", "idle", "in_use", "entries", "bytes", "max_entries", "max_bytes", "ttl"}
+
+request_latency = Histogram("http_request_duration_seconds", "Latencia de las peticiones por ruta",
+                            ("method", "route", "status"))
+sql_latency = Histogram("sqlite_statement_duration_seconds", "Duracion de execute() por sentencia SQL",
+                        ("statement",))
+slow_queries: deque = deque(maxlen=SLOW_QUERY_KEEP)
+_slow = {"total": 0}
+_slow_lock = threading.Lock()
+# Funciones (sql, parametros) llamadas en cada sentencia medida; index_advisor.py captura
+# asi el SQL real de los servicios. En executemany los parametros llegan vacios.
+statement_listeners: List[Callable[[str, Any], None]] = []
+
+
+# ---------- Sentencias SQL ----------
+_SPACES = re.compile(r"\s+")
+# Listas IN (?, ?, ...) y VALUES (...), (...) de largo variable cuentan como una sola sentencia
+_PLACEHOLDERS = re.compile(r"\?(\s*,\s*\?)+")
+_ROWS = re.compile(r"(\(\?(?:, \?)*\))(\s*,\s*\(\?(?:, \?)*\))+")
+
+
+def normalize(sql: str) -> str:
+    sql = _SPACES.sub(" ", sql).strip()
+    sql = _PLACEHOLDERS.sub("?, ...", _ROWS.sub(r"\1, ...", sql))
+    return sql[:300]
+
+
+def observe_sql(conn: sqlite3.Connection, sql: str, params: Any, seconds: float):
+    statement = normalize(sql)
+    if statement not in sql_latency and len(sql_latency) >= METRICS_MAX_STATEMENTS:
+        statement = "otras"
+    sql_latency.observe((statement,), seconds)
+    for listener in statement_listeners:
+        listener(sql, params)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        record_slow_query(conn, sql, params, seconds)
+
+
+def record_slow_query(conn: sqlite3.Connection, sql: str, params: Any, seconds: float):
+    try:
+        plan = [row[3] for row in sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params)]
+    except (sqlite3.Error, ValueError):
+        # Sentencias que no admiten EXPLAIN (varias sentencias, PRAGMA...) se registran sin plan
+        plan = []
+    entry = {"sql": normalize(sql), "ms": round(seconds * 1000, 2), "plan": plan,
+             "route": _current_route(), "at": time.time()}
+    with _slow_lock:
+        slow_queries.append(entry)
+        _slow["total"] += 1
+    log.warning("Consulta lenta (%.1f ms) en %s: %s | plan: %s",
+                entry["ms"], entry["route"], entry["sql"], "; ".join(plan) or "-")
+
+
+def _current_route() -> str:
+    try:
+        return request.url_rule.rule if request.url_rule else request.path
+    except RuntimeError:
+        # Fuera de una peticion (migraciones, hilos de fondo)
+        return "-"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observe_sql(self.connection, sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            observe_sql(self.connection, sql, (), time.perf_counter() - started)
+
+    def executescript(self, script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            sql_latency.observe(("script",), time.perf_counter() - started)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Conexion cuyas sentencias (conn.execute o cursor.execute) se miden."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+def connection_class():
+    """Clase de conexion para sqlite3.connect(factory=...) segun METRICS."""
+    return InstrumentedConnection if METRICS else sqlite3.Connection
+
+
+# ---------- Integracion con Flask ----------
+def _before_request():
+    g._metrics_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop("_metrics_started", None)
+    if started is not None:
+        # Respuestas en streaming: hasta que se envian las cabeceras
+        route = request.url_rule.rule if request.url_rule else "sin_ruta"
+        request_latency.observe((request.method, route, str(response.status_code)),
+                                time.perf_counter() - started)
+        if response.status_code >= 500 and not response.is_streamed:
+            # Los servicios responden {"error": "Error interno: ..."}: que quede en el log
+            log.error("%s %s -> %s: %s", request.method, request.path, response.status_code,
+                      response.get_data(as_text=True)[:500])
+    return response
+
+
+def render() -> str:
+    """Todas las metricas del proceso en formato de texto de Prometheus."""
+    from cache import cache_stats
+    from db_pool import pool_stats
+
+    lines = request_latency.render() + sql_latency.render()
+    lines += ["# HELP sqlite_slow_statements_total Sentencias por encima de SLOW_QUERY_MS",
+              "# TYPE sqlite_slow_statements_total counter", f"sqlite_slow_statements_total {_slow['total']}"]
+    for prefix, label, stats in (("db_pool", "database", pool_stats()), ("cache", "cache", cache_stats())):
+        series: Dict[str, List[str]] = {}
+        for name, values in stats.items():
+            for key, value in values.items():
+                if key == "hit_rate" or not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue  # hit_rate se calcula en Prometheus con rate() de los contadores
+                metric = f"{prefix}_{key}" if key in GAUGES else f"{prefix}_{key}_total"
+                series.setdefault(metric, []).append(f'{metric}{{{label}="{_escape(name)}"}} {value}')
+        for metric, samples in sorted(series.items()):
+            lines.append(f"# TYPE {metric} {'counter' if metric.endswith('_total') else 'gauge'}")
+            lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """Mide las peticiones de `app` y expone GET /metrics y GET /_slow_queries (si METRICS)."""
+    if not METRICS:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics",
+                     lambda: (render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}))
+    app.add_url_rule("/_slow_queries", "slow_queries", lambda: jsonify(list(slow_queries)))
@@ -0,0 +1,485 @@
+# migrations.py
+# Migraciones versionadas del esquema compartido por todos los servicios.
+# Cada migracion tiene sentencias `up` y `down`; nunca se edita una ya publicada,
+# se agrega una nueva con la siguiente version.
+#
+#   python migrations.py [library.db] status | up [version] | down <version>
+import sqlite3
+import sys
+import threading
+from collections import namedtuple
+from datetime import datetime
+from typing import List
+
+from db_pool import get_pool
+
+Migration = namedtuple("Migration", "version description up down")
+
+# Tablas con version de coleccion (ETag/Last-Modified de los listados, ver conditional.py)
+VERSIONED_TABLES = ("work", "author", "work_author", "edition", "item")
+NOW_MS = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def _version_triggers(table: str) -> List[str]:
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_version_{suffix} AFTER {event} ON {table} BEGIN
+            UPDATE table_version SET version = version + 1, updated_at = {NOW_MS} WHERE name = '{table}';
+        END
+        """
+        for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE"))
+    ]
+
+
+# Clave primaria de cada tabla en el registro de cambios (ver changes.py)
+CHANGE_KEYS = {
+    "work": ("id",),
+    "author": ("id",),
+    "work_author": ("work_id", "author_id"),
+    "edition": ("id",),
+    "item": ("id",),
+}
+
+
+def _change_triggers(table: str) -> List[str]:
+    def key(row):
+        return "json_object(" + ", ".join(f"'{column}', {row}.{column}" for column in CHANGE_KEYS[table]) + ")"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_changes_{suffix} AFTER {event} ON {table} BEGIN
+            INSERT INTO changes (table_name, op, record_key, changed_at)
+            VALUES ('{table}', '{op}', {key(row)}, {NOW_MS});
+        END
+        """
+        for suffix, event, op, row in (("ai", "INSERT", "insert", "new"), ("au", "UPDATE", "update", "new"),
+                                       ("ad", "DELETE", "delete", "old"))
+    ]
+
+
+# Columnas de work que faltan en la tabla provisional work(id, title) que creaba la
+# version original de app_edition.py (crud_dr.db); CREATE TABLE IF NOT EXISTS la deja igual
+LEGACY_WORK_COLUMNS = {
+    "theme": "TEXT",
+    "created_at": "TEXT NOT NULL DEFAULT ''",
+    "updated_at": "TEXT NOT NULL DEFAULT ''",
+}
+
+
+def _complete_legacy_work(conn: sqlite3.Connection):
+    """Agrega a work las columnas de LEGACY_WORK_COLUMNS que no tenga (fechas: ahora)."""
+    present = {row[1] for row in conn.execute("PRAGMA table_info(work)")}
+    missing = [column for column in LEGACY_WORK_COLUMNS if column not in present]
+    for column in missing:
+        conn.execute(f"ALTER TABLE work ADD COLUMN {column} {LEGACY_WORK_COLUMNS[column]}")
+    for column in ("created_at", "updated_at"):
+        if column in missing:
+            conn.execute(f"UPDATE work SET {column} = {NOW_MS} WHERE {column} = ''")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "esquema base", up=[
+        """
+        CREATE TABLE IF NOT EXISTS work (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            theme TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS author (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            full_name TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS work_author (
+            work_id INTEGER NOT NULL,
+            author_id INTEGER NOT NULL,
+            PRIMARY KEY (work_id, author_id),
+            FOREIGN KEY (work_id) REFERENCES work(id) ON DELETE CASCADE,
+            FOREIGN KEY (author_id) REFERENCES author(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS edition (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            work_id INTEGER NOT NULL,
+            year INTEGER,
+            publisher TEXT,
+            isbn TEXT UNIQUE,
+            cover_url TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (work_id) REFERENCES work(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS item (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            edition_id INTEGER NOT NULL,
+            barcode TEXT UNIQUE,
+            location TEXT,
+            status TEXT CHECK (status IN ('available','loaned','repair','lost')) DEFAULT 'available',
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (edition_id) REFERENCES edition(id) ON DELETE CASCADE
+        )
+        """,
+    ], down=[
+        "DROP TABLE IF EXISTS item",
+        "DROP TABLE IF EXISTS edition",
+        "DROP TABLE IF EXISTS work_author",
+        "DROP TABLE IF EXISTS author",
+        "DROP TABLE IF EXISTS work",
+    ]),
+    Migration(2, "indices secundarios para filtros, joins y ordenamiento", up=[
+        # Antes del primer indice sobre created_at; va aqui y no en la 1 porque en las bases
+        # con la tabla provisional la 1 ya quedo registrada y la 2 fallaba
+        _complete_legacy_work,
+        # Claves foraneas: joins y borrados en cascada
+        "CREATE INDEX IF NOT EXISTS idx_edition_work_id ON edition(work_id)",
+        "CREATE INDEX IF NOT EXISTS idx_item_edition_id ON item(edition_id)",
+        "CREATE INDEX IF NOT EXISTS idx_work_author_author_id ON work_author(author_id)",
+        # Filtros y ordenamientos de list_works / GET /editions / GET /item
+        "CREATE INDEX IF NOT EXISTS idx_work_created_at ON work(created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_work_theme_created_at ON work(theme, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_edition_year ON edition(year, id)",
+        "CREATE INDEX IF NOT EXISTS idx_item_status ON item(status)",
+    ], down=[
+        "DROP INDEX IF EXISTS idx_edition_work_id",
+        "DROP INDEX IF EXISTS idx_item_edition_id",
+        "DROP INDEX IF EXISTS idx_work_author_author_id",
+        "DROP INDEX IF EXISTS idx_work_created_at",
+        "DROP INDEX IF EXISTS idx_work_theme_created_at",
+        "DROP INDEX IF EXISTS idx_edition_year",
+        "DROP INDEX IF EXISTS idx_item_status",
+    ]),
+    Migration(3, "busqueda de texto completo (FTS5) sobre work y author", up=[
+        # Tablas externas: el texto vive en work/author y el indice se mantiene con triggers
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS work_fts USING fts5(
+            title, theme,
+            content='work', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS author_fts USING fts5(
+            full_name,
+            content='author', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS work_fts_ai AFTER INSERT ON work BEGIN
+            INSERT INTO work_fts(rowid, title, theme) VALUES (new.id, new.title, new.theme);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS work_fts_ad AFTER DELETE ON work BEGIN
+            INSERT INTO work_fts(work_fts, rowid, title, theme) VALUES ('delete', old.id, old.title, old.theme);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS work_fts_au AFTER UPDATE OF title, theme ON work BEGIN
+            INSERT INTO work_fts(work_fts, rowid, title, theme) VALUES ('delete', old.id, old.title, old.theme);
+            INSERT INTO work_fts(rowid, title, theme) VALUES (new.id, new.title, new.theme);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS author_fts_ai AFTER INSERT ON author BEGIN
+            INSERT INTO author_fts(rowid, full_name) VALUES (new.id, new.full_name);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS author_fts_ad AFTER DELETE ON author BEGIN
+            INSERT INTO author_fts(author_fts, rowid, full_name) VALUES ('delete', old.id, old.full_name);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS author_fts_au AFTER UPDATE OF full_name ON author BEGIN
+            INSERT INTO author_fts(author_fts, rowid, full_name) VALUES ('delete', old.id, old.full_name);
+            INSERT INTO author_fts(rowid, full_name) VALUES (new.id, new.full_name);
+        END
+        """,
+        # Indexa las filas que ya existian
+        "INSERT INTO work_fts(work_fts) VALUES ('rebuild')",
+        "INSERT INTO author_fts(author_fts) VALUES ('rebuild')",
+    ], down=[
+        "DROP TRIGGER IF EXISTS work_fts_ai",
+        "DROP TRIGGER IF EXISTS work_fts_ad",
+        "DROP TRIGGER IF EXISTS work_fts_au",
+        "DROP TRIGGER IF EXISTS author_fts_ai",
+        "DROP TRIGGER IF EXISTS author_fts_ad",
+        "DROP TRIGGER IF EXISTS author_fts_au",
+        "DROP TABLE IF EXISTS work_fts",
+        "DROP TABLE IF EXISTS author_fts",
+    ]),
+    Migration(4, "version por tabla para validadores HTTP de colecciones", up=[
+        """
+        CREATE TABLE IF NOT EXISTS table_version (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        ) WITHOUT ROWID
+        """,
+        *(f"INSERT OR IGNORE INTO table_version (name, version, updated_at) VALUES ('{table}', 1, {NOW_MS})"
+          for table in VERSIONED_TABLES),
+        *(trigger for table in VERSIONED_TABLES for trigger in _version_triggers(table)),
+    ], down=[
+        *(f"DROP TRIGGER IF EXISTS {table}_version_{suffix}"
+          for table in VERSIONED_TABLES for suffix in ("ai", "au", "ad")),
+        "DROP TABLE IF EXISTS table_version",
+    ]),
+    Migration(5, "registro de cambios (changes) para sincronizacion incremental", up=[
+        # seq crece siempre (AUTOINCREMENT) y SQLite serializa a los escritores:
+        # el orden de seq es el orden de commit
+        """
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete', 'reset')),
+            record_key TEXT,
+            changed_at TEXT NOT NULL
+        )
+        """,
+        # Los borrados en cascada (ON DELETE CASCADE) tambien disparan estos triggers
+        *(trigger for table in CHANGE_KEYS for trigger in _change_triggers(table)),
+    ], down=[
+        *(f"DROP TRIGGER IF EXISTS {table}_changes_{suffix}"
+          for table in CHANGE_KEYS for suffix in ("ai", "au", "ad")),
+        "DROP TABLE IF EXISTS changes",
+    ]),
+    Migration(6, "indices para los filtros y ordenamientos por query string (filters.py)", up=[
+        "CREATE INDEX IF NOT EXISTS idx_author_full_name ON author(full_name)",
+        "CREATE INDEX IF NOT EXISTS idx_edition_publisher ON edition(publisher)",
+        "CREATE INDEX IF NOT EXISTS idx_item_location ON item(location)",
+        # ?work_id=N&sort=-year (y el orden por defecto de GET /editions) sin B-tree temporal;
+        # reemplaza a idx_edition_work_id, que es su prefijo
+        "CREATE INDEX IF NOT EXISTS idx_edition_work_year ON edition(work_id, year, id)",
+        "DROP INDEX IF EXISTS idx_edition_work_id",
+    ], down=[
+        "CREATE INDEX IF NOT EXISTS idx_edition_work_id ON edition(work_id)",
+        "DROP INDEX IF EXISTS idx_edition_work_year",
+        "DROP INDEX IF EXISTS idx_item_location",
+        "DROP INDEX IF EXISTS idx_edition_publisher",
+        "DROP INDEX IF EXISTS idx_author_full_name",
+    ]),
+    Migration(7, "contadores de disponibilidad por edicion y por work (availability.py)", up=[
+        # Un item con status NULL se cuenta como 'unknown'
+        """
+        CREATE TABLE IF NOT EXISTS edition_availability (
+            edition_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (edition_id, status)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS work_availability (
+            work_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (work_id, status)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS item_availability_ai AFTER INSERT ON item BEGIN
+            INSERT INTO edition_availability (edition_id, status, n)
+            VALUES (new.edition_id, COALESCE(new.status, 'unknown'), 1)
+            ON CONFLICT (edition_id, status) DO UPDATE SET n = n + 1;
+            INSERT INTO work_availability (work_id, status, n)
+            SELECT work_id, COALESCE(new.status, 'unknown'), 1 FROM edition WHERE id = new.edition_id
+            ON CONFLICT (work_id, status) DO UPDATE SET n = n + 1;
+        END
+        """,
+        # Decrementos con UPDATE: en un borrado en cascada la edicion ya no existe y sus
+        # contadores ya se descontaron en edition_availability_bd
+        """
+        CREATE TRIGGER IF NOT EXISTS item_availability_ad AFTER DELETE ON item BEGIN
+            UPDATE edition_availability SET n = n - 1
+             WHERE edition_id = old.edition_id AND status = COALESCE(old.status, 'unknown');
+            UPDATE work_availability SET n = n - 1
+             WHERE work_id = (SELECT work_id FROM edition WHERE id = old.edition_id)
+               AND status = COALESCE(old.status, 'unknown');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS item_availability_au AFTER UPDATE OF status, edition_id ON item
+        WHEN old.status IS NOT new.status OR old.edition_id IS NOT new.edition_id BEGIN
+            UPDATE edition_availability SET n = n - 1
+             WHERE edition_id = old.edition_id AND status = COALESCE(old.status, 'unknown');
+            UPDATE work_availability SET n = n - 1
+             WHERE work_id = (SELECT work_id FROM edition WHERE id = old.edition_id)
+               AND status = COALESCE(old.status, 'unknown');
+            INSERT INTO edition_availability (edition_id, status, n)
+            VALUES (new.edition_id, COALESCE(new.status, 'unknown'), 1)
+            ON CONFLICT (edition_id, status) DO UPDATE SET n = n + 1;
+            INSERT INTO work_availability (work_id, status, n)
+            SELECT work_id, COALESCE(new.status, 'unknown'), 1 FROM edition WHERE id = new.edition_id
+            ON CONFLICT (work_id, status) DO UPDATE SET n = n + 1;
+        END
+        """,
+        # BEFORE: la cascada sobre item corre despues de borrar la fila de edition,
+        # cuando ya no se puede saber a que work pertenecian sus items
+        """
+        CREATE TRIGGER IF NOT EXISTS edition_availability_bd BEFORE DELETE ON edition BEGIN
+            UPDATE work_availability
+               SET n = n - COALESCE((SELECT ea.n FROM edition_availability ea
+                                      WHERE ea.edition_id = old.id AND ea.status = work_availability.status), 0)
+             WHERE work_id = old.work_id;
+            DELETE FROM edition_availability WHERE edition_id = old.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS edition_availability_au AFTER UPDATE OF work_id ON edition
+        WHEN old.work_id IS NOT new.work_id BEGIN
+            UPDATE work_availability
+               SET n = n - COALESCE((SELECT ea.n FROM edition_availability ea
+                                      WHERE ea.edition_id = new.id AND ea.status = work_availability.status), 0)
+             WHERE work_id = old.work_id;
+            INSERT INTO work_availability (work_id, status, n)
+            SELECT new.work_id, status, n FROM edition_availability WHERE edition_id = new.id
+            ON CONFLICT (work_id, status) DO UPDATE SET n = n + excluded.n;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS work_availability_ad AFTER DELETE ON work BEGIN
+            DELETE FROM work_availability WHERE work_id = old.id;
+        END
+        """,
+        # Cuenta los items que ya existian
+        "INSERT INTO edition_availability (edition_id, status, n) "
+        "SELECT edition_id, COALESCE(status, 'unknown'), COUNT(*) FROM item GROUP BY 1, 2",
+        "INSERT INTO work_availability (work_id, status, n) "
+        "SELECT e.work_id, COALESCE(i.status, 'unknown'), COUNT(*) FROM item i "
+        "JOIN edition e ON e.id = i.edition_id GROUP BY 1, 2",
+    ], down=[
+        "DROP TRIGGER IF EXISTS item_availability_ai",
+        "DROP TRIGGER IF EXISTS item_availability_ad",
+        "DROP TRIGGER IF EXISTS item_availability_au",
+        "DROP TRIGGER IF EXISTS edition_availability_bd",
+        "DROP TRIGGER IF EXISTS edition_availability_au",
+        "DROP TRIGGER IF EXISTS work_availability_ad",
+        "DROP TABLE IF EXISTS work_availability",
+        "DROP TABLE IF EXISTS edition_availability",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    _ensure_version_table(conn)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def _run(conn: sqlite3.Connection, migration: Migration, upgrade: bool) -> bool:
+    """Aplica (o revierte) una migracion en su propia transaccion BEGIN IMMEDIATE.
+
+    Vuelve a leer la version dentro de la transaccion, asi que varios procesos
+    pueden arrancar a la vez; devuelve False si otro proceso ya lo hizo.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        done = conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (migration.version,)).fetchone()
+        if bool(done) == upgrade:
+            conn.rollback()
+            return False
+        for statement in (migration.up if upgrade else migration.down):
+            # Sentencias SQL o funciones que reciben la conexion (pasos que dependen del esquema)
+            if callable(statement):
+                statement(conn)
+            else:
+                conn.execute(statement)
+        if upgrade:
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.description, datetime.now().isoformat()),
+            )
+        else:
+            conn.execute("DELETE FROM schema_version WHERE version = ?", (migration.version,))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return True
+
+
+def migrate(conn: sqlite3.Connection, target: int = LATEST_VERSION) -> List[int]:
+    """Aplica las migraciones pendientes hasta `target`; devuelve las versiones aplicadas."""
+    if conn.in_transaction:
+        conn.commit()
+    version_now = current_version(conn)
+    applied = [m.version for m in MIGRATIONS
+               if version_now < m.version <= target and _run(conn, m, upgrade=True)]
+    if applied:
+        # Actualiza las estadisticas del planificador para los indices nuevos
+        conn.execute("PRAGMA optimize")
+    return applied
+
+
+def rollback(conn: sqlite3.Connection, target: int) -> List[int]:
+    """Revierte, de la mas nueva a la mas vieja, las migraciones posteriores a `target`."""
+    if conn.in_transaction:
+        conn.commit()
+    version_now = current_version(conn)
+    return [m.version for m in reversed(MIGRATIONS)
+            if target < m.version <= version_now and _run(conn, m, upgrade=False)]
+
+
+# ---------- Arranque de los servicios ----------
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def ensure_schema(database: str):
+    """Migra `database` una sola vez por proceso; las lecturas nunca ejecutan DDL."""
+    with _migrated_lock:
+        if database in _migrated:
+            return
+        with get_pool(database).connection() as conn:
+            migrate(conn)
+        _migrated.add(database)
+
+
+def main(argv: List[str]) -> int:
+    args = argv[1:]
+    database = args.pop(0) if args and args[0].endswith(".db") else "library.db"
+    command = args.pop(0) if args else "status"
+    conn = sqlite3.connect(database)
+    try:
+        if command == "up":
+            print("Aplicadas:", migrate(conn, int(args[0]) if args else LATEST_VERSION))
+        elif command == "down" and args:
+            print("Revertidas:", rollback(conn, int(args[0])))
+        elif command == "status":
+            _ensure_version_table(conn)
+            applied = dict(conn.execute("SELECT version, applied_at FROM schema_version").fetchall())
+            for m in MIGRATIONS:
+                print(f"{m.version:>3} {'aplicada ' + applied[m.version] if m.version in applied else 'pendiente'}"
+                      f"  {m.description}")
+        else:
+            print("Uso: python migrations.py [library.db] status | up [version] | down <version>")
+            return 2
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,166 @@
+# pagination.py
+# Paginacion por cursor (keyset) compartida por los endpoints de coleccion.
+import base64
+import json
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+from flask import jsonify, request
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+COUNT_MODES = ("none", "estimate", "exact")
+
+# Columna de ordenamiento; la ultima clave de una lista debe ser unica (p. ej. id)
+SortKey = namedtuple("SortKey", "column descending nullable", defaults=(False, False))
+
+
+class PaginationError(ValueError):
+    """Parametros de paginacion invalidos (limit, cursor o count)."""
+
+
+# ---------- Cursores opacos ----------
+def sort_spec(keys: Sequence[SortKey]) -> str:
+    """Orden de `keys` como texto, p. ej. "-created_at,-id"."""
+    return ",".join(f"{'-' if k.descending else ''}{k.column}" for k in keys)
+
+
+def encode_cursor(values: Sequence[Any], keys: Sequence[SortKey]) -> str:
+    # El cursor guarda el orden con que se genero: en otro orden sus valores no sirven
+    raw = json.dumps({"sort": sort_spec(keys), "values": list(values)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, keys: Sequence[SortKey]) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+    except (ValueError, TypeError):
+        raise PaginationError("Cursor invalido")
+    values = data.get("values") if isinstance(data, dict) else None
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise PaginationError("Cursor invalido")
+    if data.get("sort") != sort_spec(keys):
+        raise PaginationError("El cursor corresponde a otro orden; vuelva a la primera pagina")
+    return values
+
+
+# ---------- SQL ----------
+def seek_clause(keys: Sequence[SortKey], values: Sequence[Any]) -> Tuple[str, List[Any]]:
+    """Condicion WHERE que selecciona las filas posteriores a `values` en el orden `keys`.
+
+    SQLite ordena los NULL antes que cualquier valor, tambien aqui.
+    """
+    same_direction = len({k.descending for k in keys}) == 1
+    if same_direction and not any(k.nullable for k in keys) and None not in values:
+        # Forma de row-value: SQLite la resuelve como un rango sobre el indice
+        cols = ", ".join(k.column for k in keys)
+        marks = ", ".join("?" for _ in keys)
+        op = "<" if keys[0].descending else ">"
+        return f"({cols}) {op} ({marks})", list(values)
+
+    branches, params = [], []
+    for i, key in enumerate(keys):
+        parts, branch_params = [], []
+        for prev, prev_value in zip(keys[:i], values[:i]):
+            parts.append(f"{prev.column} IS ?")
+            branch_params.append(prev_value)
+        value = values[i]
+        if key.descending:
+            if value is None:
+                continue  # nada viene despues de NULL en orden descendente
+            parts.append(f"({key.column} < ? OR {key.column} IS NULL)" if key.nullable else f"{key.column} < ?")
+        else:
+            if value is None:
+                parts.append(f"{key.column} IS NOT NULL")
+            else:
+                parts.append(f"{key.column} > ?")
+        if value is not None:
+            branch_params.append(value)
+        branches.append("(" + " AND ".join(parts) + ")")
+        params.extend(branch_params)
+    return ("(" + " OR ".join(branches) + ")" if branches else "0"), params
+
+
+def order_clause(keys: Sequence[SortKey]) -> str:
+    return ", ".join(f"{k.column} {'DESC' if k.descending else 'ASC'}" for k in keys)
+
+
+def build_select(
+    table: str,
+    keys: Sequence[SortKey],
+    cursor: Optional[str] = None,
+    where: Optional[List[str]] = None,
+    params: Sequence[Any] = (),
+    columns: str = "*",
+) -> Tuple[str, List[Any]]:
+    """SELECT ordenado por `keys` que empieza despues de `cursor` (sin LIMIT)."""
+    where = list(where or [])
+    params = list(params)
+    if cursor:
+        clause, seek_params = seek_clause(keys, decode_cursor(cursor, keys))
+        where.append(clause)
+        params.extend(seek_params)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    return f"SELECT {columns} FROM {table} {where_sql} ORDER BY {order_clause(keys)}", params
+
+
+def fetch_page(
+    conn,
+    table: str,
+    keys: Sequence[SortKey],
+    limit: int,
+    cursor: Optional[str] = None,
+    where: Optional[List[str]] = None,
+    params: Sequence[Any] = (),
+    columns: str = "*",
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Devuelve (filas, siguiente_cursor); el costo no depende de la profundidad de la pagina."""
+    sql, params = build_select(table, keys, cursor, where, params, columns)
+    rows = conn.execute(f"{sql} LIMIT ?", (*params, limit + 1)).fetchall()
+    rows = [dict(r) for r in rows]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][k.column] for k in keys], keys)
+    return rows, next_cursor
+
+
+def count_rows(conn, table: str, mode: str, where: Optional[List[str]] = None, params: Sequence[Any] = ()) -> Optional[int]:
+    """Total de filas segun `mode`: 'exact' (COUNT), 'estimate' (MAX(rowid), tabla sin filtros) o 'none'."""
+    if mode == "exact":
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        return conn.execute(f"SELECT COUNT(*) FROM {table} {where_sql}", tuple(params)).fetchone()[0]
+    if mode == "estimate" and not where and table.isidentifier():
+        # Lectura O(log n) del ultimo rowid: cota superior que ignora los huecos por borrados
+        return conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+    return None
+
+
+# ---------- Flask ----------
+def parse_page_args(args=None, default_count: str = "none") -> Tuple[int, Optional[str], str]:
+    """Lee limit, cursor y count de la query string."""
+    args = request.args if args is None else args
+    try:
+        limit = int(args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise PaginationError("limit debe ser entero")
+    limit = max(1, min(MAX_LIMIT, limit))
+    count = args.get("count", default_count)
+    if count not in COUNT_MODES:
+        raise PaginationError(f"count debe ser uno de: {', '.join(COUNT_MODES)}")
+    return limit, args.get("cursor") or None, count
+
+
+def page_response(rows: List[Dict[str, Any]], next_cursor: Optional[str], total: Optional[int] = None):
+    """Lista JSON con la paginacion en cabeceras (Link, X-Next-Cursor, X-Total-Count)."""
+    response = jsonify(rows)
+    if next_cursor:
+        args = request.args.to_dict()
+        args["cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+        response.headers["X-Next-Cursor"] = next_cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return response
@@ -1,47 +1,395 @@
-import sqlite3
-from datetime import datetime
+# populate_tables.py
+# Carga masiva de datos en library.db: datos sinteticos o importacion CSV/NDJSON.
+#
+#   python populate_tables.py                                   # 20 filas por tabla (como antes)
+#   python populate_tables.py generate --works 1000000 --authors 100000 \
+#       --editions-per-work poisson:1.5 --items-per-edition poisson:3 --seed 7
+#   python populate_tables.py import item items.ndjson          # o .csv con encabezado
+#
+# La carga usa executemany por lotes, crea los indices secundarios al final y
+# ajusta los PRAGMA solo mientras dura (se restauran al terminar). Sin diario en disco
+# y sin indices ni triggers solo si la base se puede tomar en exclusiva (un archivo
+# nuevo o que nadie mas tiene abierto); con los servicios usandola se carga por lotes
+# sin tocar el modo WAL ni los triggers.
+import argparse
+import csv
+import json
+import logging
+import math
 import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from availability import REBUILD_STATEMENTS as AVAILABILITY_REBUILD
+from conditional import format_timestamp, utc_now
+from migrations import migrate
+
+log = logging.getLogger("webservices")
+
+DB_FILE = "library.db"
+BATCH_SIZE = 10000
+
+TABLE_COLUMNS = {
+    "work": ["id", "title", "theme", "created_at", "updated_at"],
+    "author": ["id", "full_name", "created_at", "updated_at"],
+    "work_author": ["work_id", "author_id"],
+    "edition": ["id", "work_id", "year", "publisher", "isbn", "cover_url", "created_at", "updated_at"],
+    "item": ["id", "edition_id", "barcode", "location", "status", "created_at", "updated_at"],
+}
+
+# Triggers que se suspenden durante la carga y la(s) sentencia(s) que rehacen lo que mantienen
+DEFERRED_TRIGGERS = {
+    "work_fts_%": "INSERT INTO work_fts(work_fts) VALUES ('rebuild')",
+    "author_fts_%": "INSERT INTO author_fts(author_fts) VALUES ('rebuild')",
+    # Un solo salto de version al final de la carga en lugar de uno por fila
+    "%_version_%": "UPDATE table_version SET version = version + 1, "
+                   "updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')",
+    # Sin un cambio por fila cargada: un 'reset' por tabla avisa a los consumidores del
+    # registro de cambios que deben resincronizar completo
+    "%_changes_%": "INSERT INTO changes (table_name, op, record_key, changed_at) "
+                   "SELECT name, 'reset', NULL, strftime('%Y-%m-%d %H:%M:%f', 'now') FROM table_version",
+    # Contadores de disponibilidad: un GROUP BY al final en lugar de dos upserts por item
+    "%_availability_%": AVAILABILITY_REBUILD,
+}
+
+LOAD_PRAGMAS = {
+    "cache_size": "-262144",  # 256 MiB
+    "temp_store": "MEMORY",
+}
+# Solo con la base en exclusiva: una caida a mitad de la carga puede dejarla corrupta
+EXCLUSIVE_PRAGMAS = {
+    "synchronous": "OFF",
+    "journal_mode": "MEMORY",
+}
+
+THEMES = ["Novela", "Poesía", "Historia", "Ciencia", "Filosofía", "Infantil", "Ensayo",
+          "Biografía", "Arte", "Tecnología", "Viajes", "Cocina", "Teatro", "Derecho", "Economía"]
+FIRST_NAMES = ["Ana", "Luis", "María", "Jorge", "Lucía", "Pedro", "Elena", "Carlos", "Sofía", "Diego",
+               "Valeria", "Miguel", "Camila", "Andrés", "Isabel", "Tomás", "Paula", "Javier"]
+LAST_NAMES = ["García", "Martínez", "López", "Hernández", "González", "Pérez", "Rodríguez", "Sánchez",
+              "Ramírez", "Torres", "Flores", "Rivera", "Gómez", "Díaz", "Reyes", "Morales", "Cruz"]
+PUBLISHERS = [f"Publisher {i}" for i in range(1, 201)]
+LOCATIONS = [f"Sala {s} - Estante {e}" for s in "ABCDEF" for e in range(1, 41)]
+STATUS_WEIGHTS = {"available": 70, "loaned": 22, "repair": 5, "lost": 3}
+
+
+# ---------- Distribuciones ----------
+def parse_distribution(spec: str) -> Callable[[random.Random], int]:
+    """'const:2', 'uniform:1-4' o 'poisson:1.5' -> funcion que devuelve un entero >= 0."""
+    kind, _, arg = spec.partition(":")
+    if kind == "const":
+        value = int(arg)
+        return lambda rng: value
+    if kind == "uniform":
+        low, _, high = arg.partition("-")
+        low, high = int(low), int(high or low)
+        return lambda rng: rng.randint(low, high)
+    if kind == "poisson":
+        limit = math.exp(-float(arg))
+
+        def poisson(rng):
+            # Algoritmo de Knuth (adecuado para medias pequenas)
+            k, p = 0, rng.random()
+            while p > limit:
+                k += 1
+                p *= rng.random()
+            return k
+        return poisson
+    raise ValueError(f"Distribucion invalida: {spec}")
+
+
+def skewed_index(rng: random.Random, size: int, skew: float) -> int:
+    """Indice en [0, size): uniforme con skew=1, concentrado en los primeros con skew>1."""
+    return min(size - 1, int(size * rng.random() ** skew))
 
-def get_db_connection():
-    conn = sqlite3.connect('library.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def populate_tables():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Populate 'work'
-    for i in range(1, 21):
-        now = datetime.now().isoformat()
-        cursor.execute('INSERT INTO work (title, theme, created_at, updated_at) VALUES (?, ?, ?, ?)',
-                       (f'Work Title {i}', f'Theme {i}', now, now))
-
-    # Populate 'author'
-    for i in range(1, 21):
-        now = datetime.now().isoformat()
-        cursor.execute('INSERT INTO author (full_name, created_at, updated_at) VALUES (?, ?, ?)',
-                       (f'Author Name {i}', now, now))
-
-    # Populate 'work_author'
-    for i in range(1, 21):
-        cursor.execute('INSERT INTO work_author (work_id, author_id) VALUES (?, ?)',
-                       (i, i))
-
-    # Populate 'edition'
-    for i in range(1, 21):
-        now = datetime.now().isoformat()
-        cursor.execute('INSERT INTO edition (work_id, year, publisher, isbn, cover_url, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
-                       (i, random.randint(1900, 2025), f'Publisher {i}', f'ISBN-{i:05}', f'http://example.com/cover{i}.jpg', now, now))
-
-    # Populate 'item'
-    for i in range(1, 21):
-        now = datetime.now().isoformat()
-        cursor.execute('INSERT INTO item (edition_id, barcode, location, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
-                       (i, f'BARCODE-{i:05}', f'Location {i}', 'available', now, now))
 
+def isbn13(n: int) -> str:
+    """ISBN-13 valido y unico para el numero de edicion `n`."""
+    digits = f"978{n % 10**9:09d}"
+    check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    return digits + str(check)
+
+
+# ---------- Carga ----------
+def chunks(rows: Iterable[Sequence[Any]], size: int = BATCH_SIZE) -> Iterator[List[Sequence[Any]]]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert_rows(conn: sqlite3.Connection, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """Inserta con executemany por lotes (un commit por lote); devuelve las filas insertadas."""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    total = 0
+    for batch in chunks(rows):
+        conn.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+    return total
+
+
+def lock_exclusive(conn: sqlite3.Connection) -> bool:
+    """Toma la base en exclusiva hasta cerrar `conn`; False si otra conexion la usa."""
+    conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+    try:
+        # En WAL falla tambien si otra conexion la tiene abierta aunque este inactiva
+        conn.execute("BEGIN EXCLUSIVE")
+        conn.commit()
+        return True
+    except sqlite3.OperationalError:
+        conn.execute("PRAGMA locking_mode = NORMAL")
+        return False
+
+
+@contextmanager
+def load_pragmas(conn: sqlite3.Connection, exclusive: bool = False):
+    """Aplica LOAD_PRAGMAS (y EXCLUSIVE_PRAGMAS con `exclusive`) y restaura los anteriores."""
+    pragmas = {**LOAD_PRAGMAS, **(EXCLUSIVE_PRAGMAS if exclusive else {})}
+    previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in pragmas}
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+
+@contextmanager
+def deferred_indexes(conn: sqlite3.Connection, tables: Sequence[str] = tuple(TABLE_COLUMNS)):
+    """Quita los indices secundarios de `tables` y los triggers de DEFERRED_TRIGGERS; al
+    salir los recrea (una sola pasada ordenada por indice) y reconstruye lo que mantenian."""
+    tables = tuple(tables)
+    indexes = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+        f"AND tbl_name IN ({', '.join('?' for _ in tables)})", tables
+    ).fetchall()
+    triggers, rebuilds = [], []
+    for pattern, rebuild in DEFERRED_TRIGGERS.items():
+        found = conn.execute(
+            f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE ? "
+            f"AND tbl_name IN ({', '.join('?' for _ in tables)})", (pattern, *tables)
+        ).fetchall()
+        if found:
+            triggers.extend(found)
+            rebuilds.extend([rebuild] if isinstance(rebuild, str) else rebuild)
+    for name, _ in indexes:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
     conn.commit()
-    conn.close()
+    try:
+        yield
+    finally:
+        for _, sql in indexes + triggers:
+            conn.execute(sql)
+        for sql in rebuilds:
+            conn.execute(sql)
+        conn.commit()
+        conn.execute("PRAGMA optimize")
+
+
+def next_id(conn: sqlite3.Connection, table: str) -> int:
+    return conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+
+
+def generate(
+    conn: sqlite3.Connection,
+    works: int = 20,
+    authors: int = 20,
+    authors_per_work: str = "const:1",
+    editions_per_work: str = "const:1",
+    items_per_edition: str = "const:1",
+    author_skew: float = 1.0,
+    theme_skew: float = 1.0,
+    status_weights: Dict[str, int] = None,
+    seed: int = None,
+) -> Dict[str, int]:
+    """Genera datos sinteticos referencialmente consistentes.
+
+    Los ids se asignan aqui (a partir del maximo actual) para que cada hijo
+    apunte a un padre existente sin consultar la base.
+    """
+    rng = random.Random(seed)
+    status_weights = status_weights or STATUS_WEIGHTS
+    # Tabla de muestreo: cada estado repetido segun su peso (mas barato que rng.choices por fila)
+    statuses = [status for status, weight in status_weights.items() for _ in range(weight)]
+    draw_authors = parse_distribution(authors_per_work)
+    draw_editions = parse_distribution(editions_per_work)
+    draw_items = parse_distribution(items_per_edition)
+    # Timestamps con el mismo formato que escriben los servicios (ver conditional.format_timestamp)
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    step = timedelta(days=365) / max(works, 1)
+    counts = {}
+
+    first_author = next_id(conn, "author")
+    ts = format_timestamp(start)
+    counts["author"] = insert_rows(conn, "author", TABLE_COLUMNS["author"], (
+        (i, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}", ts, ts)
+        for i in range(first_author, first_author + authors)
+    ))
+
+    first_work = next_id(conn, "work")
+    work_ids = range(first_work, first_work + works)
+    counts["work"] = insert_rows(conn, "work", TABLE_COLUMNS["work"], (
+        (i, f"Work Title {i}", THEMES[skewed_index(rng, len(THEMES), theme_skew)], ts, ts)
+        for n, i in enumerate(work_ids)
+        for ts in [format_timestamp(start + step * n)]
+    ))
+
+    def work_authors():
+        if not authors:
+            return
+        for work_id in work_ids:
+            chosen = {first_author + skewed_index(rng, authors, author_skew) for _ in range(draw_authors(rng))}
+            for author_id in chosen:
+                yield work_id, author_id
+    counts["work_author"] = insert_rows(conn, "work_author", TABLE_COLUMNS["work_author"], work_authors())
+
+    # Las ediciones e items se generan juntos; los items se acumulan en memoria por lote
+    edition_ids = []
+
+    def editions():
+        edition_id = next_id(conn, "edition")
+        for n, work_id in enumerate(work_ids):
+            ts = format_timestamp(start + step * n)
+            for _ in range(draw_editions(rng)):
+                edition_ids.append(edition_id)
+                yield (edition_id, work_id, rng.randint(1900, 2025), rng.choice(PUBLISHERS),
+                       isbn13(edition_id), f"http://example.com/cover{edition_id}.jpg", ts, ts)
+                edition_id += 1
+    counts["edition"] = insert_rows(conn, "edition", TABLE_COLUMNS["edition"], editions())
+
+    def items():
+        item_id = next_id(conn, "item")
+        ts = utc_now()
+        for edition_id in edition_ids:
+            for _ in range(draw_items(rng)):
+                yield (item_id, edition_id, f"BC{item_id:010d}", rng.choice(LOCATIONS),
+                       statuses[int(rng.random() * len(statuses))], ts, ts)
+                item_id += 1
+    counts["item"] = insert_rows(conn, "item", TABLE_COLUMNS["item"], items())
+    return counts
+
+
+def read_file(path: str) -> Tuple[List[str], Iterator[Sequence[Any]]]:
+    """Columnas y filas de un CSV (con encabezado) o NDJSON (una fila por linea)."""
+    handle = open(path, newline="", encoding="utf-8")
+    if path.endswith((".ndjson", ".jsonl")):
+        first = json.loads(handle.readline())
+        columns = list(first)
+
+        def rows():
+            with handle:
+                yield [first.get(c) for c in columns]
+                for line in handle:
+                    if line.strip():
+                        data = json.loads(line)
+                        yield [data.get(c) for c in columns]
+        return columns, rows()
+    reader = csv.reader(handle)
+    columns = next(reader)
+
+    def rows():
+        with handle:
+            for row in reader:
+                yield [value if value != "" else None for value in row]
+    return columns, rows()
+
+
+def import_file(conn: sqlite3.Connection, table: str, path: str) -> int:
+    """Importa un archivo a `table`; completa created_at/updated_at si faltan."""
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"Tabla desconocida: {table}")
+    columns, rows = read_file(path)
+    unknown = set(columns) - set(TABLE_COLUMNS[table])
+    if unknown:
+        raise ValueError(f"Columnas desconocidas para {table}: {', '.join(sorted(unknown))}")
+    stamps = [c for c in ("created_at", "updated_at") if c in TABLE_COLUMNS[table] and c not in columns]
+    if stamps:
+        now = utc_now()
+        rows = ([*row, *(now for _ in stamps)] for row in rows)
+    return insert_rows(conn, table, columns + stamps, rows)
+
+
+def bulk_load(database: str, load: Callable[[sqlite3.Connection], Dict[str, int]],
+              foreign_keys: bool = True, defer: Sequence[str] = tuple(TABLE_COLUMNS)) -> Dict[str, int]:
+    """Ejecuta `load` con los PRAGMA de carga y los indices de `defer` suspendidos.
+
+    Si otra conexion usa la base, los indices y triggers se mantienen (la carga va por
+    lotes igual) y el diario no se cambia: los demas nunca ven datos a medio indexar.
+    """
+    conn = sqlite3.connect(database)
+    conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+    migrate(conn)
+    exclusive = lock_exclusive(conn)
+    if not exclusive and defer:
+        log.warning("%s esta en uso: se carga sin suspender indices ni triggers", database)
+        defer = ()
+    try:
+        with load_pragmas(conn, exclusive), deferred_indexes(conn, defer):
+            return load(conn)
+    finally:
+        conn.close()
+
+
+def populate_tables(database: str = DB_FILE, rows: int = 20):
+    """Carga de ejemplo: `rows` works/authors con una relacion, edicion e item cada uno."""
+    return bulk_load(database, lambda conn: generate(conn, works=rows, authors=rows), foreign_keys=False)
+
+
+def parse_weights(spec: str) -> Dict[str, int]:
+    # "available=70,loaned=20,repair=5,lost=5"
+    return {k: int(v) for k, v in (pair.split("=") for pair in spec.split(","))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga masiva de datos en la base de la biblioteca")
+    parser.add_argument("--db", default=DB_FILE)
+    sub = parser.add_subparsers(dest="command")
+
+    gen = sub.add_parser("generate", help="genera datos sinteticos")
+    gen.add_argument("--works", type=int, default=1000)
+    gen.add_argument("--authors", type=int, default=200)
+    gen.add_argument("--authors-per-work", default="uniform:1-2")
+    gen.add_argument("--editions-per-work", default="poisson:1.5")
+    gen.add_argument("--items-per-edition", default="poisson:3")
+    gen.add_argument("--author-skew", type=float, default=2.0, help="1 = uniforme; >1 pocos autores prolificos")
+    gen.add_argument("--theme-skew", type=float, default=1.5)
+    gen.add_argument("--status-weights", type=parse_weights, default=STATUS_WEIGHTS)
+    gen.add_argument("--seed", type=int)
+
+    imp = sub.add_parser("import", help="importa un CSV o NDJSON")
+    imp.add_argument("table", choices=sorted(TABLE_COLUMNS))
+    imp.add_argument("path")
+    imp.add_argument("--defer-indexes", action="store_true",
+                     help="reconstruye los indices al final (conviene si el archivo es grande frente a la tabla; "
+                          "solo con la base sin otras conexiones)")
+
+    args = parser.parse_args()
+    started = time.perf_counter()
+    if args.command == "generate":
+        counts = bulk_load(args.db, lambda conn: generate(
+            conn, args.works, args.authors, args.authors_per_work, args.editions_per_work,
+            args.items_per_edition, args.author_skew, args.theme_skew, args.status_weights, args.seed),
+            foreign_keys=False)  # los datos generados ya son consistentes
+    elif args.command == "import":
+        counts = bulk_load(args.db, lambda conn: {args.table: import_file(conn, args.table, args.path)},
+                           defer=[args.table] if args.defer_indexes else [])
+    else:
+        counts = populate_tables(args.db)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(", ".join(f"{table}: {n}" for table, n in counts.items()))
+    print(f"{total} filas en {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} filas/s)")
+
 
 if __name__ == '__main__':
-    populate_tables()
+    main()
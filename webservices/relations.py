@@ -0,0 +1,149 @@
+# relations.py
+# Proyeccion de columnas (?fields=) y relaciones embebidas (?include=) para ws_crud.py.
+#
+#   /work/7?include=authors,editions.items&fields=title&fields[edition]=year,isbn
+#
+# Las columnas se eligen en el SELECT y cada relacion se resuelve con una consulta
+# IN (...) por nivel y lote de padres, nunca una por fila.
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Sequence
+
+from flask import request
+
+# Columnas que se pueden pedir con ?fields= (la clave primaria siempre se incluye)
+COLUMNS = {
+    "work": ("id", "title", "theme", "created_at", "updated_at"),
+    "author": ("id", "full_name", "created_at", "updated_at"),
+    "work_author": ("work_id", "author_id"),
+    "edition": ("id", "work_id", "year", "publisher", "isbn", "cover_url", "created_at", "updated_at"),
+    "item": ("id", "edition_id", "barcode", "location", "status", "created_at", "updated_at"),
+}
+PRIMARY_KEYS = {"work_author": ("work_id", "author_id")}
+
+# local: columna del padre; remote: columna del hijo que la referencia;
+# through: (tabla intermedia, columna hacia el padre, columna hacia el hijo) para N:M
+Relation = namedtuple("Relation", "table local remote many through", defaults=(True, None))
+
+RELATIONS = {
+    "work": {
+        "authors": Relation("author", "id", "id", through=("work_author", "work_id", "author_id")),
+        "editions": Relation("edition", "id", "work_id"),
+    },
+    "author": {
+        "works": Relation("work", "id", "id", through=("work_author", "author_id", "work_id")),
+    },
+    "edition": {
+        "work": Relation("work", "work_id", "id", many=False),
+        "items": Relation("item", "id", "edition_id"),
+    },
+    "item": {
+        "edition": Relation("edition", "edition_id", "id", many=False),
+    },
+}
+MAX_DEPTH = 3
+IN_CHUNK = 500
+
+
+class RelationError(ValueError):
+    """?fields= o ?include= piden columnas o relaciones que no existen."""
+
+
+# ---------- Parametros ----------
+def parse_include(table: str, value: Optional[str] = None, depth: int = MAX_DEPTH) -> Dict[str, dict]:
+    """'authors,editions.items' -> {'authors': {}, 'editions': {'items': {}}}, validado."""
+    value = request.args.get("include", "") if value is None else value
+    tree: Dict[str, dict] = {}
+    for path in filter(None, (part.strip() for part in value.split(","))):
+        names = path.split(".")
+        if len(names) > depth:
+            raise RelationError(f"include admite como maximo {depth} niveles: {path}")
+        current_table, node = table, tree
+        for name in names:
+            relation = RELATIONS.get(current_table, {}).get(name)
+            if relation is None:
+                raise RelationError(f"Relacion desconocida en include: {path}")
+            node = node.setdefault(name, {})
+            current_table = relation.table
+    return tree
+
+
+def parse_fields(table: str, include: Dict[str, dict]) -> Dict[str, List[str]]:
+    """{tabla: columnas} de ?fields= (tabla principal) y ?fields[tabla]= (embebidas)."""
+    requested = {table: request.args.get("fields")}
+    for included in included_tables(table, include)[1:]:
+        requested[included] = request.args.get(f"fields[{included}]")
+    fields = {}
+    for name, value in requested.items():
+        if not value:
+            continue
+        columns = [column.strip() for column in value.split(",") if column.strip()]
+        unknown = [column for column in columns if column not in COLUMNS[name]]
+        if unknown:
+            raise RelationError(f"Campos desconocidos en {name}: {', '.join(unknown)}")
+        fields[name] = columns
+    return fields
+
+
+def included_tables(table: str, include: Dict[str, dict]) -> List[str]:
+    """La tabla principal seguida de las tablas que aporta `include` (sin repetir)."""
+    tables = [table]
+    for name, subtree in include.items():
+        relation = RELATIONS[table][name]
+        if relation.through and relation.through[0] not in tables:
+            tables.append(relation.through[0])
+        for child in included_tables(relation.table, subtree):
+            if child not in tables:
+                tables.append(child)
+    return tables
+
+
+def select_columns(table: str, fields: Optional[Sequence[str]], include: Dict[str, dict] = None,
+                   prefix: str = "", required: Sequence[str] = ()) -> str:
+    """Lista de columnas del SELECT: las pedidas + clave primaria + las que usan las relaciones
+    + `required` (p. ej. las claves de orden que arma el cursor)."""
+    if not fields:
+        return f"{prefix}*"
+    needed = list(PRIMARY_KEYS.get(table, ("id",))) + list(required)
+    needed += [RELATIONS[table][name].local for name in (include or {})]
+    columns = [column for column in COLUMNS[table] if column in needed or column in fields]
+    return ", ".join(prefix + column for column in columns)
+
+
+# ---------- Resolucion ----------
+def _chunks(values: List[Any]):
+    for start in range(0, len(values), IN_CHUNK):
+        yield values[start:start + IN_CHUNK]
+
+
+def embed(conn, table: str, rows: List[Dict[str, Any]], include: Dict[str, dict],
+          fields: Dict[str, List[str]]):
+    """Agrega a cada fila de `rows` las relaciones de `include` (recursivo, por lotes)."""
+    for name, subtree in include.items():
+        relation = RELATIONS[table][name]
+        parents = sorted({row[relation.local] for row in rows if row.get(relation.local) is not None})
+        columns = select_columns(relation.table, fields.get(relation.table), subtree, prefix="t.")
+        children: Dict[Any, List[Dict[str, Any]]] = {}
+        for part in _chunks(parents):
+            marks = ", ".join("?" for _ in part)
+            if relation.through:
+                link, to_parent, to_child = relation.through
+                sql = (f"SELECT l.{to_parent} AS _parent, {columns} FROM {link} l "
+                       f"JOIN {relation.table} t ON t.{relation.remote} = l.{to_child} "
+                       f"WHERE l.{to_parent} IN ({marks})")
+            else:
+                sql = (f"SELECT t.{relation.remote} AS _parent, {columns} FROM {relation.table} t "
+                       f"WHERE t.{relation.remote} IN ({marks})")
+            for child in conn.execute(sql, part):
+                child = dict(child)
+                children.setdefault(child.pop("_parent"), []).append(child)
+        # Sin ORDER BY en SQL: los indices de las FK no dan el orden por id del hijo y los
+        # grupos son chicos, se ordenan aqui en lugar de con un B-tree temporal
+        for group in children.values():
+            group.sort(key=lambda child: child["id"])
+
+        if subtree:
+            embed(conn, relation.table, [child for group in children.values() for child in group],
+                  subtree, fields)
+        for row in rows:
+            found = children.get(row.get(relation.local), [])
+            row[name] = found if relation.many else (found[0] if found else None)
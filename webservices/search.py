@@ -0,0 +1,82 @@
+# search.py
+# Busqueda de texto completo (FTS5) sobre titulos/temas de work y nombres de author.
+#
+#   python search.py rebuild [library.db]   -> reconstruye los indices FTS desde las tablas
+import re
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional
+
+from migrations import migrate
+
+# Pesos BM25 por columna: el titulo pesa mas que el tema
+WORK_WEIGHTS = (10.0, 2.0)
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text: str) -> Optional[str]:
+    """Convierte texto libre en una consulta FTS5: todas las palabras, como prefijo.
+
+    "princip filos" -> '"princip"* "filos"*'. Devuelve None si no hay palabras.
+    """
+    words = WORD_RE.findall(text or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def work_match_sql() -> str:
+    """Subconsulta de works que coinciden con la consulta FTS (un parametro), con su rank."""
+    return (
+        "(SELECT work.*, bm25(work_fts, %s, %s) AS rank "
+        "FROM work_fts JOIN work ON work.id = work_fts.rowid "
+        "WHERE work_fts MATCH ?)" % WORK_WEIGHTS
+    )
+
+
+def search_works(conn: sqlite3.Connection, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+    query = fts_query(text)
+    if query is None:
+        return []
+    rows = conn.execute(
+        f"SELECT * FROM {work_match_sql()} ORDER BY rank, id LIMIT ?", (query, limit)
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def search_authors(conn: sqlite3.Connection, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+    query = fts_query(text)
+    if query is None:
+        return []
+    rows = conn.execute(
+        """
+        SELECT author.*, bm25(author_fts) AS rank
+          FROM author_fts JOIN author ON author.id = author_fts.rowid
+         WHERE author_fts MATCH ?
+         ORDER BY rank, author.id
+         LIMIT ?
+        """,
+        (query, limit),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def rebuild(conn: sqlite3.Connection):
+    """Reconstruye los indices FTS a partir de work y author (bases de datos existentes)."""
+    migrate(conn)
+    with conn:
+        conn.execute("INSERT INTO work_fts(work_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO author_fts(author_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO work_fts(work_fts) VALUES ('optimize')")
+        conn.execute("INSERT INTO author_fts(author_fts) VALUES ('optimize')")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("Uso: python search.py rebuild [library.db]")
+        sys.exit(2)
+    database = sys.argv[2] if len(sys.argv) > 2 else "library.db"
+    conn = sqlite3.connect(database)
+    rebuild(conn)
+    conn.close()
+    print(f"Indices FTS reconstruidos en {database}")
@@ -0,0 +1,108 @@
+# serve.py
+# Lanzador de produccion con workers pre-fork (gunicorn) para cualquiera de las apps.
+#
+#   python serve.py gateway                        # todas las rutas en un proceso (ver gateway.py)
+#   python serve.py ws_crud                        # o app_work, app_edition, app_work_author
+#   PORT=8001 WEB_CONCURRENCY=4 python serve.py app_work
+#   SERVE_WORKER_CLASS=uvicorn.workers.UvicornWorker python serve.py ws_crud   # modo ASGI
+#   kill -HUP <pid del master>                     # recarga el codigo sin cortar conexiones
+#
+# Configuracion por entorno:
+#   HOST, PORT                 direccion (SO_REUSEPORT activo)
+#   WEB_CONCURRENCY            workers (por defecto, uno por nucleo)
+#   SERVE_THREADS              hilos por worker (por defecto DB_POOL_SIZE)
+#   SERVE_MAX_REQUESTS         recicla cada worker tras N peticiones (+ SERVE_MAX_REQUESTS_JITTER)
+#   SERVE_TIMEOUT, SERVE_GRACEFUL_TIMEOUT, SERVE_KEEPALIVE   segundos
+#   SERVE_WORKER_CLASS         gthread (WSGI) o uvicorn.workers.UvicornWorker (ASGI, ver asgi.py)
+#   SERVE_PRELOAD=1            importa la app en el master (menos memoria; HUP ya no recarga codigo)
+#
+# SQLite con varios workers: todos comparten el mismo archivo, asi que el perfil debe
+# usar WAL (DB_PROFILE=wal o wal-durable, ver db_tuning.py) para que las lecturas de
+# un worker no esperen a la escritura de otro; con otro perfil el lanzador se niega a
+# arrancar mas de un worker. Cada worker aplica las migraciones pendientes al importar
+# la app (migrations.py ya es seguro entre procesos). Los caches de registros son por
+# proceso pero leen la tabla `changes` antes de cada lectura, asi que ven las
+# escrituras de los otros workers (ver cache.py).
+# gunicorn es opcional (pip install gunicorn).
+import argparse
+import importlib
+import os
+import sys
+from typing import Any, Dict
+
+APPS = ("gateway", "ws_crud", "app_work", "app_edition", "app_work_author")
+DEFAULT_PORTS = {"app_work": 8001}
+
+
+def options(name: str) -> Dict[str, Any]:
+    """Configuracion de gunicorn a partir del entorno."""
+    from db_pool import POOL_SIZE
+
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = os.environ.get("PORT", str(DEFAULT_PORTS.get(name, 8000)))
+    max_requests = int(os.environ.get("SERVE_MAX_REQUESTS", "10000"))
+    return {
+        "bind": f"{host}:{port}",
+        "workers": int(os.environ.get("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+        "worker_class": os.environ.get("SERVE_WORKER_CLASS", "gthread"),
+        "threads": int(os.environ.get("SERVE_THREADS", str(POOL_SIZE))),
+        "max_requests": max_requests,
+        "max_requests_jitter": int(os.environ.get("SERVE_MAX_REQUESTS_JITTER", str(max_requests // 10))),
+        "timeout": int(os.environ.get("SERVE_TIMEOUT", "60")),
+        "graceful_timeout": int(os.environ.get("SERVE_GRACEFUL_TIMEOUT", "30")),
+        "keepalive": int(os.environ.get("SERVE_KEEPALIVE", "75")),
+        "reuse_port": True,
+        # Cada worker importa la app: HUP recarga el codigo y ninguna conexion SQLite cruza el fork
+        # (si se activa, db_pool y db_tuning descartan en el worker las conexiones e hilos heredados)
+        "preload_app": os.environ.get("SERVE_PRELOAD") == "1",
+        "proc_name": name,
+    }
+
+
+def check_sqlite(workers: int) -> str:
+    """Mensaje de error si la configuracion de SQLite no sirve para `workers` procesos."""
+    from db_tuning import DB_PROFILE, uses_wal
+
+    if workers > 1 and not uses_wal():
+        return (f"El perfil SQLite '{DB_PROFILE}' no usa WAL: con {workers} workers cada escritura "
+                f"bloquearia a los demas. Use DB_PROFILE=wal o WEB_CONCURRENCY=1")
+    return ""
+
+
+def load_app(name: str, worker_class: str):
+    if "uvicorn" in worker_class.lower():
+        from asgi import asgi_app
+        return asgi_app(name)
+    return importlib.import_module(name).app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sirve una app con workers pre-fork (gunicorn)")
+    parser.add_argument("app", choices=APPS)
+    args = parser.parse_args(argv)
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("El lanzador de produccion necesita gunicorn: pip install gunicorn")
+        return 2
+
+    config = options(args.app)
+    error = check_sqlite(config["workers"])
+    if error:
+        print(error)
+        return 2
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in config.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app(args.app, config["worker_class"])
+
+    Server().run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
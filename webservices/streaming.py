@@ -0,0 +1,77 @@
+# streaming.py
+# Respuestas en streaming (arreglo JSON por partes o NDJSON) para exportar tablas grandes.
+import json
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from flask import Response, request
+
+from db_pool import get_pool
+
+NDJSON = "application/x-ndjson"
+BATCH_SIZE = 500
+
+
+def stream_format() -> Optional[str]:
+    """Formato pedido por el cliente: 'ndjson', 'json' o None (respuesta normal).
+
+    Se activa con ?stream=ndjson|json o con `Accept: application/x-ndjson`.
+    """
+    fmt = request.args.get("stream")
+    if fmt in ("ndjson", "json"):
+        return fmt
+    if fmt in ("1", "true"):
+        return "json"
+    if request.accept_mimetypes.best == NDJSON:
+        return "ndjson"
+    return None
+
+
+def iter_rows(database: str, sql: str, params: Sequence[Any] = (), batch_size: int = BATCH_SIZE) -> Iterator[Any]:
+    """Recorre el resultado con fetchmany; nunca hay mas de un lote en memoria.
+
+    Usa su propia conexion del pool porque el generador se consume despues
+    del teardown de la peticion (que devuelve la conexion de `g`).
+    """
+    pool = get_pool(database)
+    conn = pool.acquire()
+    try:
+        cursor = conn.execute(sql, tuple(params))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
+    finally:
+        pool.release(conn)
+
+
+def _encode(row) -> str:
+    return json.dumps(dict(row), ensure_ascii=False, separators=(",", ":"))
+
+
+def _ndjson(batches) -> Iterator[str]:
+    for rows in batches:
+        yield "".join(_encode(row) + "\n" for row in rows)
+
+
+def _json_array(batches) -> Iterator[str]:
+    yield "["
+    first = True
+    for rows in batches:
+        chunk = ",".join(_encode(row) for row in rows)
+        yield chunk if first else "," + chunk
+        first = False
+    yield "]"
+
+
+def stream_response(database: str, sql: str, params: Sequence[Any] = (), fmt: str = "ndjson") -> Response:
+    """Response chunked que serializa cada lote a medida que sale del cursor."""
+    return stream_batches(iter_rows(database, sql, params), fmt)
+
+
+def stream_batches(batches: Iterable[Sequence[Any]], fmt: str = "ndjson") -> Response:
+    """Response chunked a partir de lotes de filas (sqlite3.Row o dict)."""
+    if fmt == "ndjson":
+        return Response(_ndjson(batches), mimetype=NDJSON)
+    return Response(_json_array(batches), mimetype="application/json")
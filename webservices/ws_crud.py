@@ -1,102 +1,245 @@
-from flask import Flask, request, jsonify
+import os
 import sqlite3
-from datetime import datetime
+from flask import Blueprint, Flask, request, jsonify
+from db_pool import get_db, init_app
+from migrations import ensure_schema
+from pagination import SortKey, PaginationError, build_select, fetch_page, count_rows, parse_page_args, page_response
+from streaming import stream_format, stream_response
+from search import search_works, search_authors
+from bulk import BulkError, parse_bulk_body, check_rows, execute_bulk
+from cache import make_cache, init_app as cache_init_app
+from changes import init_app as changes_init_app
+from metrics import init_app as metrics_init_app
+from filters import FilterError, parse_query
+from availability import work_counts, edition_counts, editions_of_work
+from lookup import barcode_index, isbn_index
+from relations import RelationError, parse_include, parse_fields, included_tables, select_columns, embed
+from conditional import (PreconditionFailed, record_etag, record_validators, collection_validators,
+                         parse_timestamp, is_fresh, not_modified, with_validators, check_if_match,
+                         precondition_failed, utc_now)
+
+# Una sola base para todos los servicios con LIBRARY_DB (ver gateway.py)
+DATABASE = os.environ.get('LIBRARY_DB', 'library.db')
+
+# Un Blueprint por recurso: esta app los registra todos y gateway.py los combina con
+# los de app_work.py, app_edition.py y app_work_author.py
+catalog_bp = Blueprint('catalog', __name__)
+work_bp = Blueprint('works', __name__)
+author_bp = Blueprint('authors', __name__)
+work_author_bp = Blueprint('work_authors', __name__)
+edition_bp = Blueprint('editions', __name__)
+item_bp = Blueprint('items', __name__)
+BLUEPRINTS = (catalog_bp, work_bp, author_bp, work_author_bp, edition_bp, item_bp)
 
 app = Flask(__name__)
+init_app(app)
+app.register_error_handler(PreconditionFailed, precondition_failed)
 
 def get_db_connection():
-    # Establece una conexion con la base de datos SQLite
-    conn = sqlite3.connect('library.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    # Obtiene una conexion del pool, ligada a la peticion actual (se devuelve en el teardown)
+    return get_db(DATABASE)
 
-# Crear tablas
+# Crear tablas e indices (migraciones versionadas, ver migrations.py)
 def create_tables():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.executescript('''
-    CREATE TABLE IF NOT EXISTS work (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        theme TEXT,
-        created_at TEXT NOT NULL,
-        updated_at TEXT NOT NULL
-    );
-
-    CREATE TABLE IF NOT EXISTS author (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        full_name TEXT NOT NULL,
-        created_at TEXT NOT NULL,
-        updated_at TEXT NOT NULL
-    );
-
-    CREATE TABLE IF NOT EXISTS work_author (
-        work_id INTEGER NOT NULL,
-        author_id INTEGER NOT NULL,
-        PRIMARY KEY (work_id, author_id),
-        FOREIGN KEY (work_id) REFERENCES work(id) ON DELETE CASCADE,
-        FOREIGN KEY (author_id) REFERENCES author(id) ON DELETE CASCADE
-    );
-
-    CREATE TABLE IF NOT EXISTS edition (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        work_id INTEGER NOT NULL,
-        year INTEGER,
-        publisher TEXT,
-        isbn TEXT UNIQUE,
-        cover_url TEXT,
-        created_at TEXT NOT NULL,
-        updated_at TEXT NOT NULL,
-        FOREIGN KEY (work_id) REFERENCES work(id) ON DELETE CASCADE
-    );
-
-    CREATE TABLE IF NOT EXISTS item (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        edition_id INTEGER NOT NULL,
-        barcode TEXT UNIQUE,
-        location TEXT,
-        status TEXT CHECK (status IN ('available','loaned','repair','lost')) DEFAULT 'available',
-        created_at TEXT NOT NULL,
-        updated_at TEXT NOT NULL,
-        FOREIGN KEY (edition_id) REFERENCES edition(id) ON DELETE CASCADE
-    );
-    ''')
-    conn.commit()
-    conn.close()
+    ensure_schema(DATABASE)
 
 create_tables()
 
+# Cache de lecturas de un registro; lo invalidan PUT/DELETE (incluidos los efectos en cascada)
+record_cache = make_cache('library_records')
+cache_init_app(app)
+# Registro de cambios para sincronizacion incremental (GET /changes?since=)
+changes_init_app(app, DATABASE)
+# Latencias por ruta y por sentencia SQL, consultas lentas (GET /metrics, ver metrics.py)
+metrics_init_app(app)
+
+def fetch_record(table, record_id):
+    # Lee un registro a traves del cache (read-through); None si no existe
+    conn = get_db_connection()
+    def load():
+        row = conn.execute(f'SELECT * FROM {table} WHERE id = ?', (record_id,)).fetchone()
+        return dict(row) if row else None
+    # Antes de leer: descarta lo que otros procesos/modulos cambiaron (ver cache.py)
+    record_cache.sync(conn)
+    return record_cache.get_or_load((table, record_id), load)
+
+def select_ids(conn, sql, ids, chunk=500):
+    # Ejecuta `sql` (con un IN ({}) ) por bloques de ids y devuelve la primera columna
+    ids = list(ids)
+    found = []
+    for start in range(0, len(ids), chunk):
+        part = ids[start:start + chunk]
+        found += [row[0] for row in conn.execute(sql.format(', '.join('?' for _ in part)), part)]
+    return found
+
+def cascade_keys(conn, table, ids):
+    # Claves de cache que desaparecen al borrar `ids` de `table`, incluidas las de ON DELETE CASCADE
+    keys = [(table, record_id) for record_id in ids]
+    edition_ids = list(ids) if table == 'edition' else []
+    if table == 'work':
+        edition_ids = select_ids(conn, 'SELECT id FROM edition WHERE work_id IN ({})', ids)
+        keys += [('edition', edition_id) for edition_id in edition_ids]
+    if edition_ids:
+        keys += [('item', item_id) for item_id in select_ids(conn, 'SELECT id FROM item WHERE edition_id IN ({})', edition_ids)]
+    return keys
+
+def begin_write(conn, table, record_id):
+    # Abre la transaccion de escritura y valida If-Match contra la fila actual (412 si no coincide)
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    if request.if_match:
+        row = conn.execute(f'SELECT id, updated_at FROM {table} WHERE id = ?', (record_id,)).fetchone()
+        try:
+            check_if_match(table, dict(row) if row else None)
+        except PreconditionFailed:
+            conn.rollback()
+            raise
+
+def integrity_error(conn, error):
+    # Clave foranea inexistente (con foreign_keys=ON, ver db_tuning.py), ISBN o codigo de
+    # barras repetido, status invalido...: el cliente recibe un 409, no un 500
+    conn.rollback()
+    return jsonify({'error': f'Error de integridad: {error}'}), 409
+
+def delete_records(table, ids):
+    # Borra `ids` de `table` dentro de la transaccion de begin_write y saca del cache
+    # todo lo que el borrado elimina
+    conn = get_db_connection()
+    try:
+        keys = cascade_keys(conn, table, ids)
+        deleted = conn.executemany(f'DELETE FROM {table} WHERE id = ?', [(record_id,) for record_id in ids]).rowcount
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    record_cache.invalidate(keys)
+    return deleted
+
+def record_response(table, record):
+    # JSON del registro con ETag/Last-Modified; 304 sin serializar si el cliente ya lo tiene
+    etag, last_modified = record_validators(table, record)
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+    return with_validators(jsonify(record), etag, last_modified)
+
+def get_record(table, record_id, not_found):
+    # GET de un registro: la representacion completa sale del cache; con ?fields= o ?include=
+    # se arma con SQL (ver relations.py) y se valida con la version de las tablas involucradas
+    try:
+        include = parse_include(table)
+        fields = parse_fields(table, include)
+    except RelationError as e:
+        return jsonify({'error': str(e)}), 400
+    if not include and not fields:
+        record = fetch_record(table, record_id)
+        if record is None:
+            return jsonify({'error': not_found}), 404
+        return record_response(table, record)
+
+    conn = get_db_connection()
+    etag, last_modified = collection_validators(conn, included_tables(table, include))
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+    columns = select_columns(table, fields.get(table), include)
+    row = conn.execute(f'SELECT {columns} FROM {table} WHERE id = ?', (record_id,)).fetchone()
+    if row is None:
+        return jsonify({'error': not_found}), 404
+    record = dict(row)
+    embed(conn, table, [record], include, fields)
+    return with_validators(jsonify(record), etag, last_modified)
+
+def updated_response(table, record_id, message, cursor, now):
+    # Respuesta de un PUT: la nueva version viaja en ETag para el siguiente If-Match
+    response = jsonify({'message': message})
+    if cursor.rowcount:
+        with_validators(response, record_etag(table, record_id, now), parse_timestamp(now))
+    return response
+
+# Orden de paginacion por cursor de cada coleccion (la ultima clave es unica)
+ID_KEYS = [SortKey('id')]
+WORK_AUTHOR_KEYS = [SortKey('work_id'), SortKey('author_id')]
+
+def list_table(table, keys):
+    # Devuelve una pagina de la tabla; ver pagination.py (limit, cursor, count)
+    # Filtros y orden por query string (?status__in=a,b&sort=-year), ver filters.py;
+    # `keys` es el orden por defecto
+    # ?fields= y ?include= eligen columnas y embeben relaciones (ver relations.py)
+    # Con ?stream=json|ndjson exporta la tabla completa (desde el cursor) en streaming
+    try:
+        limit, cursor, count = parse_page_args()
+        where, params, keys = parse_query(table, keys)
+        include = parse_include(table)
+        fields = parse_fields(table, include)
+        columns = select_columns(table, fields.get(table), include, required=[k.column for k in keys])
+        fmt = stream_format()
+        if fmt:
+            if include:
+                raise RelationError('include no se admite en exportaciones en streaming')
+            sql, params = build_select(table, keys, cursor, where, params, columns)
+            return stream_response(DATABASE, sql, params, fmt)
+        conn = get_db_connection()
+        etag, last_modified = collection_validators(conn, included_tables(table, include))
+        if is_fresh(etag, last_modified):
+            return not_modified(etag, last_modified)
+        rows, next_cursor = fetch_page(conn, table, keys, limit, cursor, where, params, columns)
+        embed(conn, table, rows, include, fields)
+    except (PaginationError, FilterError, RelationError) as e:
+        return jsonify({'error': str(e)}), 400
+    total = count_rows(conn, table, count, where, params)
+    return with_validators(page_response(rows, next_cursor, total), etag, last_modified)
+
 # Punto de entrada principal
-@app.route('/', methods=['GET'])
+@catalog_bp.route('/', methods=['GET'])
 def root():
     # Devuelve un mensaje de bienvenida y los endpoints disponibles
-    return jsonify({"message": "Bienvenido a la API de la Biblioteca! Endpoints disponibles: /work, /author"})
+    return jsonify({"message": "Bienvenido a la API de la Biblioteca! Endpoints disponibles: /work, /author, /search"})
+
+# Busqueda de texto completo (FTS5) sobre titulos/temas de works y nombres de autores
+@catalog_bp.route('/search', methods=['GET'])
+def search():
+    # ?q=texto (prefijos de palabras), ?type=work|author, ?limit=20; resultados ordenados por BM25
+    q = request.args.get('q', '')
+    kind = request.args.get('type')
+    if kind not in (None, 'work', 'author'):
+        return jsonify({'error': "type debe ser 'work' o 'author'"}), 400
+    try:
+        limit = max(1, min(100, int(request.args.get('limit', 20))))
+    except ValueError:
+        return jsonify({'error': 'limit debe ser entero'}), 400
+
+    conn = get_db_connection()
+    results = {}
+    if kind in (None, 'work'):
+        results['works'] = search_works(conn, q, limit)
+    if kind in (None, 'author'):
+        results['authors'] = search_authors(conn, q, limit)
+    return jsonify(results)
 
 # Operaciones CRUD para 'work'
-@app.route('/work', methods=['GET', 'POST'])
+@work_bp.route('/work', methods=['GET', 'POST'])
 def manage_works():
     # Maneja las operaciones CRUD para la tabla 'work'
     conn = get_db_connection()
     cursor = conn.cursor()
 
     if request.method == 'GET':
-        # Obtener todos los registros de la tabla 'work'
-        cursor.execute('SELECT * FROM work')
-        works = cursor.fetchall()
-        conn.close()
-        return jsonify([dict(work) for work in works])
+        # Obtener una pagina de registros de la tabla 'work'
+        return list_table('work', ID_KEYS)
 
     if request.method == 'POST':
         # Insertar un nuevo registro en la tabla 'work'
         new_work = request.get_json()
-        now = datetime.now().isoformat()
-        cursor.execute('INSERT INTO work (title, theme, created_at, updated_at) VALUES (?, ?, ?, ?)',
-                       (new_work['title'], new_work.get('theme'), now, now))
-        conn.commit()
-        conn.close()
+        now = utc_now()
+        try:
+            cursor.execute('INSERT INTO work (title, theme, created_at, updated_at) VALUES (?, ?, ?, ?)',
+                           (new_work['title'], new_work.get('theme'), now, now))
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            return integrity_error(conn, e)
         return jsonify({'id': cursor.lastrowid}), 201
 
-@app.route('/work/<int:work_id>', methods=['GET', 'PUT', 'DELETE'])
+@work_bp.route('/work/<int:work_id>', methods=['GET', 'PUT', 'DELETE'])
 def manage_work(work_id):
     # Maneja operaciones CRUD para un registro especifico de la tabla 'work'
     conn = get_db_connection()
@@ -104,55 +247,52 @@ def manage_work(work_id):
 
     if request.method == 'GET':
         # Obtener un registro especifico de la tabla 'work'
-        cursor.execute('SELECT * FROM work WHERE id = ?', (work_id,))
-        work = cursor.fetchone()
-        conn.close()
-        if work is None:
-            return jsonify({'error': 'Trabajo no encontrado'}), 404
-        return jsonify(dict(work))
+        return get_record('work', work_id, 'Trabajo no encontrado')
 
     if request.method == 'PUT':
         # Actualizar un registro especifico de la tabla 'work'
         updated_work = request.get_json()
-        now = datetime.now().isoformat()
-        cursor.execute('UPDATE work SET title = ?, theme = ?, updated_at = ? WHERE id = ?',
-                       (updated_work['title'], updated_work.get('theme'), now, work_id))
-        conn.commit()
-        conn.close()
-        return jsonify({'message': 'Trabajo actualizado'})
+        now = utc_now()
+        begin_write(conn, 'work', work_id)
+        try:
+            cursor.execute('UPDATE work SET title = ?, theme = ?, updated_at = ? WHERE id = ?',
+                           (updated_work['title'], updated_work.get('theme'), now, work_id))
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            return integrity_error(conn, e)
+        record_cache.invalidate([('work', work_id)])
+        return updated_response('work', work_id, 'Trabajo actualizado', cursor, now)
 
     if request.method == 'DELETE':
         # Eliminar un registro especifico de la tabla 'work'
-        cursor.execute('DELETE FROM work WHERE id = ?', (work_id,))
-        conn.commit()
-        conn.close()
+        begin_write(conn, 'work', work_id)
+        delete_records('work', [work_id])
         return jsonify({'message': 'Trabajo eliminado'})
 
 # Operaciones CRUD para 'author'
-@app.route('/author', methods=['GET', 'POST'])
+@author_bp.route('/author', methods=['GET', 'POST'])
 def manage_authors():
     # Maneja las operaciones CRUD para la tabla 'author'
     conn = get_db_connection()
     cursor = conn.cursor()
 
     if request.method == 'GET':
-        # Obtener todos los registros de la tabla 'author'
-        cursor.execute('SELECT * FROM author')
-        authors = cursor.fetchall()
-        conn.close()
-        return jsonify([dict(author) for author in authors])
+        # Obtener una pagina de registros de la tabla 'author'
+        return list_table('author', ID_KEYS)
 
     if request.method == 'POST':
         # Insertar un nuevo registro en la tabla 'author'
         new_author = request.get_json()
-        now = datetime.now().isoformat()
-        cursor.execute('INSERT INTO author (full_name, created_at, updated_at) VALUES (?, ?, ?)',
-                       (new_author['full_name'], now, now))
-        conn.commit()
-        conn.close()
+        now = utc_now()
+        try:
+            cursor.execute('INSERT INTO author (full_name, created_at, updated_at) VALUES (?, ?, ?)',
+                           (new_author['full_name'], now, now))
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            return integrity_error(conn, e)
         return jsonify({'id': cursor.lastrowid}), 201
 
-@app.route('/author/<int:author_id>', methods=['GET', 'PUT', 'DELETE'])
+@author_bp.route('/author/<int:author_id>', methods=['GET', 'PUT', 'DELETE'])
 def manage_author(author_id):
     # Maneja operaciones CRUD para un registro especifico de la tabla 'author'
     conn = get_db_connection()
@@ -160,88 +300,83 @@ def manage_author(author_id):
 
     if request.method == 'GET':
         # Obtener un registro especifico de la tabla 'author'
-        cursor.execute('SELECT * FROM author WHERE id = ?', (author_id,))
-        author = cursor.fetchone()
-        conn.close()
-        if author is None:
-            return jsonify({'error': 'Autor no encontrado'}), 404
-        return jsonify(dict(author))
+        return get_record('author', author_id, 'Autor no encontrado')
 
     if request.method == 'PUT':
         # Actualizar un registro especifico de la tabla 'author'
         updated_author = request.get_json()
-        now = datetime.now().isoformat()
-        cursor.execute('UPDATE author SET full_name = ?, updated_at = ? WHERE id = ?',
-                       (updated_author['full_name'], now, author_id))
-        conn.commit()
-        conn.close()
-        return jsonify({'message': 'Autor actualizado'})
+        now = utc_now()
+        begin_write(conn, 'author', author_id)
+        try:
+            cursor.execute('UPDATE author SET full_name = ?, updated_at = ? WHERE id = ?',
+                           (updated_author['full_name'], now, author_id))
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            return integrity_error(conn, e)
+        record_cache.invalidate([('author', author_id)])
+        return updated_response('author', author_id, 'Autor actualizado', cursor, now)
 
     if request.method == 'DELETE':
         # Eliminar un registro especifico de la tabla 'author'
-        cursor.execute('DELETE FROM author WHERE id = ?', (author_id,))
-        conn.commit()
-        conn.close()
+        begin_write(conn, 'author', author_id)
+        delete_records('author', [author_id])
         return jsonify({'message': 'Autor eliminado'})
 
 # Operaciones CRUD para 'work_author'
-@app.route('/work_author', methods=['GET', 'POST'])
+@work_author_bp.route('/work_author', methods=['GET', 'POST'])
 def manage_work_authors():
     # Maneja las operaciones CRUD para la tabla 'work_author'
     conn = get_db_connection()
     cursor = conn.cursor()
 
     if request.method == 'GET':
-        # Obtener todos los registros de la tabla 'work_author'
-        cursor.execute('SELECT * FROM work_author')
-        work_authors = cursor.fetchall()
-        conn.close()
-        return jsonify([dict(work_author) for work_author in work_authors])
+        # Obtener una pagina de registros de la tabla 'work_author'
+        return list_table('work_author', WORK_AUTHOR_KEYS)
 
     if request.method == 'POST':
         # Insertar un nuevo registro en la tabla 'work_author'
         new_work_author = request.get_json()
-        cursor.execute('INSERT INTO work_author (work_id, author_id) VALUES (?, ?)',
-                       (new_work_author['work_id'], new_work_author['author_id']))
-        conn.commit()
-        conn.close()
+        try:
+            cursor.execute('INSERT INTO work_author (work_id, author_id) VALUES (?, ?)',
+                           (new_work_author['work_id'], new_work_author['author_id']))
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            return integrity_error(conn, e)
         return jsonify({'message': 'Relacion Trabajo-Autor creada'}), 201
 
-@app.route('/work_author/<int:work_id>/<int:author_id>', methods=['DELETE'])
+@work_author_bp.route('/work_author/<int:work_id>/<int:author_id>', methods=['DELETE'])
 def delete_work_author(work_id, author_id):
     # Eliminar un registro especifico de la tabla 'work_author'
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute('DELETE FROM work_author WHERE work_id = ? AND author_id = ?', (work_id, author_id))
     conn.commit()
-    conn.close()
     return jsonify({'message': 'Relacion Trabajo-Autor eliminada'})
 
 # Operaciones CRUD para 'edition'
-@app.route('/edition', methods=['GET', 'POST'])
+@edition_bp.route('/edition', methods=['GET', 'POST'])
 def manage_editions():
     # Maneja las operaciones CRUD para la tabla 'edition'
     conn = get_db_connection()
     cursor = conn.cursor()
 
     if request.method == 'GET':
-        # Obtener todos los registros de la tabla 'edition'
-        cursor.execute('SELECT * FROM edition')
-        editions = cursor.fetchall()
-        conn.close()
-        return jsonify([dict(edition) for edition in editions])
+        # Obtener una pagina de registros de la tabla 'edition'
+        return list_table('edition', ID_KEYS)
 
     if request.method == 'POST':
         # Insertar un nuevo registro en la tabla 'edition'
         new_edition = request.get_json()
-        now = datetime.now().isoformat()
-        cursor.execute('INSERT INTO edition (work_id, year, publisher, isbn, cover_url, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
-                       (new_edition['work_id'], new_edition['year'], new_edition['publisher'], new_edition['isbn'], new_edition['cover_url'], now, now))
-        conn.commit()
-        conn.close()
+        now = utc_now()
+        try:
+            cursor.execute('INSERT INTO edition (work_id, year, publisher, isbn, cover_url, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           (new_edition['work_id'], new_edition['year'], new_edition['publisher'], new_edition['isbn'], new_edition['cover_url'], now, now))
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            return integrity_error(conn, e)
         return jsonify({'id': cursor.lastrowid}), 201
 
-@app.route('/edition/<int:edition_id>', methods=['GET', 'PUT', 'DELETE'])
+@edition_bp.route('/edition/<int:edition_id>', methods=['GET', 'PUT', 'DELETE'])
 def manage_edition(edition_id):
     # Maneja operaciones CRUD para un registro especifico de la tabla 'edition'
     conn = get_db_connection()
@@ -249,55 +384,52 @@ def manage_edition(edition_id):
 
     if request.method == 'GET':
         # Obtener un registro especifico de la tabla 'edition'
-        cursor.execute('SELECT * FROM edition WHERE id = ?', (edition_id,))
-        edition = cursor.fetchone()
-        conn.close()
-        if edition is None:
-            return jsonify({'error': 'Edicion no encontrada'}), 404
-        return jsonify(dict(edition))
+        return get_record('edition', edition_id, 'Edicion no encontrada')
 
     if request.method == 'PUT':
         # Actualizar un registro especifico de la tabla 'edition'
         updated_edition = request.get_json()
-        now = datetime.now().isoformat()
-        cursor.execute('UPDATE edition SET work_id = ?, year = ?, publisher = ?, isbn = ?, cover_url = ?, updated_at = ? WHERE id = ?',
-                       (updated_edition['work_id'], updated_edition['year'], updated_edition['publisher'], updated_edition['isbn'], updated_edition['cover_url'], now, edition_id))
-        conn.commit()
-        conn.close()
-        return jsonify({'message': 'Edicion actualizada'})
+        now = utc_now()
+        begin_write(conn, 'edition', edition_id)
+        try:
+            cursor.execute('UPDATE edition SET work_id = ?, year = ?, publisher = ?, isbn = ?, cover_url = ?, updated_at = ? WHERE id = ?',
+                           (updated_edition['work_id'], updated_edition['year'], updated_edition['publisher'], updated_edition['isbn'], updated_edition['cover_url'], now, edition_id))
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            return integrity_error(conn, e)
+        record_cache.invalidate([('edition', edition_id)])
+        return updated_response('edition', edition_id, 'Edicion actualizada', cursor, now)
 
     if request.method == 'DELETE':
         # Eliminar un registro especifico de la tabla 'edition'
-        cursor.execute('DELETE FROM edition WHERE id = ?', (edition_id,))
-        conn.commit()
-        conn.close()
+        begin_write(conn, 'edition', edition_id)
+        delete_records('edition', [edition_id])
         return jsonify({'message': 'Edicion eliminada'})
 
 # Operaciones CRUD para 'item'
-@app.route('/item', methods=['GET', 'POST'])
+@item_bp.route('/item', methods=['GET', 'POST'])
 def manage_items():
     # Maneja las operaciones CRUD para la tabla 'item'
     conn = get_db_connection()
     cursor = conn.cursor()
 
     if request.method == 'GET':
-        # Obtener todos los registros de la tabla 'item'
-        cursor.execute('SELECT * FROM item')
-        items = cursor.fetchall()
-        conn.close()
-        return jsonify([dict(item) for item in items])
+        # Obtener una pagina de registros de la tabla 'item'
+        return list_table('item', ID_KEYS)
 
     if request.method == 'POST':
         # Insertar un nuevo registro en la tabla 'item'
         new_item = request.get_json()
-        now = datetime.now().isoformat()
-        cursor.execute('INSERT INTO item (edition_id, barcode, location, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
-                       (new_item['edition_id'], new_item['barcode'], new_item['location'], new_item['status'], now, now))
-        conn.commit()
-        conn.close()
+        now = utc_now()
+        try:
+            cursor.execute('INSERT INTO item (edition_id, barcode, location, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                           (new_item['edition_id'], new_item['barcode'], new_item['location'], new_item['status'], now, now))
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            return integrity_error(conn, e)
         return jsonify({'id': cursor.lastrowid}), 201
 
-@app.route('/item/<int:item_id>', methods=['GET', 'PUT', 'DELETE'])
+@item_bp.route('/item/<int:item_id>', methods=['GET', 'PUT', 'DELETE'])
 def manage_item(item_id):
     # Maneja operaciones CRUD para un registro especifico de la tabla 'item'
     conn = get_db_connection()
@@ -305,32 +437,314 @@ def manage_item(item_id):
 
     if request.method == 'GET':
         # Obtener un registro especifico de la tabla 'item'
-        cursor.execute('SELECT * FROM item WHERE id = ?', (item_id,))
-        item = cursor.fetchone()
-        conn.close()
-        if item is None:
-            return jsonify({'error': 'Item no encontrado'}), 404
-        return jsonify(dict(item))
+        return get_record('item', item_id, 'Item no encontrado')
 
     if request.method == 'PUT':
         # Actualizar un registro especifico de la tabla 'item'
         updated_item = request.get_json()
-        now = datetime.now().isoformat()
-        cursor.execute('UPDATE item SET edition_id = ?, barcode = ?, location = ?, status = ?, updated_at = ? WHERE id = ?',
-                       (updated_item['edition_id'], updated_item['barcode'], updated_item['location'], updated_item['status'], now, item_id))
-        conn.commit()
-        conn.close()
-        return jsonify({'message': 'Item actualizado'})
+        now = utc_now()
+        begin_write(conn, 'item', item_id)
+        try:
+            cursor.execute('UPDATE item SET edition_id = ?, barcode = ?, location = ?, status = ?, updated_at = ? WHERE id = ?',
+                           (updated_item['edition_id'], updated_item['barcode'], updated_item['location'], updated_item['status'], now, item_id))
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            return integrity_error(conn, e)
+        record_cache.invalidate([('item', item_id)])
+        return updated_response('item', item_id, 'Item actualizado', cursor, now)
 
     if request.method == 'DELETE':
         # Eliminar un registro especifico de la tabla 'item'
-        cursor.execute('DELETE FROM item WHERE id = ?', (item_id,))
-        conn.commit()
-        conn.close()
+        begin_write(conn, 'item', item_id)
+        delete_records('item', [item_id])
         return jsonify({'message': 'Item eliminado'})
 
+# Disponibilidad de ejemplares por work/edicion, leida de los contadores que mantienen
+# los triggers (ver availability.py): nunca recorre item
+# Validadores: version de edition/item, un 304 no toca los contadores
+MAX_AVAILABILITY_IDS = 500
+
+@work_bp.route('/work/<int:work_id>/availability', methods=['GET'])
+def work_availability(work_id):
+    # Conteo por status del work y de cada una de sus ediciones
+    conn = get_db_connection()
+    if conn.execute('SELECT 1 FROM work WHERE id = ?', (work_id,)).fetchone() is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    etag, last_modified = collection_validators(conn, ['edition', 'item'])
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+    editions = editions_of_work(conn, work_id)
+    payload = {'work_id': work_id, 'counts': work_counts(conn, [work_id])[work_id],
+               'editions': [{'edition_id': edition_id, 'counts': counts}
+                            for edition_id, counts in sorted(editions.items())]}
+    return with_validators(jsonify(payload), etag, last_modified)
+
+@edition_bp.route('/edition/<int:edition_id>/availability', methods=['GET'])
+def edition_availability(edition_id):
+    # Conteo por status de una edicion
+    conn = get_db_connection()
+    if conn.execute('SELECT 1 FROM edition WHERE id = ?', (edition_id,)).fetchone() is None:
+        return jsonify({'error': 'Edicion no encontrada'}), 404
+    etag, last_modified = collection_validators(conn, ['edition', 'item'])
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+    payload = {'edition_id': edition_id, 'counts': edition_counts(conn, [edition_id])[edition_id]}
+    return with_validators(jsonify(payload), etag, last_modified)
+
+@catalog_bp.route('/availability', methods=['GET'])
+def availability():
+    # Varios a la vez: ?work_id=1,2,3 y/o ?edition_id=4,5 (ids inexistentes cuentan cero)
+    try:
+        ids = {name: [int(i) for i in request.args.get(name, '').split(',') if i]
+               for name in ('work_id', 'edition_id')}
+    except ValueError:
+        return jsonify({'error': 'work_id/edition_id deben ser listas de enteros'}), 400
+    if not any(ids.values()) or any(len(values) > MAX_AVAILABILITY_IDS for values in ids.values()):
+        return jsonify({'error': f'Indique entre 1 y {MAX_AVAILABILITY_IDS} ids en work_id o edition_id'}), 400
+
+    conn = get_db_connection()
+    etag, last_modified = collection_validators(conn, ['edition', 'item'])
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+    payload = {}
+    if ids['work_id']:
+        payload['works'] = [{'work_id': key, 'counts': counts}
+                            for key, counts in work_counts(conn, ids['work_id']).items()]
+    if ids['edition_id']:
+        payload['editions'] = [{'edition_id': key, 'counts': counts}
+                               for key, counts in edition_counts(conn, ids['edition_id']).items()]
+    return with_validators(jsonify(payload), etag, last_modified)
+
+# Prestamo y devolucion de items: un UPDATE condicional (WHERE status = ...) dentro de
+# BEGIN IMMEDIATE en lugar de leer y reescribir el item completo. Si el item no esta en
+# el estado esperado (otro mostrador gano la carrera) responde 409 sin tocar nada
+CIRCULATION = {
+    # accion: (status requerido, status nuevo)
+    'checkout': ('available', 'loaned'),
+    'return': ('loaned', 'available'),
+}
+IN_CHUNK = 500
+
+@item_bp.route('/item/<int:item_id>/<any(checkout, return):action>', methods=['POST'])
+def circulate_item(item_id, action):
+    expected, target = CIRCULATION[action]
+    conn = get_db_connection()
+    now = utc_now()
+    begin_write(conn, 'item', item_id)
+    try:
+        updated = conn.execute('UPDATE item SET status = ?, updated_at = ? WHERE id = ? AND status = ?',
+                               (target, now, item_id, expected)).rowcount
+        if not updated:
+            current = conn.execute('SELECT status FROM item WHERE id = ?', (item_id,)).fetchone()
+            conn.rollback()
+            if current is None:
+                return jsonify({'error': 'Item no encontrado'}), 404
+            return jsonify({'error': f"El item debe estar '{expected}'", 'status': current['status']}), 409
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    record_cache.invalidate([('item', item_id)])
+    response = jsonify({'id': item_id, 'status': target})
+    return with_validators(response, record_etag('item', item_id, now), parse_timestamp(now))
+
+@item_bp.route('/item/_<any(checkout, return):action>', methods=['POST'])
+def circulate_items(action):
+    # Por codigo de barras: ["BC1", "BC2"], [{"barcode": "BC1"}, ...] o NDJSON, en una sola
+    # transaccion; con ?atomic=1 no se aplica nada si algun item no estaba en el estado esperado
+    try:
+        rows = parse_bulk_body()
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    atomic = request.args.get('atomic') in ('1', 'true')
+    expected, target = CIRCULATION[action]
+
+    errors, wanted = [], {}
+    for index, row in enumerate(rows):
+        barcode = row.get('barcode') if isinstance(row, dict) else row
+        if not isinstance(barcode, str) or not barcode:
+            errors.append({'index': index, 'error': 'Falta barcode'})
+        elif barcode in wanted:
+            errors.append({'index': index, 'error': f'Barcode repetido: {barcode}'})
+        else:
+            wanted[barcode] = index
+    if atomic and errors:
+        return bulk_response({'updated': 0}, errors, atomic)
+
+    conn = get_db_connection()
+    now = utc_now()
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        done = {}
+        barcodes = list(wanted)
+        for start in range(0, len(barcodes), IN_CHUNK):
+            part = barcodes[start:start + IN_CHUNK]
+            marks = ', '.join('?' for _ in part)
+            returned = conn.execute(f'UPDATE item SET status = ?, updated_at = ? '
+                                    f'WHERE barcode IN ({marks}) AND status = ? RETURNING id, barcode',
+                                    (target, now, *part, expected)).fetchall()
+            done.update((row['barcode'], row['id']) for row in returned)
+        missing = [barcode for barcode in barcodes if barcode not in done]
+        current = {}
+        for start in range(0, len(missing), IN_CHUNK):
+            part = missing[start:start + IN_CHUNK]
+            marks = ', '.join('?' for _ in part)
+            current.update(conn.execute(f'SELECT barcode, status FROM item WHERE barcode IN ({marks})', part))
+        for barcode in missing:
+            if barcode in current:
+                errors.append({'index': wanted[barcode], 'barcode': barcode, 'status': current[barcode],
+                               'error': f"El item debe estar '{expected}'"})
+            else:
+                errors.append({'index': wanted[barcode], 'barcode': barcode, 'error': 'Item no encontrado'})
+        if atomic and errors:
+            conn.rollback()
+            done = {}
+        else:
+            conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    record_cache.invalidate([('item', item_id) for item_id in done.values()])
+    return bulk_response({'updated': len(done), 'ids': sorted(done.values())}, errors, atomic)
+
+# Busqueda por codigo de barras e ISBN para las estaciones de escaneo: el id sale del indice
+# hash en memoria (ver lookup.py, el ISBN se acepta como ISBN-10 o 13, con o sin guiones)
+# y el registro, del cache de lecturas
+MAX_LOOKUP_VALUES = 1000
+
+@item_bp.route('/item/by-barcode/<path:barcode>', methods=['GET'])
+def item_by_barcode(barcode):
+    found = barcode_index(DATABASE).resolve(get_db_connection(), [barcode])
+    if barcode not in found:
+        return jsonify({'error': 'Item no encontrado'}), 404
+    return get_record('item', found[barcode], 'Item no encontrado')
+
+@edition_bp.route('/edition/by-isbn/<isbn>', methods=['GET'])
+def edition_by_isbn(isbn):
+    found = isbn_index(DATABASE).resolve(get_db_connection(), [isbn])
+    if isbn not in found:
+        return jsonify({'error': 'Edicion no encontrada'}), 404
+    return get_record('edition', found[isbn], 'Edicion no encontrada')
+
+def lookup_many(table, index, name):
+    # Lote: ["A", "B"], {"items": [...]} o NDJSON -> {'found': {valor: registro}, 'missing': [...]}
+    try:
+        values = parse_bulk_body(MAX_LOOKUP_VALUES)
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    if not all(isinstance(value, str) and value for value in values):
+        return jsonify({'error': f'Cada {name} debe ser un texto no vacio'}), 400
+    conn = get_db_connection()
+    found = index.resolve(conn, values)
+    ids = sorted(set(found.values()))
+    records = {}
+    for start in range(0, len(ids), IN_CHUNK):
+        part = ids[start:start + IN_CHUNK]
+        marks = ', '.join('?' for _ in part)
+        records.update((row['id'], dict(row)) for row in conn.execute(f'SELECT * FROM {table} WHERE id IN ({marks})', part))
+    found = {value: records[record_id] for value, record_id in found.items() if record_id in records}
+    return jsonify({'found': found, 'missing': [value for value in dict.fromkeys(values) if value not in found]})
+
+@item_bp.route('/item/by-barcode', methods=['POST'])
+def items_by_barcode():
+    return lookup_many('item', barcode_index(DATABASE), 'barcode')
+
+@edition_bp.route('/edition/by-isbn', methods=['POST'])
+def editions_by_isbn():
+    return lookup_many('edition', isbn_index(DATABASE), 'isbn')
+
+# Operaciones masivas (bulk): arreglo JSON, {"items": [...]} o NDJSON en una sola transaccion
+# Con ?atomic=1 no se aplica nada si alguna fila falla
+ITEM_STATUSES = ('available', 'loaned', 'repair', 'lost')
+BULK_COLUMNS = {
+    # tabla: columnas que exigen los POST/PUT individuales
+    'work': ['title', 'theme'],
+    'author': ['full_name'],
+    'edition': ['work_id', 'year', 'publisher', 'isbn', 'cover_url'],
+    'item': ['edition_id', 'barcode', 'location', 'status'],
+}
+BULK_REQUIRED = {'work': ['title']}
+BULK_CHOICES = {'item': {'status': ITEM_STATUSES}}
+
+def bulk_response(payload, errors, atomic, status=200):
+    # 207 si se aplicaron solo algunas filas, 409 si atomic y hubo errores
+    payload['errors'] = sorted(errors, key=lambda error: error['index'])
+    if errors:
+        status = 409 if atomic else 207
+    return jsonify(payload), status
+
+def run_bulk(sql, valid, params, errors, atomic, inserts=False):
+    # Ejecuta las filas validas salvo que atomic y ya haya errores de validacion
+    if atomic and errors:
+        return {}, errors
+    entries = [(index, params(row)) for index, row in valid]
+    results, failed = execute_bulk(get_db_connection(), sql, entries, atomic, inserts)
+    return results, errors + failed
+
+@catalog_bp.route('/<any(work, author, edition, item):table>/_bulk', methods=['POST', 'PUT', 'DELETE'])
+def bulk_records(table):
+    # Crea (POST), reemplaza (PUT, cada fila con 'id') o elimina (DELETE, ids u objetos con 'id')
+    try:
+        rows = parse_bulk_body()
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    atomic = request.args.get('atomic') in ('1', 'true')
+    columns = BULK_COLUMNS[table]
+    required = BULK_REQUIRED.get(table, columns)
+    now = utc_now()
+
+    if request.method == 'DELETE':
+        rows = [{'id': row} if isinstance(row, int) else row for row in rows]
+        valid, errors = check_rows(rows, ['id'])
+        keys = cascade_keys(get_db_connection(), table, [row['id'] for _, row in valid])
+        results, errors = run_bulk(f'DELETE FROM {table} WHERE id = ?', valid,
+                                   lambda row: (row['id'],), errors, atomic)
+        record_cache.invalidate(keys)
+        return bulk_response({'deleted': len(results)}, errors, atomic)
+
+    if request.method == 'PUT':
+        valid, errors = check_rows(rows, ['id'] + required, BULK_CHOICES.get(table))
+        sets = ', '.join(f'{column} = ?' for column in columns)
+        results, errors = run_bulk(f'UPDATE {table} SET {sets}, updated_at = ? WHERE id = ?', valid,
+                                   lambda row: (*(row.get(c) for c in columns), now, row['id']), errors, atomic)
+        record_cache.invalidate([(table, row['id']) for _, row in valid])
+        return bulk_response({'updated': len(results)}, errors, atomic)
+
+    valid, errors = check_rows(rows, required, BULK_CHOICES.get(table))
+    marks = ', '.join('?' for _ in columns)
+    results, errors = run_bulk(
+        f'INSERT INTO {table} ({", ".join(columns)}, created_at, updated_at) VALUES ({marks}, ?, ?)', valid,
+        lambda row: (*(row.get(c) for c in columns), now, now), errors, atomic, inserts=True)
+    ids = [results.get(index) for index in range(len(rows))]
+    return bulk_response({'ids': ids}, errors, atomic, 201)
+
+@work_author_bp.route('/work_author/_bulk', methods=['POST', 'DELETE'])
+def bulk_work_authors():
+    # Crea o elimina relaciones Trabajo-Autor: filas {"work_id": .., "author_id": ..}
+    try:
+        rows = parse_bulk_body()
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+    atomic = request.args.get('atomic') in ('1', 'true')
+    valid, errors = check_rows(rows, ['work_id', 'author_id'])
+    key = lambda row: (row['work_id'], row['author_id'])
+
+    if request.method == 'DELETE':
+        results, errors = run_bulk('DELETE FROM work_author WHERE work_id = ? AND author_id = ?',
+                                   valid, key, errors, atomic)
+        return bulk_response({'deleted': len(results)}, errors, atomic)
+
+    results, errors = run_bulk('INSERT INTO work_author (work_id, author_id) VALUES (?, ?)',
+                               valid, key, errors, atomic, inserts=True)
+    return bulk_response({'created': len(results)}, errors, atomic, 201)
+
 # Operaciones CRUD adicionales para otras tablas pueden ser agregadas de manera similar
 
+for blueprint in BLUEPRINTS:
+    app.register_blueprint(blueprint)
+
 if __name__ == '__main__':
-    # Inicia la aplicacion Flask en el puerto 8000
+    # Servidor de desarrollo en el puerto 8000; en produccion: python serve.py ws_crud
     app.run(host='0.0.0.0', port=8000, debug=True)
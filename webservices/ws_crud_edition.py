@@ -1,9 +1,13 @@
-import requests
 import json
 import time
 
+from client import LibraryClient, ApiError
+
 # URL base de tu API de Codespace (asegúrate de que esté corriendo en el puerto 8000)
-BASE_URL = "https://squalid-cemetery-x557p4jg655jhppp7-8000.app.github.dev/editions"
+BASE_URL = "https://squalid-cemetery-x557p4jg655jhppp7-8000.app.github.dev"
+
+# Una sola sesion (keep-alive, timeouts y reintentos) para todas las llamadas, ver client.py
+api = LibraryClient(BASE_URL)
 
 
 # --- 1. CREATE (POST) ---
@@ -24,21 +28,17 @@ def create_edition():
     }
 
     try:
-        response = requests.post(BASE_URL, json=new_edition_data)
-        response.raise_for_status()  # Lanza un error para códigos de estado 4xx/5xx
-
-        data = response.json()
-        print(f"Estado: {response.status_code}")
+        data = api.editions.create(new_edition_data)  # ApiError para códigos de estado 4xx/5xx
         print(f"Respuesta: {data}")
 
         # Devolvemos el ID creado para usarlo en otras operaciones
         return data.get('id')
 
-    except requests.exceptions.HTTPError as err:
+    except ApiError as err:
         print(f"Error HTTP: {err}")
-        print(f"Cuerpo del error: {response.json()}")
+        print(f"Cuerpo del error: {err.payload}")
         return None
-    except requests.exceptions.RequestException as err:
+    except OSError as err:
         print(f"Error de conexión: {err}")
         return None
 
@@ -48,34 +48,29 @@ def get_all_editions():
     """Obtiene y muestra todas las ediciones."""
     print("\n--- 2A. OBTENER TODAS las Ediciones (GET) ---")
     try:
-        response = requests.get(BASE_URL)
-        response.raise_for_status()
-
-        editions = response.json()
-        print(f"Estado: {response.status_code}")
+        # Recorre todas las paginas (cursor)
+        editions = list(api.editions.iter())
         print(f"Ediciones encontradas ({len(editions)}):")
         # Imprimir de forma más legible
         print(json.dumps(editions, indent=2))
 
-    except requests.exceptions.RequestException as err:
+    except (ApiError, OSError) as err:
         print(f"Error al obtener todas: {err}")
 
 
 def get_edition_by_id(edition_id):
     """Obtiene y muestra una edición por su ID."""
     print(f"\n--- 2B. OBTENER Edición con ID {edition_id} (GET) ---")
-    url = f"{BASE_URL}/{edition_id}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-
-        edition = response.json()
-        print(f"Estado: {response.status_code}")
-        print(f"Edición: {edition}")
-
-    except requests.exceptions.HTTPError as err:
-        print(f"Edición no encontrada (o error): {err}")
-    except requests.exceptions.RequestException as err:
+        edition = api.editions.get(edition_id)
+        if edition is None:
+            print("Edición no encontrada")
+        else:
+            print(f"Edición: {edition}")
+
+    except ApiError as err:
+        print(f"Error: {err}")
+    except OSError as err:
         print(f"Error de conexión: {err}")
 
 
@@ -89,18 +84,13 @@ def update_edition(edition_id):
         "year": 2026  # Actualizamos el año
     }
 
-    url = f"{BASE_URL}/{edition_id}"
     try:
-        response = requests.put(url, json=update_data)
-        response.raise_for_status()
+        print(f"Respuesta: {api.editions.update(edition_id, update_data)}")
 
-        print(f"Estado: {response.status_code}")
-        print(f"Respuesta: {response.json()}")
-
-    except requests.exceptions.HTTPError as err:
+    except ApiError as err:
         print(f"Error al actualizar: {err}")
-        print(f"Cuerpo del error: {response.json()}")
-    except requests.exceptions.RequestException as err:
+        print(f"Cuerpo del error: {err.payload}")
+    except OSError as err:
         print(f"Error de conexión: {err}")
 
 
@@ -108,24 +98,20 @@ def update_edition(edition_id):
 def delete_edition(edition_id):
     """Elimina una edición por su ID."""
     print(f"\n--- 4. ELIMINAR Edición con ID {edition_id} (DELETE) ---")
-    url = f"{BASE_URL}/{edition_id}"
     try:
-        response = requests.delete(url)
-        response.raise_for_status()
-
-        print(f"Estado: {response.status_code}")
-        print(f"Respuesta: {response.json()}")
+        deleted = api.editions.delete(edition_id)
+        print("Edición eliminada" if deleted else "Edición no encontrada para eliminar")
 
-    except requests.exceptions.HTTPError as err:
+    except ApiError as err:
         print(f"Error al eliminar: {err}")
-        print(f"Cuerpo del error: {response.json()}")
-    except requests.exceptions.RequestException as err:
+        print(f"Cuerpo del error: {err.payload}")
+    except OSError as err:
         print(f"Error de conexión: {err}")
 
 
 # --- Ejecución de las Pruebas ---
 if __name__ == '__main__':
-    # 1. Instala la librería 'requests' si no la tienes
+    # 1. Instala la librería 'requests' si no la tienes (la usa client.py)
     #    En PyCharm: File -> Settings -> Project -> Python Interpreter -> (+) -> busca 'requests' -> Install Package
     #    O en la terminal de PyCharm: pip install requests
 
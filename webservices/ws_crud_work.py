@@ -1,96 +1,140 @@
 # ws_crud_work.py
+import os
 import sqlite3
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 
-DB_FILE = "crud_dr.db"
+from db_pool import get_pool
+from migrations import ensure_schema
+from search import fts_query, work_match_sql
+from pagination import SortKey, fetch_page, count_rows, encode_cursor, order_clause
+from cache import make_cache
+
+# Una sola base para todos los servicios con LIBRARY_DB (ver gateway.py)
+DB_FILE = os.environ.get("LIBRARY_DB", "crud_dr.db")
+# Milisegundos en updated_at: dos escrituras en el mismo segundo dan ETags distintos
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# Verificacion opcional de la fila actual antes de escribir (p. ej. If-Match); lanza para abortar
+Check = Optional[Callable[[Optional[Dict[str, Any]]], None]]
 
 # ---------- Utils de conexión ----------
 def get_conn():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+    # Conexión prestada por el pool: commit/rollback al salir del `with` y vuelve al pool
+    return get_pool(DB_FILE).connection()
 
 # ---------- Esquema ----------
 def init_db():
-    with get_conn() as c:
-        # crea tabla work
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS work (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            theme TEXT,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL
-        );
-        """)
+    # Esquema compartido con ws_crud.py (tablas, índices y FTS), ver migrations.py.
+    # Se aplica una sola vez por proceso: las funciones CRUD no ejecutan DDL.
+    ensure_schema(DB_FILE)
+
+init_db()
+
+# Cache de get_work; se invalida despues del commit de cada escritura (ver cache.py)
+work_cache = make_cache("works")
 
 # ---------- CRUD ----------
 def create_work(title: str, theme: Optional[str]) -> Dict[str, Any]:
-    init_db()
     with get_conn() as c:
-        c.execute("""
+        c.execute(f"""
             INSERT INTO work(title, theme, created_at, updated_at)
-            VALUES (?, ?, datetime('now'), datetime('now'))
+            VALUES (?, ?, {NOW}, {NOW})
         """, (title, theme))
         new_id = c.execute("SELECT last_insert_rowid()").fetchone()[0]
         row = c.execute("SELECT * FROM work WHERE id = ?", (new_id,)).fetchone()
         return dict(row)
 
-def get_work(work_id: int) -> Optional[Dict[str, Any]]:
-    init_db()
+def _load_work(work_id: int) -> Optional[Dict[str, Any]]:
     with get_conn() as c:
         row = c.execute("SELECT * FROM work WHERE id = ?", (work_id,)).fetchone()
         return dict(row) if row else None
 
+def get_work(work_id: int) -> Optional[Dict[str, Any]]:
+    with get_conn() as c:
+        # Descarta lo que cambiaron otros procesos/modulos sobre la misma base (ver cache.py)
+        work_cache.sync(c)
+    return work_cache.get_or_load(("work", work_id), lambda: _load_work(work_id))
+
 def list_works(
     q: Optional[str] = None,
     theme: Optional[str] = None,
     limit: int = 20,
     offset: int = 0,
-    order: str = "desc"
+    order: str = "desc",
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
 ) -> Dict[str, Any]:
-    init_db()
+    """Lista works ordenados por (created_at, id), o por relevancia con order="relevance".
+
+    `q` busca por prefijo de palabras en título y tema (índice FTS5, ranking BM25).
+    Con `cursor` (el `next_cursor` de la página anterior) se pagina por keyset y
+    `offset` se ignora; `count` elige el total: 'exact', 'estimate' o 'none'
+    (por defecto 'exact' por offset, como antes, y 'estimate' con cursor).
+    """
+    if count is None:
+        count = "estimate" if cursor else "exact"
+    table = "work"
     where, params = [], []
-    if q:
-        where.append("title LIKE ?")
-        params.append(f"%{q}%")
+    query = fts_query(q) if q else None
+    if q and query is None:
+        where.append("0")  # la búsqueda no tiene palabras: no hay coincidencias
+    if query and order.lower() == "relevance":
+        # Ordena por rank BM25; la subconsulta FTS aporta el primer parámetro
+        table = f"{work_match_sql()} AS w"
+        params.append(query)
+        keys = [SortKey("rank"), SortKey("id")]
+    else:
+        descending = order.lower() != "asc"
+        keys = [SortKey("created_at", descending), SortKey("id", descending)]
+        if query:
+            where.append("id IN (SELECT rowid FROM work_fts WHERE work_fts MATCH ?)")
+            params.append(query)
     if theme:
         where.append("theme = ?")
         params.append(theme)
 
-    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
-    order_sql = "ASC" if order.lower() == "asc" else "DESC"
-
     with get_conn() as c:
-        total = c.execute(f"SELECT COUNT(*) FROM work {where_sql}", params).fetchone()[0]
-        rows = c.execute(
-            f"SELECT * FROM work {where_sql} ORDER BY created_at {order_sql} LIMIT ? OFFSET ?",
-            (*params, limit, offset)
-        ).fetchall()
+        if cursor or not offset:
+            items, next_cursor = fetch_page(c, table, keys, limit, cursor, where, params)
+        else:
+            # Compatibilidad: paginación por offset (costo lineal con la profundidad)
+            where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+            rows = c.execute(
+                f"SELECT * FROM {table} {where_sql} ORDER BY {order_clause(keys)} LIMIT ? OFFSET ?",
+                (*params, limit + 1, offset)
+            ).fetchall()
+            items = [dict(r) for r in rows[:limit]]
+            next_cursor = encode_cursor([items[-1][k.column] for k in keys], keys) if len(rows) > limit else None
         return {
-            "items": [dict(r) for r in rows],
-            "total": total,
+            "items": items,
+            "total": count_rows(c, table, count, where, params),
             "limit": limit,
-            "offset": offset
+            "offset": 0 if cursor else offset,
+            "next_cursor": next_cursor
         }
 
-def update_work(work_id: int, title: str, theme: Optional[str]) -> Optional[Dict[str, Any]]:
-    init_db()
+def _check_current(c: sqlite3.Connection, work_id: int, check: Check):
+    # BEGIN IMMEDIATE: nadie puede escribir entre la verificacion y el UPDATE/DELETE
+    if check is None:
+        return
+    c.execute("BEGIN IMMEDIATE")
+    row = c.execute("SELECT * FROM work WHERE id = ?", (work_id,)).fetchone()
+    check(dict(row) if row else None)
+
+def update_work(work_id: int, title: str, theme: Optional[str], check: Check = None) -> Optional[Dict[str, Any]]:
     with get_conn() as c:
-        cur = c.execute("""
+        _check_current(c, work_id, check)
+        cur = c.execute(f"""
             UPDATE work
-               SET title = ?, theme = ?, updated_at = datetime('now')
+               SET title = ?, theme = ?, updated_at = {NOW}
              WHERE id = ?
         """, (title, theme, work_id))
-        if cur.rowcount == 0:
-            return None
-        row = c.execute("SELECT * FROM work WHERE id = ?", (work_id,)).fetchone()
-        return dict(row)
+        row = c.execute("SELECT * FROM work WHERE id = ?", (work_id,)).fetchone() if cur.rowcount else None
+    work_cache.invalidate([("work", work_id)])
+    return dict(row) if row else None
 
-def patch_work(work_id: int, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    init_db()
+def patch_work(work_id: int, fields: Dict[str, Any], check: Check = None) -> Optional[Dict[str, Any]]:
     allowed = {"title", "theme"}
     updates = {k: v for k, v in fields.items() if k in allowed}
     if not updates:
@@ -101,20 +145,21 @@ def patch_work(work_id: int, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]
     for k, v in updates.items():
         sets.append(f"{k} = ?")
         values.append(v)
-    sets.append("updated_at = datetime('now')")
+    sets.append(f"updated_at = {NOW}")
     values.append(work_id)
 
     sql = "UPDATE work SET " + ", ".join(sets) + " WHERE id = ?"
 
     with get_conn() as c:
+        _check_current(c, work_id, check)
         cur = c.execute(sql, tuple(values))
-        if cur.rowcount == 0:
-            return None
-        row = c.execute("SELECT * FROM work WHERE id = ?", (work_id,)).fetchone()
-        return dict(row)
+        row = c.execute("SELECT * FROM work WHERE id = ?", (work_id,)).fetchone() if cur.rowcount else None
+    work_cache.invalidate([("work", work_id)])
+    return dict(row) if row else None
 
-def delete_work(work_id: int) -> bool:
-    init_db()
+def delete_work(work_id: int, check: Check = None) -> bool:
     with get_conn() as c:
+        _check_current(c, work_id, check)
         cur = c.execute("DELETE FROM work WHERE id = ?", (work_id,))
-        return cur.rowcount > 0
+    work_cache.invalidate([("work", work_id)])
+    return cur.rowcount > 0